@@ -0,0 +1,127 @@
+"""Compare claim statistics gathered row by row in Python with ClaimAnalytics
+
+Usage: python -m benchmarks.analytics [claims]
+"""
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+from database.analytics import ClaimAnalytics, np, _percentile
+from database.db import Database
+
+logging.disable(logging.INFO)
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'schema.sql')
+
+# Claims per policy in the generated data
+CLAIMS_PER_POLICY = 10
+
+# Reports computed from one load, as a session viewing several of them would
+REPORTS = 5
+
+
+def populate(db, count):
+    rng = random.Random(42)
+    policies = max(count // CLAIMS_PER_POLICY, 1)
+    with db.writer() as conn:
+        with open(SCHEMA) as f:
+            conn.executescript(f.read())
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO customers (first_name, last_name, email) VALUES ('Bench', 'Mark', 'bench@example.com')")
+        conn.executemany("""
+            INSERT INTO policies (customer_id, policy_type, policy_number, start_date, end_date, premium,
+                                  coverage_limit, status, payment_schedule)
+            VALUES (1, ?, ?, '2024-01-01', '2025-01-01', ?, ?, 'active', 'monthly')
+        """, ((rng.choice(('AUTO', 'HOME', 'LIFE', 'HEALTH', 'TRAVEL', 'PET', 'BUSINESS')), f'BENCH-{n}',
+               round(rng.uniform(200, 3000), 2), rng.choice((25000, 50000, 250000))) for n in range(policies)))
+        conn.executemany("""
+            INSERT INTO claims (policy_id, claim_number, claim_date, incident_date, incident_time,
+                                incident_location, description, claim_amount, approved_amount, status)
+            VALUES (?, ?, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Bench', ?, ?, ?)
+        """, ((rng.randint(1, policies), f'BENCH-{n}', round(rng.uniform(50, 20000), 2),
+               rng.choice((None, round(rng.uniform(50, 20000), 2))),
+               rng.choice(('pending', 'approved', 'rejected', 'paid'))) for n in range(count)))
+
+
+def python_loop_stats(db):
+    """The same statistics gathered by looping over the rows in Python, as each report would"""
+    claims, approved, claimed = {}, {}, {}
+    with db.reader() as conn:
+        for policy_type, policy_id, amount, approved_amount in conn.execute("""
+                SELECT p.policy_type, cl.policy_id, cl.claim_amount, cl.approved_amount
+                FROM claims cl JOIN policies p ON p.id = cl.policy_id"""):
+            claims.setdefault(policy_type, []).append(amount)
+            if approved_amount is not None:
+                approved[policy_type] = approved.get(policy_type, 0.0) + approved_amount
+            claimed[policy_id] = claimed.get(policy_id, 0.0) + amount
+        policies = {}
+        for policy_id, policy_type, premium, coverage in conn.execute(
+                "SELECT id, policy_type, premium, coverage_limit FROM policies"):
+            count, premiums, used = policies.get(policy_type, (0, 0.0, 0.0))
+            policies[policy_type] = (count + 1, premiums + premium,
+                                     used + (claimed.get(policy_id, 0.0) / coverage if coverage else 0.0))
+
+    stats = {}
+    for policy_type, amounts in claims.items():
+        ordered = sorted(amounts)
+        count, premiums, used = policies[policy_type]
+        total = math.fsum(amounts)
+        stats[policy_type] = {
+            'count': len(amounts), 'total': total, 'mean': total / len(amounts),
+            'approved_total': approved.get(policy_type, 0.0),
+            'percentiles': {q: _percentile(ordered, q) for q in (50, 90, 99)},
+            'loss_ratio': total / premiums, 'coverage_utilisation': used / count,
+        }
+    return stats
+
+
+def timed(label, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<36}{elapsed:8.2f}s")
+    return result, elapsed
+
+
+def reuse(analytics):
+    for _ in range(REPORTS):
+        stats = analytics.policy_type_stats()
+        analytics.claim_stats('status')
+    return stats
+
+
+def check(expected, stats):
+    for policy_type, values in expected.items():
+        for key in ('count', 'total', 'mean', 'approved_total', 'loss_ratio', 'coverage_utilisation'):
+            assert math.isclose(values[key], stats[policy_type][key], rel_tol=1e-9), (policy_type, key)
+        for q, amount in values['percentiles'].items():
+            assert math.isclose(amount, stats[policy_type]['percentiles'][q], rel_tol=1e-9), (policy_type, q)
+
+
+def main(count=1_000_000):
+    print(f"{count:,} claims, {REPORTS} reports per load")
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'analytics.db'), encryption_key='benchmark')
+        timed("populate", populate, db, count)
+
+        expected, loop = timed("python loop, one report", python_loop_stats, db)
+        loop *= REPORTS
+        print(f"{'python loop, ' + str(REPORTS) + ' reports':<36}{loop:8.2f}s")
+
+        backends = [('array', False)] + ([('numpy', True)] if np is not None else [])
+        for name, use_numpy in backends:
+            analytics, load = timed(f"{name} load", ClaimAnalytics.load, db, use_numpy)
+            stats, compute = timed(f"{name}, {REPORTS} reports", reuse, analytics)
+            check(expected, stats)
+            print(f"speedup over python loop ({name}): {loop / (load + compute):.1f}x")
+        if np is None:
+            print("numpy is not installed: only the array fallback was measured")
+        db.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,95 @@
+"""Compare Database.create_claims with a plain executemany into the same table
+
+Usage: python -m benchmarks.bulk_claims [count]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from database.db import Database
+
+logging.disable(logging.INFO)
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'schema.sql')
+
+# Claims per second create_claims should reach on local disk
+TARGET_RATE = 50_000
+
+# Timed runs of each case; the best one is reported
+RUNS = 3
+
+POLICY_TYPES = ('AUTO', 'HOME', 'LIFE', 'PET')
+
+
+def fresh_database(directory, name):
+    db = Database(os.path.join(directory, name), encryption_key='benchmark')
+    with db.writer() as conn:
+        with open(SCHEMA) as f:
+            conn.executescript(f.read())
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO customers (first_name, last_name, email) VALUES ('Bench', 'Mark', 'bench@example.com')")
+        conn.executemany("""
+            INSERT INTO policies (customer_id, policy_type, policy_number, start_date, end_date, premium,
+                                  coverage_limit, status, payment_schedule)
+            VALUES (1, ?, ?, '2024-01-01', '2025-01-01', 900, 50000, 'active', 'monthly')
+        """, [(policy_type, f'BENCH-{policy_type}') for policy_type in POLICY_TYPES])
+    return db
+
+
+def claims(count):
+    return [{'policy_id': 1 + n % len(POLICY_TYPES), 'claim_date': '2024-03-01', 'incident_date': '2024-02-28',
+             'incident_time': '10:00', 'incident_location': 'Main St', 'description': 'Bench',
+             'claim_amount': 100.0 + n % 500, 'status': 'pending'} for n in range(count)]
+
+
+def plain_executemany(db, batch):
+    rows = [(claim['policy_id'], f'RAW-{n}', claim['claim_date'], claim['incident_date'], claim['incident_time'],
+             claim['incident_location'], claim['description'], claim['claim_amount'], claim['status'])
+            for n, claim in enumerate(batch)]
+    started = time.perf_counter()
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM claims")
+        conn.executemany("""
+            INSERT INTO claims (policy_id, claim_number, claim_date, incident_date, incident_time,
+                                incident_location, description, claim_amount, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    return time.perf_counter() - started
+
+
+def create_claims(db, batch):
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM claims")
+    started = time.perf_counter()
+    ids, errors = db.create_claims(batch)
+    elapsed = time.perf_counter() - started
+    assert not errors and None not in ids
+    return elapsed
+
+
+def best(label, run, db, batch):
+    elapsed = min(run(db, batch) for _ in range(RUNS))
+    rate = len(batch) / elapsed
+    print(f"{label:<28}{elapsed:8.2f}s{rate:12,.0f} rows/s")
+    return rate
+
+
+def main(count=100_000):
+    print(f"{count:,} claims, best of {RUNS}")
+    batch = claims(count)
+    with tempfile.TemporaryDirectory() as directory:
+        db = fresh_database(directory, 'raw.db')
+        best('plain executemany', plain_executemany, db, batch)
+        db.close()
+
+        db = fresh_database(directory, 'bulk.db')
+        rate = best('create_claims', create_claims, db, batch)
+        db.close()
+
+    print(f"target {TARGET_RATE:,} rows/s: {'met' if rate >= TARGET_RATE else 'not met'}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
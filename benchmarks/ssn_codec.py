@@ -0,0 +1,44 @@
+"""Compare per-value and batch SSN encryption
+
+Usage: python -m benchmarks.ssn_codec [count]
+"""
+import logging
+import random
+import sys
+import time
+
+from database.db import Database, XorCodec
+
+logging.disable(logging.INFO)
+
+
+def timed(label, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28}{elapsed:8.2f}s")
+    return result, elapsed
+
+
+def main(count=1_000_000):
+    key = Database._generate_encryption_key(None)
+    db = Database.__new__(Database)
+    db.encryption_key = key
+    codec = XorCodec(key)
+    ssns = [f"{random.randrange(1000):03d}-{random.randrange(100):02d}-{random.randrange(10000):04d}"
+            for _ in range(count)]
+    print(f"{count:,} SSNs")
+
+    encrypted, single_encrypt = timed("per-value encrypt", lambda: [db._xor_encrypt(ssn) for ssn in ssns])
+    batch_encrypted, batch_encrypt = timed("batch encrypt", codec.encrypt_many, ssns)
+    assert batch_encrypted == encrypted
+
+    decrypted, single_decrypt = timed("per-value decrypt", lambda: [db._xor_decrypt(value) for value in encrypted])
+    batch_decrypted, batch_decrypt = timed("batch decrypt", codec.decrypt_many, encrypted)
+    assert batch_decrypted == decrypted == ssns
+
+    print(f"speedup: encrypt {single_encrypt / batch_encrypt:.1f}x, decrypt {single_decrypt / batch_decrypt:.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,53 @@
+"""Compare committing every customer insert with the group-committing write queue
+
+Usage: python -m benchmarks.write_queue [count]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from database.db import Database
+
+logging.disable(logging.INFO)
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'schema.sql')
+
+
+def fresh_database(directory, name, **options):
+    path = os.path.join(directory, name)
+    db = Database(path, encryption_key='benchmark', **options)
+    with db.writer() as conn:
+        with open(SCHEMA) as f:
+            conn.executescript(f.read())
+    return db
+
+
+def run(label, db, count, wait):
+    started = time.perf_counter()
+    results = [db.create_customer('Bench', 'Mark', f'{label}{n}@example.com', wait=wait) for n in range(count)]
+    if not wait:
+        results = [future.result() for future in results]
+    elapsed = time.perf_counter() - started
+    assert None not in results
+    print(f"{label:<28}{elapsed:8.2f}s{count / elapsed:12,.0f} rows/s")
+    return elapsed
+
+
+def main(count=5000):
+    print(f"{count:,} customers")
+    with tempfile.TemporaryDirectory() as directory:
+        db = fresh_database(directory, 'direct.db')
+        direct = run('commit per row', db, count, wait=True)
+        db.close()
+
+        db = fresh_database(directory, 'queued.db', write_queue=True)
+        queued = run('write queue, futures', db, count, wait=False)
+        db.close()
+
+    print(f"speedup: {direct / queued:.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -1,7 +1,14 @@
 from .db import Database, DatabaseError, UserRole, PolicyType, PolicyStatus, ClaimStatus, PaymentStatus
+from .cache import EntityCache
+from .pool import ConnectionPool
+from .write_queue import WriteQueue
+from .records import Customer, Policy, Claim
 from .reports import ReportGenerator
+from .analytics import ClaimAnalytics
+from .importer import BulkImporter
 
 __all__ = [
     'Database', 'DatabaseError', 'UserRole', 'PolicyType', 'PolicyStatus', 'ClaimStatus', 'PaymentStatus',
-    'ReportGenerator'
+    'Customer', 'Policy', 'Claim', 'ReportGenerator', 'BulkImporter', 'ConnectionPool', 'WriteQueue',
+    'EntityCache', 'ClaimAnalytics'
 ] 
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""Claim and premium statistics computed over columnar arrays
+
+ClaimAnalytics loads the amounts of every policy and claim once, with the
+policy type and claim status as small integer codes, into contiguous
+columns: NumPy arrays when numpy is installed, array.array columns
+otherwise. Statistics grouped by policy type or claim status are then
+computed from those columns, vectorized with NumPy or in a single pass
+over the arrays without it, and one load serves any number of reports.
+
+To compare it with statistics gathered row by row in Python:
+
+    python -m benchmarks.analytics [claims]
+"""
+import math
+from array import array
+from contextlib import contextmanager
+from .db import PolicyType, ClaimStatus
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Policy types and claim statuses in the order of their codes; unrecognised values get the next code
+POLICY_TYPES = tuple(policy_type.value for policy_type in PolicyType)
+CLAIM_STATUSES = tuple(status.value for status in ClaimStatus)
+
+# Percentiles of claim amounts reported for each group
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+# Rows fetched per fetchmany call while loading the columns
+LOAD_BATCH_SIZE = 10000
+
+
+def _code(column, values):
+    """SQL giving the position of column's value in values, or len(values) for any other value"""
+    whens = ' '.join(f"WHEN '{value}' THEN {code}" for code, value in enumerate(values))
+    return f"CASE {column} {whens} ELSE {len(values)} END"
+
+
+POLICY_COLUMNS = ('id', 'premium', 'coverage_limit', 'policy_type')
+POLICIES_SQL = f"""
+    SELECT id, premium, coverage_limit, {_code('policy_type', POLICY_TYPES)}
+    FROM policies ORDER BY id
+"""
+
+CLAIM_COLUMNS = ('policy_id', 'claim_amount', 'approved_amount', 'policy_type', 'status')
+CLAIMS_SQL = f"""
+    SELECT cl.policy_id, cl.claim_amount, cl.approved_amount,
+           {_code('p.policy_type', POLICY_TYPES)}, {_code('cl.status', CLAIM_STATUSES)}
+    FROM claims cl JOIN policies p ON p.id = cl.policy_id
+"""
+
+# Labels of each grouping's codes, the last standing for unrecognised values
+GROUP_LABELS = {
+    'policy_type': POLICY_TYPES + (None,),
+    'status': CLAIM_STATUSES + (None,),
+}
+
+
+@contextmanager
+def _snapshot(db):
+    """A read connection whose queries in the block all see the database as of the first"""
+    with db.reader() as conn:
+        if conn.in_transaction:
+            # The open transaction's reads already share one snapshot
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+
+def _fetch_batches(conn, sql):
+    """Yield the rows of sql as plain tuples, a fetchmany batch at a time"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    try:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _load_numpy(conn, sql, names):
+    """Load the columns of sql as contiguous float64 arrays, NULL becoming nan"""
+    chunks = [np.array(rows, dtype=np.float64) for rows in _fetch_batches(conn, sql)]
+    data = np.concatenate(chunks) if chunks else np.empty((0, len(names)))
+    return {name: np.ascontiguousarray(data[:, index]) for index, name in enumerate(names)}
+
+
+def _load_arrays(conn, sql, names):
+    """Load the columns of sql as array('d') columns, NULL becoming nan"""
+    columns = [array('d') for _ in names]
+    for rows in _fetch_batches(conn, sql):
+        for index, column in enumerate(columns):
+            column.extend(math.nan if row[index] is None else row[index] for row in rows)
+    return dict(zip(names, columns))
+
+
+def _percentile(ordered, q):
+    """The q-th percentile of sorted values, interpolating linearly as numpy.percentile does"""
+    position = (len(ordered) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class ClaimAnalytics:
+    """Grouped claim and premium statistics over columns loaded once
+
+    Build one with ClaimAnalytics.load(db). use_numpy=False keeps to the
+    array.array columns even when numpy is installed. The loaded columns are
+    a snapshot: load again to see later writes.
+    """
+
+    def __init__(self, policies, claims):
+        self.vectorized = np is not None and isinstance(claims['claim_amount'], np.ndarray)
+        self.policies = policies
+        self.claims = claims
+        # Per grouping work that does not depend on the percentiles asked for, kept across reports
+        self._groups = {}
+        self._policy_groups = None
+
+    @classmethod
+    def load(cls, db, use_numpy=None):
+        """Load the policy and claim columns from db, both from one snapshot so every claim's policy is loaded"""
+        vectorized = np is not None if use_numpy is None else use_numpy and np is not None
+        load = _load_numpy if vectorized else _load_arrays
+        with _snapshot(db) as conn:
+            return cls(load(conn, POLICIES_SQL, POLICY_COLUMNS), load(conn, CLAIMS_SQL, CLAIM_COLUMNS))
+
+    @property
+    def claim_count(self):
+        return len(self.claims['claim_amount'])
+
+    @property
+    def policy_count(self):
+        return len(self.policies['id'])
+
+    def claim_stats(self, group_by='policy_type', percentiles=DEFAULT_PERCENTILES):
+        """Claim amount statistics for each policy type or claim status with claims
+
+        Returns {group: stats}, where stats has count, total, mean,
+        approved_count and approved_total, and percentiles mapping each
+        requested percentile to its claim amount.
+        """
+        if group_by not in GROUP_LABELS:
+            raise ValueError(f"Cannot group claims by {group_by!r}")
+        labels = GROUP_LABELS[group_by]
+        if group_by not in self._groups:
+            group = self._numpy_claim_groups if self.vectorized else self._array_claim_groups
+            self._groups[group_by] = group(self.claims[group_by], len(labels))
+        stats = self._numpy_claim_stats if self.vectorized else self._array_claim_stats
+        return {labels[code]: group for code, group in stats(self._groups[group_by], percentiles)}
+
+    def policy_type_stats(self, percentiles=DEFAULT_PERCENTILES):
+        """Claim statistics for each policy type along with its premiums, loss ratio and coverage utilisation
+
+        Adds policies, premium_total, loss_ratio (claimed over premiums) and
+        coverage_utilisation (the mean over the type's policies of the amount
+        claimed on each over its coverage limit) to the claim_stats of every
+        policy type that has policies or claims.
+        """
+        labels = GROUP_LABELS['policy_type']
+        empty = {'count': 0, 'total': 0.0, 'mean': math.nan, 'approved_count': 0, 'approved_total': 0.0,
+                 'percentiles': {q: math.nan for q in percentiles}}
+        claims = self.claim_stats('policy_type', percentiles)
+        if self._policy_groups is None:
+            group = self._numpy_policy_groups if self.vectorized else self._array_policy_groups
+            self._policy_groups = list(group(len(labels)))
+        result = {}
+        for code, (count, premium_total, utilisation) in enumerate(self._policy_groups):
+            group = claims.get(labels[code])
+            if not count and group is None:
+                continue
+            group = dict(group or empty)
+            group['policies'] = count
+            group['premium_total'] = premium_total
+            group['loss_ratio'] = group['total'] / premium_total if premium_total else math.nan
+            group['coverage_utilisation'] = utilisation
+            result[labels[code]] = group
+        return result
+
+    def _numpy_claim_groups(self, codes, groups):
+        """Counts and totals of each group, and the claim amounts sorted within each group in group order"""
+        codes = codes.astype(np.uint8)
+        amounts = self.claims['claim_amount']
+        approved = self.claims['approved_amount']
+        has_approved = ~np.isnan(approved)
+
+        counts = np.bincount(codes, minlength=groups)
+        totals = np.bincount(codes, weights=amounts, minlength=groups)
+        approved_counts = np.bincount(codes[has_approved], minlength=groups)
+        approved_totals = np.bincount(codes[has_approved], weights=approved[has_approved], minlength=groups)
+
+        # A stable sort on the small codes puts each group's amounts in one run, then each run is sorted
+        ordered = amounts[np.argsort(codes, kind='stable')]
+        starts = np.cumsum(counts) - counts
+        for start, count in zip(starts, counts):
+            ordered[start:start + count].sort()
+        return counts, totals, approved_counts, approved_totals, ordered, starts
+
+    def _numpy_claim_stats(self, groups, percentiles):
+        counts, totals, approved_counts, approved_totals, ordered, starts = groups
+        present = counts > 0
+        points = {}
+        for q in percentiles:
+            position = starts + np.maximum(counts - 1, 0) * (q / 100)
+            low = np.floor(position).astype(np.intp)
+            high = np.minimum(low + 1, starts + counts - 1)
+            low, high = np.where(present, low, 0), np.where(present, high, 0)
+            if len(ordered):
+                points[q] = ordered[low] + (ordered[high] - ordered[low]) * (position - np.floor(position))
+
+        for code in np.flatnonzero(present):
+            count = int(counts[code])
+            yield int(code), {
+                'count': count,
+                'total': float(totals[code]),
+                'mean': float(totals[code]) / count,
+                'approved_count': int(approved_counts[code]),
+                'approved_total': float(approved_totals[code]),
+                'percentiles': {q: float(points[q][code]) for q in percentiles},
+            }
+
+    def _array_claim_groups(self, codes, groups):
+        """Each group's sorted claim amounts, total and approved count and total"""
+        grouped = [array('d') for _ in range(groups)]
+        approved_counts = [0] * groups
+        approved_totals = [0.0] * groups
+        for code, amount, approved_amount in zip(codes, self.claims['claim_amount'], self.claims['approved_amount']):
+            code = int(code)
+            grouped[code].append(amount)
+            if approved_amount == approved_amount:
+                approved_counts[code] += 1
+                approved_totals[code] += approved_amount
+        return [(sorted(values), math.fsum(values), approved_counts[code], approved_totals[code])
+                for code, values in enumerate(grouped)]
+
+    def _array_claim_stats(self, groups, percentiles):
+        for code, (ordered, total, approved_count, approved_total) in enumerate(groups):
+            if not ordered:
+                continue
+            yield code, {
+                'count': len(ordered),
+                'total': total,
+                'mean': total / len(ordered),
+                'approved_count': approved_count,
+                'approved_total': approved_total,
+                'percentiles': {q: _percentile(ordered, q) for q in percentiles},
+            }
+
+    def _numpy_policy_groups(self, groups):
+        types = self.policies['policy_type'].astype(np.intp)
+        ids = self.policies['id'].astype(np.intp)
+        coverage = self.policies['coverage_limit']
+        counts = np.bincount(types, minlength=groups)
+        premiums = np.bincount(types, weights=self.policies['premium'], minlength=groups)
+
+        # Sum the claims of each policy by id, then read the sums back in the order the policies were loaded
+        size = int(ids.max()) + 1 if len(ids) else 0
+        claimed = np.bincount(self.claims['policy_id'].astype(np.intp), weights=self.claims['claim_amount'],
+                              minlength=size)[ids].astype(np.float64)
+        used = np.divide(claimed, coverage, out=np.zeros_like(claimed), where=coverage > 0)
+        utilisation = np.bincount(types, weights=used, minlength=groups)
+
+        for code in range(groups):
+            count = int(counts[code])
+            yield count, float(premiums[code]), float(utilisation[code]) / count if count else math.nan
+
+    def _array_policy_groups(self, groups):
+        positions = {int(policy_id): position for position, policy_id in enumerate(self.policies['id'])}
+        claimed = [0.0] * len(positions)
+        for policy_id, amount in zip(self.claims['policy_id'], self.claims['claim_amount']):
+            claimed[positions[int(policy_id)]] += amount
+
+        counts = [0] * groups
+        premiums = [0.0] * groups
+        utilisation = [0.0] * groups
+        for position, (code, premium, coverage) in enumerate(zip(self.policies['policy_type'],
+                                                                 self.policies['premium'],
+                                                                 self.policies['coverage_limit'])):
+            code = int(code)
+            counts[code] += 1
+            premiums[code] += premium
+            if coverage > 0:
+                utilisation[code] += claimed[position] / coverage
+
+        for code in range(groups):
+            yield counts[code], premiums[code], utilisation[code] / counts[code] if counts[code] else math.nan
@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+
+
+class EntityCache:
+    """A bounded LRU cache of records by id, counting hits and misses
+
+    get() loads missing records through the function it is given; None is
+    never cached. invalidate() drops a record or everything. Should a record
+    be invalidated while another thread is still loading it, the loaded copy
+    is returned but not kept, so a write is never undone by a slower read.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._records = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        with self._lock:
+            try:
+                record = self._records[key]
+            except KeyError:
+                self.misses += 1
+                generation = self._generation
+            else:
+                self._records.move_to_end(key)
+                self.hits += 1
+                return record
+
+        record = load(key)
+        if record is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._records[key] = record
+                    if len(self._records) > self.maxsize:
+                        self._records.popitem(last=False)
+        return record
+
+    def invalidate(self, key=None):
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._records.clear()
+            else:
+                self._records.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._records), 'maxsize': self.maxsize}
@@ -1,12 +1,26 @@
 import sqlite3
 import os
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 import logging
 import bcrypt
 import secrets
 import string
+import threading
 from enum import Enum
 import base64
+import binascii
+import hashlib
+import hmac
+import json
+from contextlib import closing, contextmanager
+from concurrent.futures import Future
+from . import ledger
+from .cache import EntityCache
+from .pool import ConnectionPool
+from .write_queue import WriteQueue
+from .records import Claim, Customer, Policy, row_factory
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -54,8 +68,449 @@ class PaymentStatus(Enum):
     FAILED = 'failed'
 
 
+# Rows pulled from SQLite per fetchmany call when streaming a listing
+FETCH_BATCH_SIZE = 500
+
+# Default number of rows in one page of a keyset-paginated listing
+PAGE_SIZE = 100
+
+# Columns each listing can be sorted and paginated by
+SORT_KEYS = {
+    'customers': ('id', 'first_name', 'last_name', 'email', 'created_at'),
+    'policies': ('id', 'policy_number', 'policy_type', 'premium', 'coverage_limit', 'status',
+                 'start_date', 'end_date', 'created_at'),
+    'claims': ('id', 'policy_id', 'claim_number', 'claim_date', 'incident_date', 'claim_amount',
+               'status', 'created_at'),
+}
+
+
+# Characters of a long text column kept in its *_preview projection
+PREVIEW_LENGTH = 100
+
+# Columns a list can project besides the table's own, with the SQL for each.
+# Joined columns pull in the join they need.
+EXTRA_COLUMNS = {
+    'customers': {},
+    'policies': {
+        'customer_name': "c.first_name || ' ' || c.last_name",
+    },
+    'claims': {
+        'policy_number': "p.policy_number",
+        'policy_type': "p.policy_type",
+        'description_preview': f"substr(cl.description, 1, {PREVIEW_LENGTH})",
+    },
+}
+
+
+# Prefix of each allocated identifier and the sequence it is numbered from
+NUMBER_SEQUENCES = {
+    'claim_number': ('claims', 'CLM-'),
+    'policy_number': ('policies', 'POL-'),
+}
+
+# Digits allocated identifiers are zero-padded to
+NUMBER_WIDTH = 8
+
+# Table the allocator keeps the next free number of each sequence in
+SEQUENCES_TABLE = """
+    CREATE TABLE IF NOT EXISTS sequences (
+        name TEXT PRIMARY KEY,
+        next_value INTEGER NOT NULL
+    )
+"""
+
+# Records the entity cache keeps of each table by default
+ENTITY_CACHE_SIZES = {'customers': 1000, 'policies': 1000, 'claims': 1000}
+
+# What claim_groups can group claims by: the grouping expression and the join it needs
+CLAIM_GROUPINGS = {
+    'status': ('cl.status', ''),
+    'policy_type': ('p.policy_type', ' JOIN policies p ON p.id = cl.policy_id'),
+}
+
+# Fields every claim must have, in the order create_claims inserts them
+CLAIM_FIELDS = ('policy_id', 'claim_date', 'incident_date', 'incident_time',
+                'incident_location', 'description', 'claim_amount')
+
+# Tables export_rows can read: the alias, record class and the join their extra columns need
+EXPORT_SOURCES = {
+    'customers': ('c', Customer, ''),
+    'policies': ('p', Policy, ' JOIN customers c ON c.id = p.customer_id'),
+    'claims': ('cl', Claim, ' JOIN policies p ON p.id = cl.policy_id'),
+}
+
+# Columns left out of a full export, which can still be exported by naming them
+EXPORT_EXCLUDED = {'customers': ('ssn_encrypted', 'ssn_index')}
+
+
+def _xor_bytes(data, key):
+    """XOR data with the key repeated to its length"""
+    return bytes(a ^ b for a, b in zip(data, key * (len(data) // len(key) + 1)))
+
+
+class XorCodec:
+    """Encrypts and decrypts whole columns of values with the XOR cipher
+
+    Produces exactly what _xor_encrypt and _xor_decrypt do one value at a
+    time. The values of a batch are joined into one buffer and XORed with a
+    matching key stream as two big integers, and the base64 and text codecs
+    run over whole buffers where they can, so the per-byte work happens in C
+    rather than in Python loops. Empty values map to None, as do values that
+    fail to decrypt.
+    """
+
+    def __init__(self, key):
+        self.key = key.encode()
+        self._stream = b''
+
+    def _key_stream(self, length):
+        """The key repeated to at least length bytes"""
+        if len(self._stream) < length:
+            self._stream = self.key * (length // len(self.key) + 1)
+        return self._stream
+
+    def _xor(self, chunks, lengths):
+        """XOR each chunk with the key stream from its first byte, returning one joined buffer"""
+        stream = self._key_stream(max(lengths))
+        data = b''.join(chunks)
+        if len(set(lengths)) == 1:
+            keys = stream[:lengths[0]] * len(lengths)
+        else:
+            keys = b''.join([stream[:length] for length in lengths])
+        return (int.from_bytes(data, 'big') ^ int.from_bytes(keys, 'big')).to_bytes(len(data), 'big')
+
+    @staticmethod
+    def _split(buffer, lengths):
+        """Cut a joined buffer back into pieces of the given lengths"""
+        if len(set(lengths)) == 1 and lengths[0]:
+            size = lengths[0]
+            return [buffer[i:i + size] for i in range(0, len(buffer), size)]
+        pieces, start = [], 0
+        for length in lengths:
+            pieces.append(buffer[start:start + length])
+            start += length
+        return pieces
+
+    def encrypt_many(self, values):
+        """Encrypt a list of strings to base64 ciphertext"""
+        values = list(values)
+        present = [i for i, value in enumerate(values) if value]
+        encrypted = [None] * len(values)
+        if not present:
+            return encrypted
+        chunks = [values[i].encode() for i in present]
+        lengths = [len(chunk) for chunk in chunks]
+        xored = self._split(self._xor(chunks, lengths), lengths)
+        # b2a_base64 ends each value with a newline, so one decode and split yields them all
+        ciphertexts = b''.join(map(binascii.b2a_base64, xored)).decode().split('\n')
+        for i, ciphertext in zip(present, ciphertexts):
+            encrypted[i] = ciphertext
+        return encrypted
+
+    def decrypt_many(self, values):
+        """Decrypt a list of base64 ciphertexts"""
+        values = list(values)
+        decrypted = [None] * len(values)
+        present = [i for i, value in enumerate(values) if value]
+        try:
+            chunks = [binascii.a2b_base64(values[i]) for i in present]
+        except (binascii.Error, ValueError):
+            # Find the values that are not base64 one at a time
+            chunks, valid = [], []
+            for i in present:
+                try:
+                    chunks.append(binascii.a2b_base64(values[i]))
+                    valid.append(i)
+                except (binascii.Error, ValueError) as e:
+                    logger.error(f"Error decrypting data: {e}")
+            present = valid
+        if not present:
+            return decrypted
+
+        lengths = [len(chunk) for chunk in chunks]
+        xored = self._xor(chunks, lengths)
+        try:
+            text = xored.decode('ascii')
+            plaintexts = self._split(text, lengths)
+        except UnicodeDecodeError:
+            plaintexts = []
+            for piece in self._split(xored, lengths):
+                try:
+                    plaintexts.append(piece.decode())
+                except UnicodeDecodeError as e:
+                    logger.error(f"Error decrypting data: {e}")
+                    plaintexts.append(None)
+        for i, plaintext in zip(present, plaintexts):
+            decrypted[i] = plaintext
+        return decrypted
+
+
+def encrypt_values(key, values):
+    """XOR-encrypt a batch of values with the key, leaving empty values as None
+
+    A plain function of its arguments, so it can be sent to worker processes.
+    """
+    return XorCodec(key).encrypt_many(values)
+
+
+def _projection(table, alias, record, columns):
+    """The SELECT list for columns of a table, always starting with its id
+
+    columns of None selects every column of the table.
+    """
+    own = [slot for slot in record.__slots__ if not slot.startswith('_')]
+    if columns is None:
+        return f"{alias}.*"
+    expressions, seen = [f"{alias}.id"], {'id'}
+    for column in columns:
+        if column in seen:
+            continue
+        seen.add(column)
+        if column in own:
+            expressions.append(f"{alias}.{column}")
+        elif column in EXTRA_COLUMNS[table]:
+            expressions.append(f"{EXTRA_COLUMNS[table][column]} AS {column}")
+        else:
+            raise DatabaseError(f"Cannot select {column!r} from {table}")
+    return ", ".join(expressions)
+
+
+def _like_pattern(term):
+    """Turn free search text into a LIKE pattern that matches it anywhere"""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+@lru_cache(maxsize=128)
+def _compile_query(select, clauses, order_by, limited=False, offset=False):
+    """Assemble the SQL text for one shape of filter query"""
+    sql = select
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limited or offset:
+        sql += " LIMIT ?"
+    if offset:
+        sql += " OFFSET ?"
+    return sql
+
+
+class FilterQuery:
+    """Builds a parameterised SELECT from optional search and filter criteria
+
+    Criteria that are empty, or set to 'All' as in the GUI comboboxes, are left
+    out of the WHERE clause. Every combination of active filters therefore maps
+    to a single SQL text, which is memoised here and prepared once by SQLite's
+    statement cache no matter how many keystrokes reuse it.
+    """
+
+    def __init__(self, select, order_by=None):
+        self.select = select
+        self.order_by = order_by
+        self.clauses = []
+        self.params = []
+        self.limit = None
+        self.offset = None
+
+    def search(self, columns, term):
+        """Match the term as a case-insensitive substring of any of the columns"""
+        if term:
+            pattern = _like_pattern(term)
+            self.clauses.append(
+                "(" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in columns) + ")")
+            self.params.extend([pattern] * len(columns))
+        return self
+
+    def equals(self, column, value):
+        """Restrict a column to a value unless the filter is unset"""
+        if value and value != 'All':
+            self.clauses.append(f"{column} = ?")
+            self.params.append(value)
+        return self
+
+    def exists(self, subquery, present=True):
+        """Keep rows for which the correlated subquery does (or does not) return a row"""
+        self.clauses.append(f"{'' if present else 'NOT '}EXISTS ({subquery})")
+        return self
+
+    def paginate(self, table, alias, sort_key='id', after_id=None, limit=None, offset=None, after_value=None):
+        """Order by sort_key and continue after the row with id after_id
+
+        This is keyset pagination: the (sort_key, id) pair of the last row seen
+        bounds the next page, so fetching a page deep into the table costs the
+        same as fetching the first one. When sorting by a column other than id,
+        after_value is that row's sort_key value, None if it is NULL; the row
+        itself need not exist any more. NULLs sort after every other value.
+        offset is only meant for jumping to an arbitrary position when no
+        neighbouring row is known, since SQLite has to step over every skipped
+        row.
+        """
+        if sort_key not in SORT_KEYS[table]:
+            raise DatabaseError(f"Cannot sort {table} by {sort_key!r}")
+        if sort_key == 'id':
+            self.order_by = f"{alias}.id"
+            if after_id is not None:
+                self.clauses.append(f"{alias}.id > ?")
+                self.params.append(after_id)
+        else:
+            column = f"{alias}.{sort_key}"
+            self.order_by = f"{column} IS NULL, {column}, {alias}.id"
+            if after_id is not None and after_value is None:
+                self.clauses.append(f"{column} IS NULL AND {alias}.id > ?")
+                self.params.append(after_id)
+            elif after_id is not None:
+                self.clauses.append(f"({column} IS NULL OR ({column}, {alias}.id) > (?, ?))")
+                self.params.extend([after_value, after_id])
+        self.limit = limit
+        self.offset = offset or None
+        return self
+
+    def build(self):
+        """Return the SQL text and its parameters"""
+        limited = self.limit is not None
+        sql = _compile_query(self.select, tuple(self.clauses), self.order_by, limited, self.offset is not None)
+        params = tuple(self.params)
+        if limited or self.offset is not None:
+            params += (self.limit if limited else -1,)
+        if self.offset is not None:
+            params += (self.offset,)
+        return sql, params
+
+
+class SequenceAllocator:
+    """Hands out claim and policy numbers from the sequences table in blocks
+
+    Each process reserves block_size numbers at a time and serves them from
+    memory, so most allocations never touch the database. A reservation runs
+    in a BEGIN IMMEDIATE transaction on the allocator's own connection, which
+    makes it atomic across processes and independent of the caller's
+    transaction: a rolled back insert leaves a gap but never a duplicate.
+    A lock makes allocation safe across threads.
+
+    A caller inside a transaction of its own passes its connection instead,
+    as the allocator's connection would wait on that transaction's write lock.
+    Numbers beyond the block in memory are then reserved in the caller's
+    transaction, only as many as asked for, and go back to the sequence
+    should it roll back.
+    """
+
+    def __init__(self, db_path, block_size=100, timeout=30):
+        self.db_path = db_path
+        self.block_size = block_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._reserve_lock = threading.Lock()
+        self._blocks = {}
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.execute(SEQUENCES_TABLE)
+        return self._conn
+
+    def _seed(self, conn, name):
+        """First value of a new sequence: one past the highest number already in use"""
+        table, prefix = NUMBER_SEQUENCES[name]
+        start = len(prefix) + 1
+        row = conn.execute(f"""
+            SELECT COALESCE(MAX(CAST(substr({name}, {start}) AS INTEGER)), 0) + 1 FROM {table}
+            WHERE {name} LIKE '{prefix}%' AND length({name}) = {start - 1 + NUMBER_WIDTH}
+              AND substr({name}, {start}) NOT GLOB '*[^0-9]*'
+        """).fetchone()
+        return row[0]
+
+    def _advance(self, conn, name, count):
+        row = conn.execute("SELECT next_value FROM sequences WHERE name = ?", (name,)).fetchone()
+        first = row[0] if row else self._seed(conn, name)
+        conn.execute("INSERT OR REPLACE INTO sequences (name, next_value) VALUES (?, ?)", (name, first + count))
+        return first
+
+    def _reserve(self, name, count, conn=None):
+        """Reserve count numbers in the database and return the first"""
+        if conn is not None:
+            conn.execute(SEQUENCES_TABLE)
+            return self._advance(conn, name, count)
+        with self._reserve_lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                first = self._advance(conn, name, count)
+                conn.execute("COMMIT")
+                return first
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def allocate(self, name, count=1, conn=None):
+        """Return count unused numbers from the named sequence
+
+        conn is the connection of the caller's open transaction, if any.
+        """
+        numbers = []
+        with self._lock:
+            next_value, end = self._blocks.get(name, (0, 0))
+            taken = max(min(end - next_value, count), 0)
+            numbers.extend(range(next_value, next_value + taken))
+            self._blocks[name] = (next_value + taken, end)
+        needed = count - len(numbers)
+        if not needed:
+            return numbers
+        if conn is not None:
+            first = self._reserve(name, needed, conn)
+            return numbers + list(range(first, first + needed))
+
+        # Reserve outside the lock, so no thread waits on it while another holds the database
+        size = max(self.block_size, needed)
+        first = self._reserve(name, size)
+        numbers.extend(range(first, first + needed))
+        with self._lock:
+            next_value, end = self._blocks.get(name, (0, 0))
+            if next_value >= end:
+                self._blocks[name] = (first + needed, first + size)
+        return numbers
+
+    def next_number(self, name, conn=None):
+        """Return the next formatted identifier, e.g. CLM-00000042"""
+        prefix = NUMBER_SEQUENCES[name][1]
+        return f"{prefix}{self.allocate(name, 1, conn)[0]:0{NUMBER_WIDTH}d}"
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+
 class Database:
-    def __init__(self, db_path='insurance.db', encryption_key=None):
+    """Data access for the insurance system
+
+    By default every method shares one connection. With pooled=True each
+    thread reads through a connection of its own and writes go through a
+    single writer connection, so the Database can serve several threads at
+    once: a long report no longer holds up the GUI's reads. Methods take
+    their connection from reader() or writer(), as should other code that
+    needs to run SQL of its own.
+
+    With write_queue=True, create_customer, create_policy, create_claim and
+    update_claim_status hand their statement to a WriteQueue, whose writer
+    thread commits the writes of every thread in groups. Pass wait=False to
+    get a future of the row id instead of waiting for the commit.
+
+    Inside a with transaction(): block the methods neither commit nor queue
+    their writes; the block commits them together when it ends. Without a
+    pool, transactions write on a connection of their own, so the shared
+    connection's open cursors and commits never mix with them.
+
+    get_customer, get_policy and get_claim read through an LRU EntityCache
+    per table, which the write methods invalidate. cache is True for the
+    sizes in ENTITY_CACHE_SIZES, False for no caching, or a dict of sizes by
+    table, where 0 turns a table's cache off. Call invalidate() after
+    changing rows by other means.
+    """
+
+    def __init__(self, db_path='insurance.db', encryption_key=None, pooled=False, write_queue=False, cache=True):
         # Get the absolute path to the database file
         if not os.path.isabs(db_path):
             # Use the workspace root directory
@@ -66,21 +521,242 @@ class Database:
 
         self.conn = None
         self.cursor = None
+        self.pool = None
+        self.pooled = pooled
+        self.write_queue = None
+        self.use_write_queue = write_queue
+        # The connection, nesting depth and failure flag of each thread's open transaction
+        self._unit = threading.local()
+        # Without a pool, the connection transactions write on and the lock one thread holds it by
+        self._unit_writer = None
+        self._unit_lock = threading.RLock()
+        sizes = dict(ENTITY_CACHE_SIZES, **cache) if isinstance(cache, dict) else ENTITY_CACHE_SIZES if cache else {}
+        self.caches = {table: EntityCache(size) for table, size in sizes.items() if size}
         self.encryption_key = encryption_key or self._generate_encryption_key()
+        self.codec = XorCodec(self.encryption_key)
+        # Separate key for the SSN blind index, derived so it never equals the cipher key
+        self.ssn_index_key = hmac.new(self.encryption_key.encode(), b'ssn-blind-index', hashlib.sha256).digest()
+        self.sequences = SequenceAllocator(self.db_path)
         self.connect()
 
     def connect(self):
         """Connect to the database"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.execute("PRAGMA foreign_keys = ON")
-            self.conn.row_factory = sqlite3.Row  # Enable row factory for named access
-            self.cursor = self.conn.cursor()
+            if self.pooled:
+                self.pool = ConnectionPool(self._open_connection)
+            else:
+                self.conn = self._open_connection()
+                self.cursor = self.conn.cursor()
+            with self.writer() as conn:
+                # Let readers, and the shared connection's open cursors, carry on while a writer commits
+                conn.execute("PRAGMA journal_mode = WAL")
+            self._ensure_ssn_index()
+            self._ensure_ledger()
+            if self.use_write_queue:
+                self.write_queue = WriteQueue(self._open_connection)
             logger.info(f"Connected to database at {self.db_path}")
         except Exception as e:
             logger.error(f"Error connecting to database: {e}")
             raise
 
+    def _open_connection(self):
+        """Open a connection set up the way every method expects"""
+        # A larger statement cache keeps the prepared filter queries around. Connections
+        # may be opened on one thread and used on another, e.g. the GUI's workers.
+        conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=256, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.row_factory = sqlite3.Row  # Enable row factory for named access
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """The connection to read with: the calling thread's own when pooled"""
+        unit_conn = self._unit_conn()
+        if unit_conn is not None:
+            # Read what the open transaction has written
+            yield unit_conn
+        elif self.pool is None:
+            yield self.conn
+        else:
+            with self.pool.reader() as conn:
+                yield conn
+
+    @contextmanager
+    def writer(self):
+        """The connection to write with, held by the calling thread for the block when pooled"""
+        if self.pool is None:
+            yield self.conn
+        else:
+            with self.pool.writer() as conn:
+                yield conn
+
+    def _unit_conn(self):
+        """The connection of the calling thread's open transaction, if it has one"""
+        return getattr(self._unit, 'conn', None)
+
+    @contextmanager
+    def _transaction_writer(self):
+        """The connection a transaction writes on, held by the calling thread for the block
+
+        The pool's writer when pooled. Otherwise a connection kept for
+        transactions alone: on the shared one, a listing's open cursor would
+        hold an old snapshot that BEGIN IMMEDIATE cannot write from, and
+        another thread's write would commit the unfinished transaction.
+        """
+        if self.pool is not None:
+            with self.pool.writer() as conn:
+                yield conn
+            return
+        with self._unit_lock:
+            if self._unit_writer is None:
+                self._unit_writer = self._open_connection()
+            yield self._unit_writer
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one transaction, committed once when the outermost block ends
+
+        Within the block the write methods run on this thread's writer
+        connection without committing, and reads see what they wrote. Blocks
+        nest as savepoints. An exception leaving a block rolls back that block;
+        so does any write in it that failed, which raises DatabaseError when
+        the block ends, even though the method itself returned None as usual.
+        Yields the connection for SQL of the caller's own.
+        """
+        unit = self._unit
+        with self._transaction_writer() as conn:
+            depth = getattr(unit, 'depth', 0)
+            savepoint = f"unit_{depth}"
+            if depth:
+                conn.execute(f"SAVEPOINT {savepoint}")
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+                unit.written = []
+            outer_failed = getattr(unit, 'failed', False)
+            unit.conn, unit.depth, unit.failed = conn, depth + 1, False
+            try:
+                yield conn
+                if unit.failed:
+                    raise DatabaseError("A write in the transaction failed")
+            except BaseException:
+                if depth:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    conn.rollback()
+                raise
+            else:
+                if depth:
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    conn.commit()
+            finally:
+                unit.depth, unit.failed = depth, outer_failed
+                if not depth:
+                    unit.conn = None
+                    # Only now can other threads read the outcome, so only now may they cache it
+                    for table, key in dict.fromkeys(unit.written):
+                        self.invalidate(table, key)
+                    unit.written = []
+
+    def submit_write(self, sql, params=()):
+        """Run an INSERT, UPDATE or DELETE, returning a future of its lastrowid
+
+        Through the write queue when there is one; otherwise the statement is
+        committed straight away and the future is already done. Inside a
+        transaction() it is run on the transaction's connection and left for
+        the transaction to commit.
+        """
+        unit_conn = self._unit_conn()
+        if unit_conn is not None:
+            future = Future()
+            try:
+                future.set_result(unit_conn.execute(sql, params).lastrowid)
+            except Exception as e:
+                self._unit.failed = True
+                future.set_exception(e)
+            return future
+        if self.write_queue:
+            return self.write_queue.submit(sql, params)
+        future = Future()
+        with self.writer() as conn:
+            try:
+                cursor = conn.execute(sql, params)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                future.set_exception(e)
+            else:
+                future.set_result(cursor.lastrowid)
+        return future
+
+    def _write(self, sql, params, wait=True, table=None, key=None):
+        """submit_write, returning the row id once committed or the future when not waiting
+
+        The cached record of table with id key, or with the new row id when key
+        is None, is invalidated now and again once the write is done. Inside a
+        transaction() it is invalidated once the transaction has committed or
+        rolled back instead, as other threads read the old row until then.
+        """
+        if self._unit_conn() is not None:
+            future = self.submit_write(sql, params)
+            if table and future.exception() is None:
+                self._forget(table, future.result() if key is None else key)
+            return future.result() if wait else future
+
+        if key is not None:
+            self.invalidate(table, key)
+        future = self.submit_write(sql, params)
+        if table:
+            def forget(done):
+                if not done.cancelled() and done.exception() is None:
+                    self.invalidate(table, done.result() if key is None else key)
+            future.add_done_callback(forget)
+        return future.result() if wait else future
+
+    def _forget(self, table, key=None):
+        """Invalidate cached records now, or when the calling thread's open transaction ends"""
+        if self._unit_conn() is not None:
+            self._unit.written.append((table, key))
+        else:
+            self.invalidate(table, key)
+
+    def _cached(self, table, key, load):
+        """Read a record through its table's cache; transactions read past it"""
+        cache = self.caches.get(table)
+        if cache is None or self._unit_conn() is not None:
+            return load(key)
+        return cache.get(key, load)
+
+    def invalidate(self, table=None, key=None):
+        """Drop cached records: every table's, one table's or one record's"""
+        for name, cache in self.caches.items():
+            if table is None or name == table:
+                cache.invalidate(key)
+
+    def cache_stats(self):
+        """Hits, misses and size of each table's entity cache"""
+        return {table: cache.stats() for table, cache in self.caches.items()}
+
+    def _ensure_ledger(self):
+        """Install the financial ledger's triggers and totals in databases without them"""
+        with self.reader() as conn:
+            if not ledger.needs_install(conn):
+                return
+        with self.transaction() as conn:
+            ledger.install(conn)
+        logger.info("Installed the financial ledger")
+
+    def _ensure_ssn_index(self):
+        """Add the SSN blind index column to databases created before it existed"""
+        with self.writer() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(customers)")]
+            if columns and 'ssn_index' not in columns:
+                conn.execute("ALTER TABLE customers ADD COLUMN ssn_index TEXT")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_ssn_index ON customers(ssn_index)")
+                conn.commit()
+                logger.info("Added SSN blind index column; run backfill_ssn_index to populate it")
+
     def _generate_encryption_key(self):
         """Generate a secure encryption key"""
         alphabet = string.ascii_letters + string.digits
@@ -91,9 +767,7 @@ class Database:
         if not text:
             return None
         try:
-            key = self.encryption_key.encode()
-            text_bytes = text.encode()
-            encrypted = bytes(a ^ b for a, b in zip(text_bytes, key * (len(text_bytes) // len(key) + 1)))
+            encrypted = _xor_bytes(text.encode(), self.encryption_key.encode())
             return base64.b64encode(encrypted).decode()
         except Exception as e:
             logger.error(f"Error encrypting data: {e}")
@@ -104,10 +778,8 @@ class Database:
         if not encrypted_text:
             return None
         try:
-            key = self.encryption_key.encode()
             encrypted = base64.b64decode(encrypted_text.encode())
-            decrypted = bytes(a ^ b for a, b in zip(encrypted, key * (len(encrypted) // len(key) + 1)))
-            return decrypted.decode()
+            return _xor_bytes(encrypted, self.encryption_key.encode()).decode()
         except Exception as e:
             logger.error(f"Error decrypting data: {e}")
             return None
@@ -120,36 +792,178 @@ class Database:
         """Decrypt SSN using XOR encryption"""
         return self._xor_decrypt(encrypted_ssn)
 
+    def ssn_index(self, ssn):
+        """Keyed hash of an SSN, ignoring punctuation, for indexed lookups"""
+        digits = ''.join(ch for ch in ssn or '' if ch.isdigit())
+        if not digits:
+            return None
+        return hmac.new(self.ssn_index_key, digits.encode(), hashlib.sha256).hexdigest()
+
+    def encrypt_ssns(self, ssns):
+        """Encrypt a list of SSNs in one batch"""
+        return self.codec.encrypt_many(ssns)
+
+    def decrypt_ssns(self, encrypted_ssns):
+        """Decrypt a list of encrypted SSNs in one batch"""
+        return self.codec.decrypt_many(encrypted_ssns)
+
+    def _iter_query(self, query, batch_size=None, record=None, **attributes):
+        """Execute a query and yield its rows, fetching them in batches
+
+        A dedicated cursor is used so that other calls made while the caller
+        is still consuming rows do not reset the result set. Closing the
+        generator part way releases its connection at once.
+        """
+        with closing(self._iter_batches(query, batch_size, record, **attributes)) as batches:
+            for rows in batches:
+                yield from rows
+
+    def _iter_batches(self, query, batch_size=None, record=None, **attributes):
+        """Execute a query and yield its rows a fetchmany batch at a time
+
+        With a record class the rows are built as records of it by the
+        cursor's row factory, with the given attributes set on each.
+        """
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(*query.build())
+                if record is not None:
+                    cursor.row_factory = row_factory(record, cursor.description, **attributes)
+                while True:
+                    rows = cursor.fetchmany(batch_size or FETCH_BATCH_SIZE)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                cursor.close()
+
+    def _fetch_record(self, record, sql, params, **attributes):
+        """Run a query for a single row and return it as a record, or None"""
+        with self.reader() as conn:
+            cursor = conn.execute(sql, params)
+            try:
+                cursor.row_factory = row_factory(record, cursor.description, **attributes)
+                return cursor.fetchone()
+            finally:
+                cursor.close()
+
+    def _count(self, query):
+        """Run a COUNT(*) filter query and return the count"""
+        with self.reader() as conn:
+            return conn.execute(*query.build()).fetchone()[0]
+
+    def _customers_query(self, select, search_term=None, policy_filter='All'):
+        """Build the filter query shared by customer listings and counts"""
+        query = FilterQuery(select)
+        query.search(["c.first_name || ' ' || c.last_name", "c.email"], search_term)
+        if policy_filter in ('With Policies', 'Without Policies'):
+            query.exists("SELECT 1 FROM policies p WHERE p.customer_id = c.id",
+                         present=policy_filter == 'With Policies')
+        return query
+
+    def iter_customers(self, search_term=None, policy_filter='All', sort_key='id', after_id=None,
+                       limit=None, batch_size=None, offset=None, columns=None, after_value=None):
+        """Stream customers as Customer records, in sort_key order
+
+        search_term matches the full name or email, and policy_filter is one of
+        'All', 'With Policies' or 'Without Policies'. after_id, after_value and
+        limit select a keyset page, as with FilterQuery.paginate. columns limits
+        the columns fetched, as with iter_claims.
+        Errors are raised to the caller.
+        """
+        select = f"SELECT {_projection('customers', 'c', Customer, columns)} FROM customers c"
+        query = self._customers_query(select, search_term, policy_filter)
+        query.paginate('customers', 'c', sort_key, after_id, limit, offset, after_value)
+        yield from self._iter_query(query, batch_size, Customer, _decrypt=self.decrypt_ssn)
+
+    def count_customers(self, search_term=None, policy_filter='All'):
+        """Count the customers matching the same criteria as filter_customers"""
+        try:
+            return self._count(self._customers_query("SELECT COUNT(*) FROM customers c",
+                                                     search_term, policy_filter))
+        except Exception as e:
+            logger.error(f"Error counting customers: {e}")
+            return 0
+
     def get_customers(self):
         """Get all customers"""
         try:
-            self.cursor.execute("SELECT * FROM customers")
-            customers = self.cursor.fetchall()
-            # Decrypt SSNs for all customers
-            decrypted_customers = []
-            for customer in customers:
-                # Convert to list to modify the SSN field
-                customer = list(customer)
-                if customer[7]:  # SSN is at index 7
-                    customer[7] = self.decrypt_ssn(customer[7])
-                decrypted_customers.append(customer)
-            return decrypted_customers
+            return list(self.iter_customers())
         except Exception as e:
             logger.error(f"Error getting customers: {e}")
             return []
 
+    def filter_customers(self, search_term=None, policy_filter='All'):
+        """Get customers whose name or email matches the search term
+
+        policy_filter is one of 'All', 'With Policies' or 'Without Policies'.
+        """
+        try:
+            return list(self.iter_customers(search_term, policy_filter))
+        except Exception as e:
+            logger.error(f"Error filtering customers: {e}")
+            return []
+
+    def get_customers_page(self, after_id=None, limit=PAGE_SIZE, sort_key='id', search_term=None,
+                           policy_filter='All', offset=None, columns=None, after_value=None):
+        """Get the page of customers following the customer with id after_id and sort_key value after_value"""
+        try:
+            return list(self.iter_customers(search_term, policy_filter, sort_key, after_id, limit,
+                                            offset=offset, columns=columns, after_value=after_value))
+        except Exception as e:
+            logger.error(f"Error getting customers page: {e}")
+            return []
+
     def get_all_customers(self):
         """Alias for get_customers"""
         return self.get_customers()
 
+    def _policies_query(self, select, customer_id=None, search_term=None, policy_type='All', status='All'):
+        """Build the filter query shared by policy listings and counts"""
+        query = FilterQuery(select)
+        query.equals("p.customer_id", customer_id)
+        query.search(["p.policy_number", "p.policy_type"], search_term)
+        query.equals("p.policy_type", policy_type)
+        query.equals("p.status", status)
+        return query
+
+    def iter_policies(self, customer_id=None, search_term=None, policy_type='All', status='All',
+                      sort_key='id', after_id=None, limit=None, batch_size=None,
+                      with_customer_names=False, offset=None, columns=None, after_value=None):
+        """Stream policies as Policy records in sort_key order
+
+        search_term matches the policy number or type. With with_customer_names
+        each row also carries the customer's full name as customer_name, joined
+        in the same query. after_id, after_value and limit select a keyset
+        page. columns limits the columns fetched, as with iter_claims. Errors
+        are raised to the caller.
+        """
+        if columns is not None and with_customer_names:
+            columns = tuple(columns) + ('customer_name',)
+        if with_customer_names and columns is None:
+            select = "SELECT p.*, c.first_name || ' ' || c.last_name AS customer_name FROM policies p"
+        else:
+            select = f"SELECT {_projection('policies', 'p', Policy, columns)} FROM policies p"
+        if with_customer_names or 'customer_name' in (columns or ()):
+            select += " JOIN customers c ON c.id = p.customer_id"
+        query = self._policies_query(select, customer_id, search_term, policy_type, status)
+        query.paginate('policies', 'p', sort_key, after_id, limit, offset, after_value)
+        yield from self._iter_query(query, batch_size, Policy)
+
+    def count_policies(self, search_term=None, policy_type='All', status='All'):
+        """Count the policies matching the same criteria as filter_policies"""
+        try:
+            return self._count(self._policies_query("SELECT COUNT(*) FROM policies p", None,
+                                                    search_term, policy_type, status))
+        except Exception as e:
+            logger.error(f"Error counting policies: {e}")
+            return 0
+
     def get_policies(self, customer_id=None):
         """Get all policies or policies for a specific customer"""
         try:
-            if customer_id:
-                self.cursor.execute("SELECT * FROM policies WHERE customer_id = ?", (customer_id,))
-            else:
-                self.cursor.execute("SELECT * FROM policies")
-            return self.cursor.fetchall()
+            return list(self.iter_policies(customer_id))
         except Exception as e:
             logger.error(f"Error getting policies: {e}")
             return []
@@ -158,68 +972,252 @@ class Database:
         """Alias for get_policies"""
         return self.get_policies()
 
-    def get_claims(self, policy_id=None):
-        """Get all claims or claims for a specific policy"""
+    def filter_policies(self, search_term=None, policy_type='All', status='All'):
+        """Get policies whose number or type matches the search term"""
         try:
-            if policy_id:
-                self.cursor.execute("SELECT * FROM claims WHERE policy_id = ? ORDER BY id", (policy_id,))
-            else:
-                self.cursor.execute("SELECT * FROM claims ORDER BY id")
-            claims = self.cursor.fetchall()
+            return list(self.iter_policies(search_term=search_term, policy_type=policy_type, status=status))
+        except Exception as e:
+            logger.error(f"Error filtering policies: {e}")
+            return []
+
+    def get_policies_with_customer_names(self, search_term=None, policy_type='All', status='All'):
+        """Get policies joined with their customer's name in a single query
+
+        Each row has the policy columns plus customer_name, and the same
+        search and filter criteria as filter_policies apply.
+        """
+        try:
+            return list(self.iter_policies(search_term=search_term, policy_type=policy_type, status=status,
+                                           with_customer_names=True))
+        except Exception as e:
+            logger.error(f"Error getting policies with customer names: {e}")
+            return []
+
+    def get_policies_page(self, after_id=None, limit=PAGE_SIZE, sort_key='id', search_term=None,
+                          policy_type='All', status='All', offset=None, columns=None, after_value=None):
+        """Get the page of policies, with customer names, following the policy with id after_id"""
+        try:
+            return list(self.iter_policies(None, search_term, policy_type, status, sort_key, after_id, limit,
+                                           with_customer_names=True, offset=offset, columns=columns,
+                                           after_value=after_value))
+        except Exception as e:
+            logger.error(f"Error getting policies page: {e}")
+            return []
+
+    def _claims_query(self, select, policy_id=None, search_term=None, status='All'):
+        """Build the filter query shared by claim listings and counts"""
+        query = FilterQuery(select)
+        query.equals("cl.policy_id", policy_id)
+        query.search(["cl.claim_number", "cl.description", "cl.incident_location"], search_term)
+        query.equals("cl.status", status)
+        return query
 
-            # Convert to list of dictionaries for easier access
-            result = []
-            for claim in claims:
-                claim_dict = dict(claim)
-                status = claim_dict['status']
-                logger.info(f"Retrieved claim {claim_dict['id']} with status: {status}")
+    def iter_claims(self, policy_id=None, search_term=None, status='All', sort_key='id', after_id=None,
+                    limit=None, batch_size=None, with_policy=False, offset=None, columns=None, after_value=None):
+        """Stream claims as Claim records in sort_key order
 
-                # If status is None, update it to pending
-                if status is None:
-                    logger.warning(f"Claim {claim_dict['id']} has None status, updating to 'pending'")
-                    self.update_claim_status(claim_dict['id'], 'pending')
-                    claim_dict['status'] = 'pending'
+        search_term matches the claim number, description or incident location.
+        With with_policy each claim also carries its policy's policy_number and
+        policy_type, joined in the same query. after_id, after_value and limit
+        select a keyset page: after_value is the sort_key value of the row
+        with id after_id when sorting by another column.
 
-                result.append(claim_dict)
+        columns names the columns a view needs, e.g. description_preview in
+        place of the full description; id is always included and the records
+        only have the columns asked for. Errors are raised to the caller.
+        """
+        if columns is not None and with_policy:
+            columns = tuple(columns) + ('policy_number', 'policy_type')
+        if with_policy and columns is None:
+            select = "SELECT cl.*, p.policy_number, p.policy_type FROM claims cl"
+        else:
+            select = f"SELECT {_projection('claims', 'cl', Claim, columns)} FROM claims cl"
+        if with_policy or {'policy_number', 'policy_type'} & set(columns or ()):
+            select += " JOIN policies p ON p.id = cl.policy_id"
+        query = self._claims_query(select, policy_id, search_term, status)
+        query.paginate('claims', 'cl', sort_key, after_id, limit, offset, after_value)
+        yield from self._iter_query(query, batch_size, Claim)
+
+    def count_claims(self, search_term=None, status='All'):
+        """Count the claims matching the same criteria as filter_claims"""
+        try:
+            return self._count(self._claims_query("SELECT COUNT(*) FROM claims cl", None, search_term, status))
+        except Exception as e:
+            logger.error(f"Error counting claims: {e}")
+            return 0
 
-            return result
+    def get_claims(self, policy_id=None):
+        """Get all claims or claims for a specific policy"""
+        try:
+            return list(self.iter_claims(policy_id))
         except Exception as e:
             logger.error(f"Error getting claims: {e}")
             return None
 
+    def claim_groups(self, group_by='status'):
+        """Stream claims with the totals of their group, ordered by group and then id
+
+        Each row has group_name, claim_count, total_amount and average_amount,
+        aggregated by SQLite in a GROUP BY, alongside the claim's claim_number
+        and claim_amount, so a report can be written in one pass over the rows.
+        group_by is a key of CLAIM_GROUPINGS. Errors are raised to the caller.
+        """
+        if group_by not in CLAIM_GROUPINGS:
+            raise DatabaseError(f"Cannot group claims by {group_by!r}")
+        expression, join = CLAIM_GROUPINGS[group_by]
+        query = FilterQuery(f"""
+            SELECT g.group_name, g.claim_count, g.total_amount, g.average_amount, cl.claim_number, cl.claim_amount
+            FROM claims cl{join}
+            JOIN (
+                SELECT {expression} AS group_name, COUNT(*) AS claim_count, SUM(cl.claim_amount) AS total_amount,
+                       AVG(cl.claim_amount) AS average_amount
+                FROM claims cl{join}
+                GROUP BY {expression}
+            ) g ON g.group_name IS {expression}
+        """, order_by="g.group_name, cl.id")
+        yield from self._iter_query(query)
+
+    def repair_claim_statuses(self):
+        """Set every claim with a missing status to pending in a single UPDATE
+
+        A maintenance routine for databases written before status was
+        enforced. Returns the ids of the claims it changed.
+        """
+        try:
+            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            with self.transaction() as conn:
+                repaired = [row[0] for row in conn.execute("""
+                    UPDATE claims SET status = 'pending', updated_at = ?
+                    WHERE status IS NULL
+                    RETURNING id
+                """, (current_time,)).fetchall()]
+            if repaired:
+                self._forget('claims')
+                logger.warning(f"Set {len(repaired)} claims with no status to 'pending': {repaired}")
+            return repaired
+        except Exception as e:
+            logger.error(f"Error repairing claim statuses: {e}")
+            return []
+
+    def financial_totals(self):
+        """The financial ledger's running totals: entry, policy_type, status, row_count and amount
+
+        Read from the trigger-maintained ledger, so the cost depends on the
+        number of groups rather than on the number of policies and claims.
+        """
+        try:
+            with self.reader() as conn:
+                return conn.execute("""
+                    SELECT entry, policy_type, status, row_count, amount FROM financial_ledger
+                    WHERE row_count != 0
+                    ORDER BY entry, policy_type, status
+                """).fetchall()
+        except Exception as e:
+            logger.error(f"Error getting financial totals: {e}")
+            return []
+
+    def rebuild_financial_ledger(self):
+        """Recompute the financial ledger's totals from scratch"""
+        try:
+            with self.transaction() as conn:
+                if ledger.needs_install(conn):
+                    ledger.install(conn)
+                else:
+                    ledger.rebuild(conn)
+            logger.info("Rebuilt the financial ledger")
+            return True
+        except Exception as e:
+            logger.error(f"Error rebuilding financial ledger: {e}")
+            return False
+
     def get_all_claims(self):
         """Alias for get_claims"""
         return self.get_claims()
 
-    def create_customer(self, first_name, last_name, email, phone=None, address=None, dob=None, ssn=None):
+    def filter_claims(self, search_term=None, status='All'):
+        """Get claims whose number, description or location matches the search term"""
+        try:
+            return list(self.iter_claims(search_term=search_term, status=status))
+        except Exception as e:
+            logger.error(f"Error filtering claims: {e}")
+            return []
+
+    def get_claims_with_policy(self, search_term=None, status='All'):
+        """Get claims joined with their policy's number and type in a single query
+
+        Each row is a Claim with the claim columns plus policy_number and
+        policy_type, and the same search and filter criteria as filter_claims apply.
+        """
+        try:
+            return list(self.iter_claims(search_term=search_term, status=status, with_policy=True))
+        except Exception as e:
+            logger.error(f"Error getting claims with policy: {e}")
+            return []
+
+    def get_claims_page(self, after_id=None, limit=PAGE_SIZE, sort_key='id', search_term=None, status='All',
+                        offset=None, columns=None, after_value=None):
+        """Get the page of claims, with policy details, following the claim with id after_id"""
+        try:
+            return list(self.iter_claims(None, search_term, status, sort_key, after_id, limit,
+                                         with_policy=True, offset=offset, columns=columns,
+                                         after_value=after_value))
+        except Exception as e:
+            logger.error(f"Error getting claims page: {e}")
+            return []
+
+    def export_rows(self, table, columns=None, batch_size=None):
+        """Stream a whole table for export, in id order, a fetchmany batch at a time
+
+        Returns the exported column names and a generator of row batches, so
+        only one batch is in memory however large the table. columns picks
+        the table's own columns and those of EXTRA_COLUMNS, with id always
+        first; None exports every column but those of EXPORT_EXCLUDED. The
+        rows are plain sqlite3 rows. Errors are raised to the caller.
+        """
+        if table not in EXPORT_SOURCES:
+            raise DatabaseError(f"Cannot export {table!r}")
+        alias, record, join = EXPORT_SOURCES[table]
+        if columns is None:
+            excluded = EXPORT_EXCLUDED.get(table, ())
+            columns = [slot for slot in record.__slots__ if not slot.startswith('_') and slot not in excluded]
+        select = f"SELECT {_projection(table, alias, record, columns)} FROM {table} {alias}"
+        names = ['id'] + [column for column in dict.fromkeys(columns) if column != 'id']
+        if set(names) & set(EXTRA_COLUMNS[table]):
+            select += join
+        return names, self._iter_batches(FilterQuery(select, order_by=f"{alias}.id"), batch_size)
+
+    def create_customer(self, first_name, last_name, email, phone=None, address=None, dob=None, ssn=None,
+                        wait=True):
         """Create a new customer"""
         try:
             # Encrypt SSN before storing
             encrypted_ssn = self.encrypt_ssn(ssn) if ssn else None
 
-            self.cursor.execute("""
-                INSERT INTO customers (first_name, last_name, email, phone, address, date_of_birth, ssn_encrypted)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (first_name, last_name, email, phone, address, dob, encrypted_ssn))
-            self.conn.commit()
-            return self.cursor.lastrowid
+            return self._write("""
+                INSERT INTO customers (first_name, last_name, email, phone, address, date_of_birth,
+                                       ssn_encrypted, ssn_index)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (first_name, last_name, email, phone, address, dob, encrypted_ssn, self.ssn_index(ssn)), wait,
+                'customers')
         except Exception as e:
             logger.error(f"Error creating customer: {e}")
             return None
 
     def create_policy(self, customer_id, policy_type, policy_number, start_date, end_date,
                       premium, coverage_limit, status='active', payment_schedule=None, beneficiary_info=None,
-                      exclusions=None):
-        """Create a new policy"""
+                      exclusions=None, wait=True):
+        """Create a new policy, allocating a policy number if none is given"""
         try:
-            self.cursor.execute("""
+            policy_number = policy_number or self.get_next_policy_number()
+            if not policy_number:
+                return None
+
+            return self._write("""
                 INSERT INTO policies (customer_id, policy_type, policy_number, start_date, end_date,
                                     premium, coverage_limit, status, payment_schedule, beneficiary_info, exclusions)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (customer_id, policy_type, policy_number, start_date, end_date,
-                  premium, coverage_limit, status, payment_schedule, beneficiary_info, exclusions))
-            self.conn.commit()
-            return self.cursor.lastrowid
+                  premium, coverage_limit, status, payment_schedule, beneficiary_info, exclusions), wait, 'policies')
         except Exception as e:
             logger.error(f"Error creating policy: {e}")
             return None
@@ -227,22 +1225,21 @@ class Database:
     def get_next_claim_number(self):
         """Generate the next claim number in sequence"""
         try:
-            # Get the highest claim number
-            self.cursor.execute("SELECT MAX(claim_number) FROM claims")
-            result = self.cursor.fetchone()
-            if not result or not result[0]:
-                return "CLM-001"
-
-            # Extract the number part and increment
-            last_number = int(result[0].split('-')[1])
-            next_number = last_number + 1
-            return f"CLM-{next_number:03d}"
+            return self.sequences.next_number('claim_number', self._unit_conn())
         except Exception as e:
             logger.error(f"Error generating claim number: {e}")
             return None
 
+    def get_next_policy_number(self):
+        """Generate the next policy number in sequence"""
+        try:
+            return self.sequences.next_number('policy_number', self._unit_conn())
+        except Exception as e:
+            logger.error(f"Error generating policy number: {e}")
+            return None
+
     def create_claim(self, policy_id, claim_date, incident_date, incident_time,
-                     incident_location, description, claim_amount, status):
+                     incident_location, description, claim_amount, status, wait=True):
         """Create a new claim"""
         try:
             # Generate claim number
@@ -260,44 +1257,138 @@ class Database:
             logger.info(f"Creating claim with status: {status}")
 
             # Insert the claim with the status
-            self.cursor.execute("""
+            return self._write("""
                 INSERT INTO claims (policy_id, claim_number, claim_date, incident_date, incident_time,
                                   incident_location, description, claim_amount, status)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (policy_id, claim_number, claim_date, incident_date, incident_time,
-                  incident_location, description, claim_amount, status))
-            self.conn.commit()
-
-            # Verify the status was inserted correctly
-            claim_id = self.cursor.lastrowid
-            self.cursor.execute("SELECT status FROM claims WHERE id = ?", (claim_id,))
-            inserted_status = self.cursor.fetchone()[0]
-            logger.info(f"Verified claim {claim_id} status: {inserted_status}")
-
-            return claim_id
+                  incident_location, description, claim_amount, status), wait, 'claims')
         except Exception as e:
             logger.error(f"Error creating claim: {e}")
             return None
 
-    def update_claim_status(self, claim_id, new_status):
-        """Update claim status"""
+    def create_claims(self, claims):
+        """Create many claims in one transaction
+
+        Each claim is a dict with the arguments of create_claim; status
+        defaults to 'pending'. Claims are validated before anything is
+        written and invalid ones are skipped rather than defaulted. Returns
+        (ids, errors): ids lines up with the input, holding None for claims
+        that were not created, and errors maps their index to the reason.
+        """
+        claims = list(claims)
+        ids, errors = [None] * len(claims), {}
+        valid_statuses = frozenset(status.value for status in ClaimStatus)
+        default_status = ClaimStatus.PENDING.value
+        claim_values = itemgetter(*CLAIM_FIELDS)
+        try:
+            # One pass builds each valid claim's parameters as a tuple, less its claim number
+            checked = []
+            for index, claim in enumerate(claims):
+                try:
+                    values = claim_values(claim)
+                except KeyError:
+                    values = tuple(map(claim.get, CLAIM_FIELDS))
+                if None in values or '' in values:
+                    missing = [field for field, value in zip(CLAIM_FIELDS, values) if value in (None, '')]
+                    errors[index] = f"Missing {', '.join(missing)}"
+                    continue
+                status = claim.get('status') or default_status
+                if status not in valid_statuses:
+                    errors[index] = f"Invalid status: {status}"
+                    continue
+                if type(values[0]) is not int or type(values[-1]) is not float:
+                    try:
+                        values = (int(values[0]),) + values[1:-1] + (float(values[-1]),)
+                    except (TypeError, ValueError) as e:
+                        errors[index] = f"Invalid policy or claim amount: {e}"
+                        continue
+                checked.append((index, values + (status,)))
+
+            # Look up all the referenced policies in one query
+            policy_ids = {values[0] for _, values in checked}
+            with self.reader() as conn:
+                known_policies = {row[0] for row in conn.execute(
+                    "SELECT id FROM policies WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(sorted(policy_ids)),))}
+            rows = checked
+            if known_policies != policy_ids:
+                rows = []
+                for index, values in checked:
+                    if values[0] in known_policies:
+                        rows.append((index, values))
+                    else:
+                        errors[index] = f"Unknown policy: {values[0]}"
+
+            if not rows:
+                return ids, errors
+
+            claim_number = f"{NUMBER_SEQUENCES['claim_number'][1]}%0{NUMBER_WIDTH}d"
+            numbers = self.sequences.allocate('claim_number', len(rows), self._unit_conn())
+            params = [values + (claim_number % number,) for (_, values), number in zip(rows, numbers)]
+
+            # Hold the write lock from the start so the new ids follow the highest existing one
+            with self.transaction() as conn:
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM claims").fetchone()[0]
+                # Total the batch in the ledger once rather than row by row in its triggers
+                with ledger.suspended(conn, 'claims'):
+                    conn.executemany("""
+                        INSERT INTO claims (policy_id, claim_date, incident_date, incident_time, incident_location,
+                                          description, claim_amount, status, claim_number)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, params)
+                    ledger.post_new(conn, 'claims', last_id)
+                # Nothing else writes while the lock is held, so the batch took consecutive ids up to the highest
+                high_id = conn.execute("SELECT MAX(id) FROM claims").fetchone()[0]
+            new_ids = range(high_id - len(params) + 1, high_id + 1)
+
+            for (index, _), claim_id in zip(rows, new_ids):
+                ids[index] = claim_id
+            logger.info(f"Created {len(new_ids)} claims, rejected {len(errors)}")
+            return ids, errors
+        except Exception as e:
+            logger.error(f"Error creating claims: {e}")
+            if self._unit_conn() is not None:
+                self._unit.failed = True
+            for index, _ in rows:
+                ids[index] = None
+                errors[index] = str(e)
+            return ids, errors
+
+    def update_claim_status(self, claim_id, new_status, wait=True):
+        """Update claim status, or return a future that completes once it is committed when not waiting"""
         try:
             current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            self.cursor.execute("""
+            future = self._write("""
                 UPDATE claims SET status = ?, updated_at = ?
                 WHERE id = ?
-            """, (new_status, current_time, claim_id))
-            self.conn.commit()
+            """, (new_status, current_time, claim_id), wait=False, table='claims', key=claim_id)
+            if not wait:
+                return future
+            future.result()
             return True
         except Exception as e:
             logger.error(f"Error updating claim status: {e}")
             return False
 
+    def get_claim(self, claim_id, columns=None):
+        """Get a single claim by ID, optionally only the given columns as in iter_claims"""
+        try:
+            if columns is None:
+                return self._cached('claims', claim_id, self._load_claim)
+            return self._fetch_record(Claim, f"SELECT {_projection('claims', 'cl', Claim, columns)} "
+                                             f"FROM claims cl WHERE cl.id = ?", (claim_id,))
+        except Exception as e:
+            logger.error(f"Error getting claim: {e}")
+            return None
+
+    def _load_claim(self, claim_id):
+        return self._fetch_record(Claim, "SELECT * FROM claims WHERE id = ?", (claim_id,))
+
     def get_claim_by_number(self, claim_number):
         """Get claim by claim number"""
         try:
-            self.cursor.execute("SELECT * FROM claims WHERE claim_number = ?", (claim_number,))
-            return self.cursor.fetchone()
+            return self._fetch_record(Claim, "SELECT * FROM claims WHERE claim_number = ?", (claim_number,))
         except Exception as e:
             logger.error(f"Error getting claim: {e}")
             return None
@@ -305,12 +1396,12 @@ class Database:
     def get_claim_audit_logs(self, claim_id):
         """Get audit logs for a claim"""
         try:
-            self.cursor.execute("""
-                SELECT * FROM audit_log 
-                WHERE table_name = 'claims' AND record_id = ?
-                ORDER BY created_at
-            """, (claim_id,))
-            return self.cursor.fetchall()
+            with self.reader() as conn:
+                return conn.execute("""
+                    SELECT * FROM audit_log 
+                    WHERE table_name = 'claims' AND record_id = ?
+                    ORDER BY created_at
+                """, (claim_id,)).fetchall()
         except Exception as e:
             logger.error(f"Error getting claim audit logs: {e}")
             return []
@@ -318,8 +1409,8 @@ class Database:
     def verify_user(self, username, password):
         """Verify user credentials"""
         try:
-            self.cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-            user = self.cursor.fetchone()
+            with self.reader() as conn:
+                user = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
             if user:
                 # Convert the stored password hash from string to bytes
                 stored_hash = user[2].encode('utf-8')
@@ -334,33 +1425,81 @@ class Database:
     def get_customer(self, customer_id):
         """Get a single customer by ID"""
         try:
-            self.cursor.execute("SELECT * FROM customers WHERE id = ?", (customer_id,))
-            customer = self.cursor.fetchone()
-            if customer:
-                # Convert to list to modify the SSN field
-                customer = list(customer)
-                # Decrypt SSN if it exists
-                if customer[7]:  # SSN is at index 7
-                    customer[7] = self.decrypt_ssn(customer[7])
-            return customer
+            return self._cached('customers', customer_id, self._load_customer)
         except Exception as e:
             logger.error(f"Error getting customer: {e}")
             return None
 
+    def _load_customer(self, customer_id):
+        return self._fetch_record(Customer, "SELECT * FROM customers WHERE id = ?", (customer_id,),
+                                  _decrypt=self.decrypt_ssn)
+
+    def find_customer_by_ssn(self, ssn):
+        """Find a customer by SSN through the blind index, without decrypting any rows"""
+        try:
+            ssn_index = self.ssn_index(ssn)
+            if not ssn_index:
+                return None
+            return self._fetch_record(Customer, "SELECT * FROM customers WHERE ssn_index = ? ORDER BY id LIMIT 1",
+                                      (ssn_index,), _decrypt=self.decrypt_ssn)
+        except Exception as e:
+            logger.error(f"Error finding customer by SSN: {e}")
+            return None
+
+    def backfill_ssn_index(self, batch_size=None):
+        """Fill in the SSN blind index of customers stored without one
+
+        Rows are decrypted and updated a batch at a time, each batch in its own
+        transaction. Returns the number of customers indexed.
+        """
+        batch_size = batch_size or FETCH_BATCH_SIZE
+        indexed, last_id = 0, 0
+        try:
+            while True:
+                with self.reader() as conn:
+                    rows = conn.execute("""
+                        SELECT id, ssn_encrypted FROM customers
+                        WHERE id > ? AND ssn_index IS NULL AND ssn_encrypted IS NOT NULL
+                        ORDER BY id LIMIT ?
+                    """, (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                ssns = self.decrypt_ssns([row[1] for row in rows])
+                updates = [(self.ssn_index(ssn), row[0]) for row, ssn in zip(rows, ssns) if ssn]
+                with self.transaction() as conn:
+                    conn.executemany("UPDATE customers SET ssn_index = ? WHERE id = ?", updates)
+                indexed += len(updates)
+                last_id = rows[-1][0]
+            self._forget('customers')
+            logger.info(f"Indexed the SSNs of {indexed} customers")
+            return indexed
+        except Exception as e:
+            logger.error(f"Error backfilling SSN index: {e}")
+            return indexed
+
     def get_policy(self, policy_id):
         """Get a single policy by ID"""
         try:
-            self.cursor.execute("""
-                SELECT * FROM policies 
-                WHERE id = ?
-            """, (policy_id,))
-            return self.cursor.fetchone()
+            return self._cached('policies', policy_id, self._load_policy)
         except Exception as e:
             logger.error(f"Error getting policy: {str(e)}")
             return None
 
+    def _load_policy(self, policy_id):
+        return self._fetch_record(Policy, "SELECT * FROM policies WHERE id = ?", (policy_id,))
+
     def close(self):
-        """Close the database connection"""
-        if self.conn:
+        """Close the database connection, or drain and close the pool"""
+        if self.write_queue:
+            self.write_queue.close()
+        self.sequences.close()
+        if self.pool:
+            self.pool.close()
+            logger.info("Database connection pool closed")
+        elif self.conn:
             self.conn.close()
-            logger.info("Database connection closed")
\ No newline at end of file
+            logger.info("Database connection closed")
+        with self._unit_lock:
+            if self._unit_writer is not None:
+                self._unit_writer.close()
+                self._unit_writer = None
\ No newline at end of file
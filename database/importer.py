@@ -0,0 +1,224 @@
+import csv
+import logging
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+
+from . import ledger
+from .db import NUMBER_SEQUENCES, NUMBER_WIDTH, PolicyStatus, PolicyType, encrypt_values
+
+logger = logging.getLogger(__name__)
+
+# Rows read, validated and committed together
+IMPORT_CHUNK_SIZE = 5000
+
+CUSTOMER_REQUIRED = ('first_name', 'last_name', 'email')
+POLICY_REQUIRED = ('customer_email', 'policy_type', 'start_date', 'end_date', 'premium',
+                   'coverage_limit', 'payment_schedule')
+
+
+class BulkImporter:
+    """Loads customers and policies from CSV files
+
+    The file is read in chunks of chunk_size rows. Each chunk is validated,
+    its SSNs are encrypted in one batch (split across a process pool when
+    workers > 1) and it is inserted with executemany in its own transaction.
+    Should a chunk hit a constraint, such as an email that is already taken,
+    it is retried row by row so only the offending rows are rejected.
+
+    Rejected rows are written to error_path with an extra error column.
+    Throughput is reported after every chunk, to progress(stats) if given and
+    to the log otherwise.
+
+    Customer files have the columns first_name, last_name, email, phone,
+    address, date_of_birth and ssn. Policy files refer to their customer by
+    customer_email, matched exactly as the email's UNIQUE constraint compares
+    it, case included, and have the remaining columns of create_policy; a
+    blank policy_number is allocated and a blank status means active.
+    """
+
+    def __init__(self, db, chunk_size=IMPORT_CHUNK_SIZE, workers=0, progress=None):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.progress = progress
+        self._pool = None
+        self._customer_ids = None
+
+    def import_customers(self, csv_path, error_path=None):
+        """Import a customer CSV file, returning the import statistics"""
+        sql = """
+            INSERT INTO customers (first_name, last_name, email, phone, address, date_of_birth, ssn_encrypted,
+                                   ssn_index)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            return self._import('customers', csv_path, error_path, self._prepare_customers, sql)
+        finally:
+            if self._pool:
+                self._pool.shutdown()
+                self._pool = None
+
+    def import_policies(self, csv_path, error_path=None):
+        """Import a policy CSV file, returning the import statistics"""
+        # Resolve every customer email with one pass over the table, case-sensitively like its UNIQUE constraint
+        with self.db.reader() as conn:
+            self._customer_ids = {email: customer_id for customer_id, email in
+                                  conn.execute("SELECT id, email FROM customers")}
+        sql = """
+            INSERT INTO policies (customer_id, policy_type, policy_number, start_date, end_date,
+                                premium, coverage_limit, status, payment_schedule, beneficiary_info, exclusions)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        try:
+            return self._import('policies', csv_path, error_path, self._prepare_policies, sql)
+        finally:
+            self._customer_ids = None
+
+    def _import(self, table, csv_path, error_path, prepare, sql):
+        stats = {'table': table, 'read': 0, 'imported': 0, 'rejected': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+        started = time.perf_counter()
+        error_file = error_writer = None
+        try:
+            with open(csv_path, newline='') as f:
+                reader = csv.DictReader(f)
+                while True:
+                    chunk = list(islice(reader, self.chunk_size))
+                    if not chunk:
+                        break
+                    rows, values, rejected = prepare(chunk)
+                    rejected += self._insert(table, sql, rows, values)
+
+                    if rejected and error_path:
+                        if error_writer is None:
+                            error_file = open(error_path, 'w', newline='')
+                            error_writer = csv.DictWriter(error_file, fieldnames=reader.fieldnames + ['error'],
+                                                          extrasaction='ignore')
+                            error_writer.writeheader()
+                        error_writer.writerows(dict(row, error=error) for row, error in rejected)
+
+                    stats['read'] += len(chunk)
+                    stats['rejected'] += len(rejected)
+                    stats['imported'] = stats['read'] - stats['rejected']
+                    stats['seconds'] = time.perf_counter() - started
+                    stats['rows_per_second'] = stats['read'] / stats['seconds'] if stats['seconds'] else 0.0
+                    self._report(stats)
+        finally:
+            if error_file:
+                error_file.close()
+        return stats
+
+    def _report(self, stats):
+        if self.progress:
+            self.progress(dict(stats))
+        else:
+            logger.info(f"Imported {stats['imported']} {stats['table']} ({stats['rejected']} rejected), "
+                        f"{stats['rows_per_second']:.0f} rows/s")
+
+    def _insert(self, table, sql, rows, values):
+        """Insert one chunk in a transaction, returning the rows that were rejected
+
+        Ledger totals of the chunk are posted once for it, not row by row.
+        """
+        if not values:
+            return []
+        try:
+            with self.db.transaction() as conn:
+                last_id = self._last_id(conn, table)
+                with ledger.suspended(conn, table):
+                    conn.executemany(sql, values)
+                    self._post(conn, table, last_id)
+            return []
+        except sqlite3.IntegrityError:
+            pass
+
+        # Statement failures only undo that statement, so the rest of the chunk still commits together
+        rejected = []
+        with self.db.transaction() as conn:
+            last_id = self._last_id(conn, table)
+            with ledger.suspended(conn, table):
+                for row, params in zip(rows, values):
+                    try:
+                        conn.execute(sql, params)
+                    except sqlite3.IntegrityError as e:
+                        rejected.append((row, str(e)))
+                self._post(conn, table, last_id)
+        return rejected
+
+    @staticmethod
+    def _last_id(conn, table):
+        return conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+    @staticmethod
+    def _post(conn, table, last_id):
+        if table in ledger.TOTALS:
+            ledger.post_new(conn, table, last_id)
+
+    def _encrypt(self, ssns):
+        """Encrypt a chunk of SSNs, across the process pool if there is one"""
+        key = self.db.encryption_key
+        if self._pool is None or len(ssns) < self.workers:
+            return encrypt_values(key, ssns)
+        size = -(-len(ssns) // self.workers)
+        slices = [ssns[i:i + size] for i in range(0, len(ssns), size)]
+        return [value for batch in self._pool.map(encrypt_values, repeat(key), slices) for value in batch]
+
+    def _prepare_customers(self, chunk):
+        rows, values, rejected = [], [], []
+        for row in chunk:
+            row = {column: (value or '').strip() for column, value in row.items() if column}
+            missing = [column for column in CUSTOMER_REQUIRED if not row.get(column)]
+            if missing:
+                rejected.append((row, f"Missing {', '.join(missing)}"))
+                continue
+            rows.append(row)
+            values.append([row['first_name'], row['last_name'], row['email'], row.get('phone') or None,
+                           row.get('address') or None, row.get('date_of_birth') or None])
+
+        ssns = [row.get('ssn') for row in rows]
+        for params, ssn, encrypted in zip(values, ssns, self._encrypt(ssns)):
+            params.extend((encrypted, self.db.ssn_index(ssn)))
+        return rows, values, rejected
+
+    def _prepare_policies(self, chunk):
+        policy_types = {policy_type.value for policy_type in PolicyType}
+        statuses = {status.value for status in PolicyStatus}
+        rows, values, rejected = [], [], []
+        for row in chunk:
+            row = {column: (value or '').strip() for column, value in row.items() if column}
+            missing = [column for column in POLICY_REQUIRED if not row.get(column)]
+            if missing:
+                rejected.append((row, f"Missing {', '.join(missing)}"))
+                continue
+            customer_id = self._customer_ids.get(row['customer_email'])
+            policy_type = row['policy_type'].upper()
+            status = (row.get('status') or PolicyStatus.ACTIVE.value).lower()
+            if customer_id is None:
+                rejected.append((row, f"Unknown customer: {row['customer_email']}"))
+                continue
+            if policy_type not in policy_types:
+                rejected.append((row, f"Invalid policy type: {row['policy_type']}"))
+                continue
+            if status not in statuses:
+                rejected.append((row, f"Invalid status: {row['status']}"))
+                continue
+            try:
+                premium = float(row['premium'])
+                coverage_limit = float(row['coverage_limit'])
+            except ValueError as e:
+                rejected.append((row, f"Invalid amount: {e}"))
+                continue
+            rows.append(row)
+            values.append([customer_id, policy_type, row.get('policy_number') or None, row['start_date'],
+                           row['end_date'], premium, coverage_limit, status, row['payment_schedule'],
+                           row.get('beneficiary_info') or None, row.get('exclusions') or None])
+
+        unnumbered = [params for params in values if params[2] is None]
+        if unnumbered:
+            prefix = NUMBER_SEQUENCES['policy_number'][1]
+            for params, number in zip(unnumbered, self.db.sequences.allocate('policy_number', len(unnumbered))):
+                params[2] = f"{prefix}{number:0{NUMBER_WIDTH}d}"
+        return rows, values, rejected
@@ -0,0 +1,222 @@
+"""Running financial totals kept by SQLite triggers
+
+financial_ledger holds one row per entry kind, policy type and status with
+the number of rows and their total amount:
+
+    premium          policies by policy type and policy status, summing premium
+    claim            claims by their policy's type and claim status, summing claim_amount
+    premium_payment  premium payments by their policy's type and payment status
+    claim_payment    claim payments by their claim's policy type and payment status
+
+Triggers on the four source tables post every insert, update and delete to
+the ledger in the same transaction, so reading the totals costs one row per
+group however many policies and claims there are. Policies carry no branch,
+so the totals cannot be broken down by one.
+
+Bulk inserts skip the per-row work: within suspended() a control row in
+financial_ledger_suspended, written inside the batch's transaction and so
+never seen by other connections, turns the table's insert trigger off, and
+post_new() adds the new rows' totals with one grouped upsert per batch.
+
+Should the ledger drift, e.g. after rows were changed with the triggers
+dropped, rebuild it from the source tables with:
+
+    python -m database.ledger [db_path]
+"""
+import sys
+from contextlib import contextmanager
+
+LEDGER_TABLE = """
+    CREATE TABLE IF NOT EXISTS financial_ledger (
+        entry TEXT NOT NULL,
+        policy_type TEXT NOT NULL,
+        status TEXT NOT NULL,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (entry, policy_type, status)
+    ) WITHOUT ROWID
+"""
+
+# Source tables whose insert triggers a bulk insert has turned off for its transaction
+SUSPENDED_TABLE = """
+    CREATE TABLE IF NOT EXISTS financial_ledger_suspended (
+        source TEXT PRIMARY KEY
+    ) WITHOUT ROWID
+"""
+
+# Tables the ledger totals, which must exist before its triggers can be created
+SOURCE_TABLES = ('policies', 'claims', 'premium_payments', 'claim_payments')
+
+
+def _policy_type(policy_id):
+    return f"COALESCE((SELECT policy_type FROM policies WHERE id = {policy_id}), '')"
+
+
+def _claim_policy_type(claim_id):
+    return (f"COALESCE((SELECT p.policy_type FROM claims cl JOIN policies p ON p.id = cl.policy_id "
+            f"WHERE cl.id = {claim_id}), '')")
+
+
+def _post(entry, policy_type, status, sign, amount):
+    """Add one row's amount to, or with sign -1 take it from, its ledger group"""
+    return f"""
+        INSERT INTO financial_ledger (entry, policy_type, status, row_count, amount)
+        VALUES ('{entry}', {policy_type}, COALESCE({status}, ''), {sign}, {sign} * COALESCE({amount}, 0))
+        ON CONFLICT (entry, policy_type, status) DO UPDATE SET
+            row_count = row_count + excluded.row_count, amount = amount + excluded.amount;"""
+
+
+def _move(entry, source, key, amount, status, old_type, new_type):
+    """Move the rows of source matching key from old_type's groups to new_type's"""
+    return f"""
+        INSERT INTO financial_ledger (entry, policy_type, status, row_count, amount)
+        SELECT '{entry}', moved.policy_type, COALESCE({status}, ''), moved.sign * COUNT(*),
+               moved.sign * COALESCE(SUM({amount}), 0)
+        FROM {source}, (SELECT {old_type} AS policy_type, -1 AS sign
+                        UNION ALL SELECT {new_type}, 1) AS moved
+        WHERE {key}
+        GROUP BY moved.policy_type, moved.sign, COALESCE({status}, '')
+        ON CONFLICT (entry, policy_type, status) DO UPDATE SET
+            row_count = row_count + excluded.row_count, amount = amount + excluded.amount;"""
+
+
+def _row_triggers(table, entry, columns, policy_type, status, amount):
+    """Insert, delete and update triggers posting each row of table to the ledger"""
+    old, new = (policy_type('OLD'), status('OLD'), amount('OLD')), (policy_type('NEW'), status('NEW'), amount('NEW'))
+    return {
+        f'ledger_{table}_insert': f"AFTER INSERT ON {table} "
+                                  f"WHEN NOT EXISTS (SELECT 1 FROM financial_ledger_suspended WHERE source = '{table}') "
+                                  f"BEGIN {_post(entry, *new[:2], 1, new[2])} END",
+        f'ledger_{table}_delete': f"AFTER DELETE ON {table} BEGIN {_post(entry, *old[:2], -1, old[2])} END",
+        f'ledger_{table}_update': f"AFTER UPDATE OF {columns} ON {table} BEGIN "
+                                  f"{_post(entry, *old[:2], -1, old[2])} {_post(entry, *new[:2], 1, new[2])} END",
+    }
+
+
+def _triggers():
+    triggers = {}
+    triggers.update(_row_triggers(
+        'policies', 'premium', 'policy_type, status, premium',
+        lambda row: f"{row}.policy_type", lambda row: f"{row}.status", lambda row: f"{row}.premium"))
+    triggers.update(_row_triggers(
+        'claims', 'claim', 'policy_id, status, claim_amount',
+        lambda row: _policy_type(f"{row}.policy_id"), lambda row: f"{row}.status",
+        lambda row: f"{row}.claim_amount"))
+    triggers.update(_row_triggers(
+        'premium_payments', 'premium_payment', 'policy_id, status, amount',
+        lambda row: _policy_type(f"{row}.policy_id"), lambda row: f"{row}.status", lambda row: f"{row}.amount"))
+    triggers.update(_row_triggers(
+        'claim_payments', 'claim_payment', 'claim_id, status, amount',
+        lambda row: _claim_policy_type(f"{row}.claim_id"), lambda row: f"{row}.status",
+        lambda row: f"{row}.amount"))
+
+    # Rows filed under a policy's type follow the policy, or the claim, to its new type
+    triggers['ledger_policies_retype'] = f"""
+        AFTER UPDATE OF policy_type ON policies WHEN OLD.policy_type IS NOT NEW.policy_type BEGIN
+        {_move('claim', 'claims', 'policy_id = NEW.id', 'claim_amount', 'status',
+               'OLD.policy_type', 'NEW.policy_type')}
+        {_move('premium_payment', 'premium_payments', 'policy_id = NEW.id', 'amount', 'status',
+               'OLD.policy_type', 'NEW.policy_type')}
+        {_move('claim_payment', 'claim_payments', 'claim_id IN (SELECT id FROM claims WHERE policy_id = NEW.id)',
+               'amount', 'status', 'OLD.policy_type', 'NEW.policy_type')}
+        END"""
+    triggers['ledger_claims_repolicy'] = f"""
+        AFTER UPDATE OF policy_id ON claims
+        WHEN {_policy_type('OLD.policy_id')} IS NOT {_policy_type('NEW.policy_id')} BEGIN
+        {_move('claim_payment', 'claim_payments', 'claim_id = NEW.id', 'amount', 'status',
+               _policy_type('OLD.policy_id'), _policy_type('NEW.policy_id'))}
+        END"""
+    return triggers
+
+
+LEDGER_TRIGGERS = _triggers()
+
+# The totals of each source table's rows matching {where}, as rows of the ledger
+TOTALS = {
+    'policies': """
+        SELECT 'premium', p.policy_type, COALESCE(p.status, ''), COUNT(*), COALESCE(SUM(p.premium), 0)
+        FROM policies p WHERE {where} GROUP BY 2, 3""",
+    'claims': """
+        SELECT 'claim', COALESCE(p.policy_type, ''), COALESCE(cl.status, ''), COUNT(*),
+               COALESCE(SUM(cl.claim_amount), 0)
+        FROM claims cl LEFT JOIN policies p ON p.id = cl.policy_id WHERE {where} GROUP BY 2, 3""",
+    'premium_payments': """
+        SELECT 'premium_payment', COALESCE(p.policy_type, ''), COALESCE(pp.status, ''), COUNT(*),
+               COALESCE(SUM(pp.amount), 0)
+        FROM premium_payments pp LEFT JOIN policies p ON p.id = pp.policy_id WHERE {where} GROUP BY 2, 3""",
+    'claim_payments': """
+        SELECT 'claim_payment', COALESCE(p.policy_type, ''), COALESCE(cp.status, ''), COUNT(*),
+               COALESCE(SUM(cp.amount), 0)
+        FROM claim_payments cp LEFT JOIN claims cl ON cl.id = cp.claim_id LEFT JOIN policies p ON p.id = cl.policy_id
+        WHERE {where} GROUP BY 2, 3""",
+}
+
+# Alias of each source table in TOTALS
+ALIASES = {'policies': 'p', 'claims': 'cl', 'premium_payments': 'pp', 'claim_payments': 'cp'}
+
+REBUILD = ["DELETE FROM financial_ledger"] + [
+    "INSERT INTO financial_ledger (entry, policy_type, status, row_count, amount)" + totals.format(where='true')
+    for totals in TOTALS.values()
+]
+
+
+def needs_install(conn):
+    """Whether the source tables exist but some of the ledger's tables or triggers do not"""
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    installed = {'financial_ledger', 'financial_ledger_suspended'} | set(LEDGER_TRIGGERS)
+    return set(SOURCE_TABLES) <= names and not installed <= names
+
+
+def install(conn):
+    """Create the ledger and its triggers, replacing those of older versions, then total up the existing rows"""
+    conn.execute(LEDGER_TABLE)
+    conn.execute(SUSPENDED_TABLE)
+    for name, body in LEDGER_TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+    rebuild(conn)
+
+
+def rebuild(conn):
+    """Recompute every total from the source tables"""
+    for sql in REBUILD:
+        conn.execute(sql)
+
+
+@contextmanager
+def suspended(conn, table):
+    """Insert into table in the block with its insert trigger off, on a connection inside a transaction
+
+    The block must post the totals of the rows it inserted itself, with
+    post_new. The control row turning the trigger off is written and
+    removed within the same transaction, which holds the write lock, so no
+    other connection ever writes with the trigger off. Tables the ledger
+    does not total are left alone.
+    """
+    if table not in TOTALS:
+        yield conn
+        return
+    conn.execute("INSERT INTO financial_ledger_suspended (source) VALUES (?)", (table,))
+    try:
+        yield conn
+    finally:
+        conn.execute("DELETE FROM financial_ledger_suspended WHERE source = ?", (table,))
+
+
+def post_new(conn, table, after_id):
+    """Add the rows of table with ids above after_id to the ledger, in one upsert per group"""
+    conn.execute(f"""
+        INSERT INTO financial_ledger (entry, policy_type, status, row_count, amount)
+        {TOTALS[table].format(where=f'{ALIASES[table]}.id > ?')}
+        ON CONFLICT (entry, policy_type, status) DO UPDATE SET
+            row_count = row_count + excluded.row_count, amount = amount + excluded.amount
+    """, (after_id,))
+
+
+if __name__ == '__main__':
+    from .db import Database
+
+    db = Database(*sys.argv[1:2])
+    if db.rebuild_financial_ledger():
+        print("Financial ledger rebuilt")
+    db.close()
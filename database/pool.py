@@ -0,0 +1,96 @@
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Read connections per thread and one writer connection for a SQLite database
+
+    Each thread reads through a connection of its own, opened the first time
+    it asks, so reads on different threads run in parallel and a long read
+    holds up nothing else. All writes go through a single writer connection
+    held exclusively for the length of a writer() block, which is how SQLite
+    wants writes serialised anyway. connect() opens a configured connection.
+
+    close() stops handing out connections, waits up to timeout seconds for
+    those in use to be released, and closes every connection the pool opened.
+    """
+
+    def __init__(self, connect, timeout=5):
+        self._connect = connect
+        self.timeout = timeout
+        self._local = threading.local()
+        self._readers = []
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._in_use = 0
+        self._state = threading.Condition()
+        self._closed = False
+
+    def _checkout(self):
+        if self._closed:
+            # What a closed sqlite3 connection raises too
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        self._in_use += 1
+
+    def _release(self):
+        with self._state:
+            self._in_use -= 1
+            self._state.notify_all()
+
+    @contextmanager
+    def reader(self):
+        """The calling thread's read connection"""
+        with self._state:
+            self._checkout()
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._in_use -= 1
+                    raise
+                self._local.conn = conn
+                self._readers.append(conn)
+        try:
+            yield conn
+        finally:
+            self._release()
+
+    @contextmanager
+    def writer(self):
+        """The writer connection, held by the calling thread until the block ends
+
+        Blocks nest on the same thread.
+        """
+        with self._write_lock:
+            with self._state:
+                self._checkout()
+                if self._writer is None:
+                    try:
+                        self._writer = self._connect()
+                    except Exception:
+                        self._in_use -= 1
+                        raise
+            try:
+                yield self._writer
+            finally:
+                self._release()
+
+    def close(self, timeout=None):
+        """Wait for connections in use to be released, then close them all"""
+        timeout = self.timeout if timeout is None else timeout
+        with self._state:
+            self._closed = True
+            if not self._state.wait_for(lambda: self._in_use == 0, timeout):
+                logger.warning(f"Closing the connection pool with {self._in_use} connections still in use")
+            connections = self._readers + ([self._writer] if self._writer else [])
+            self._readers, self._writer = [], None
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"Error closing pooled connection: {e}")
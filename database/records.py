@@ -0,0 +1,135 @@
+import keyword
+from functools import lru_cache
+
+
+class Record:
+    """Base of the slotted row classes returned by Database
+
+    A record keeps one row in slots named after its columns and reads like
+    the sqlite3.Row it replaces: by attribute, by column name or by position.
+    Subclasses declare the columns of their table in __slots__; record_type()
+    derives a class for the exact columns a query selects, adding slots for
+    extras such as joined names.
+    """
+
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if isinstance(key, slice):
+            return [self[i] for i in range(len(self._fields))[key]]
+        return getattr(self, self._fields[key])
+
+    def __setitem__(self, key, value):
+        setattr(self, key if isinstance(key, str) else self._fields[key], value)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self._fields)))
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return self._fields == other._fields and list(self) == list(other)
+
+    __hash__ = None
+
+    def keys(self):
+        return list(self._fields)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def as_dict(self):
+        return {name: self[name] for name in self._fields}
+
+    def __repr__(self):
+        values = ', '.join(f"{name}={getattr(self, name, None)!r}" for name in self._fields[:4])
+        return f"{type(self).__name__}({values}, ...)"
+
+
+class Customer(Record):
+    """A customer whose SSN is only decrypted when it is read
+
+    The SSN at index 7, also readable as ssn, comes back decrypted and is
+    decrypted at most once per record; ssn_encrypted is the stored ciphertext.
+    """
+
+    __slots__ = ('id', 'first_name', 'last_name', 'email', 'phone', 'address', 'date_of_birth',
+                 'ssn_encrypted', 'created_at', 'updated_at', 'ssn_index', '_decrypt', '_ssn')
+
+    SSN_INDEX = 7
+
+    @property
+    def ssn(self):
+        try:
+            return self._ssn
+        except AttributeError:
+            self._ssn = self._decrypt(self.ssn_encrypted) if self.ssn_encrypted else None
+            return self._ssn
+
+    def __getitem__(self, key):
+        if key == self.SSN_INDEX or key == 'ssn':
+            return self.ssn
+        return Record.__getitem__(self, key)
+
+
+class Policy(Record):
+    __slots__ = ('id', 'customer_id', 'policy_type', 'policy_number', 'start_date', 'end_date', 'premium',
+                 'coverage_limit', 'status', 'payment_schedule', 'beneficiary_info', 'exclusions',
+                 'created_at', 'updated_at')
+
+
+class Claim(Record):
+    __slots__ = ('id', 'policy_id', 'claim_number', 'claim_date', 'incident_date', 'incident_time',
+                 'incident_location', 'description', 'claim_amount', 'approved_amount', 'status',
+                 'adjuster_id', 'resolution_notes', 'settlement_date', 'created_at', 'updated_at')
+
+
+@lru_cache(maxsize=None)
+def record_type(base, columns):
+    """The subclass of base holding rows with exactly these columns, in this order"""
+    for column in columns:
+        if not column.isidentifier() or keyword.iskeyword(column) or column.startswith('_'):
+            raise ValueError(f"Column {column!r} cannot be a record attribute")
+    slots = {slot for cls in base.__mro__ for slot in getattr(cls, '__slots__', ())}
+
+    # Assign every column in one generated __init__, as namedtuple does
+    source = f"def __init__(self, {', '.join(columns)}):\n"
+    source += ''.join(f"    self.{column} = {column}\n" for column in columns) or "    pass\n"
+    namespace = {}
+    exec(source, namespace)
+
+    return type(base.__name__, (base,), {
+        '__slots__': tuple(column for column in columns if column not in slots),
+        '_fields': columns,
+        '__init__': namespace['__init__'],
+    })
+
+
+def row_factory(base, description, **attributes):
+    """A sqlite3 row factory building records of base for a cursor's columns
+
+    attributes are set on every record, e.g. the function that decrypts
+    a customer's SSN.
+    """
+    cls = record_type(base, tuple(column[0] for column in description))
+    if not attributes:
+        return lambda cursor, row: cls(*row)
+
+    def make(cursor, row):
+        record = cls(*row)
+        for name, value in attributes.items():
+            setattr(record, name, value)
+        return record
+    return make
@@ -0,0 +1,69 @@
+import sys
+
+# Characters of report text gathered before they are handed to a writer
+WRITE_CHUNK_SIZE = 64 * 1024
+
+
+class ReportCancelled(Exception):
+    """Raised by a writer whose report is no longer wanted"""
+
+
+class ReportWriter:
+    """Destination of a report written a chunk at a time
+
+    write() receives each chunk as it is produced and close() is called once
+    the report is finished or has failed.
+    """
+
+    def write(self, text):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class StreamWriter(ReportWriter):
+    """Writes a report to a text stream such as sys.stdout"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write(self, text):
+        self.stream.write(text)
+
+    def close(self):
+        self.stream.flush()
+
+
+class FileWriter(StreamWriter):
+    """Writes a report to a file, which is opened on creation and closed with the writer"""
+
+    def __init__(self, path, encoding='utf-8'):
+        super().__init__(open(path, 'w', encoding=encoding))
+
+    def close(self):
+        self.stream.close()
+
+
+def write_report(chunks, writer, chunk_size=WRITE_CHUNK_SIZE):
+    """Pass a report's chunks to writer as they are generated, returning the characters written
+
+    Small chunks such as single lines are gathered into pieces of about
+    chunk_size characters first, so a writer is not called once per line.
+    The writer is closed however the report ends.
+    """
+    pending, size, written = [], 0, 0
+    try:
+        for chunk in chunks:
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= chunk_size:
+                writer.write(''.join(pending))
+                written += size
+                pending, size = [], 0
+        if pending:
+            writer.write(''.join(pending))
+            written += size
+    finally:
+        writer.close()
+    return written
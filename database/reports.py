@@ -1,39 +1,87 @@
+import csv
+import gzip
+import itertools
 import logging
+from contextlib import closing
 from datetime import datetime, timedelta
 import os
+import sys
+from .analytics import ClaimAnalytics
 from .db import Database
+from .report_writer import StreamWriter, write_report
+
+# gzip level of compressed CSV exports, close to level 9's size in a fraction of the time
+CSV_COMPRESS_LEVEL = 6
+
+
+def open_csv(filename, compress=False):
+    """Open filename for writing CSV, through gzip when compress is set"""
+    if compress:
+        return gzip.open(filename, 'wt', encoding='utf-8', newline='', compresslevel=CSV_COMPRESS_LEVEL)
+    return open(filename, 'w', encoding='utf-8', newline='')
 
 
 class ReportGenerator:
+    """Builds the text reports
+
+    Each report is produced lazily by an iter_* generator, one line or
+    section at a time, so it can be passed to a ReportWriter with write()
+    and never held in memory whole. The get_* methods join the same chunks
+    into a string.
+    """
+
+    # Report names shown in the GUI, mapped to the generator producing each
+    REPORT_TYPES = {
+        "Claims by Status": 'iter_claims_by_status',
+        "Claims by Policy Type": 'iter_claims_by_policy_type',
+        "Financial Summary": 'iter_financial_summary',
+        "Claim Statistics": 'iter_claim_statistics',
+    }
+
     def __init__(self, db: Database):
         self.db = db
         self.logger = logging.getLogger(__name__)
+        self._analytics = None
+        self._analytics_version = None
+
+    def analytics(self, refresh=False):
+        """The ClaimAnalytics shared by the statistics reports, loaded once and reused
+
+        It is loaded again when the financial ledger's totals have moved since,
+        which any write changing a claim amount, premium, policy type or
+        status does. Pass refresh after changing only approved amounts or
+        coverage limits.
+        """
+        version = [tuple(row) for row in self.db.financial_totals()]
+        if refresh or self._analytics is None or version != self._analytics_version:
+            self._analytics = ClaimAnalytics.load(self.db)
+            self._analytics_version = version
+        return self._analytics
+
+    def stream(self, report_type):
+        """Get the chunks of the report named report_type in REPORT_TYPES"""
+        if report_type not in self.REPORT_TYPES:
+            raise ValueError(f"Unknown report type: {report_type}")
+        return getattr(self, self.REPORT_TYPES[report_type])()
+
+    def write(self, report_type, writer):
+        """Write the report named report_type to writer as it is generated, returning the characters written
+
+        The report is closed however the writing ends, releasing any
+        connection it is reading from.
+        """
+        try:
+            chunks = self.stream(report_type)
+        except Exception:
+            writer.close()
+            raise
+        with closing(chunks):
+            return write_report(chunks, writer)
 
     def get_claims_by_status(self):
         """Get claims grouped by status"""
         try:
-            claims = self.db.get_all_claims()
-            if not claims:
-                return "No claims found"
-
-            status_groups = {}
-            for claim in claims:
-                status = claim['status']
-                if status not in status_groups:
-                    status_groups[status] = []
-                status_groups[status].append(claim)
-
-            report = "Claims by Status Report\n"
-            report += "=====================\n\n"
-
-            for status, claims in status_groups.items():
-                report += f"Status: {status}\n"
-                report += "-" * 50 + "\n"
-                for claim in claims:
-                    report += f"Claim #{claim['claim_number']} - Amount: £{claim['claim_amount']:.2f}\n"
-                report += "\n"
-
-            return report
+            return ''.join(self.iter_claims_by_status())
         except Exception as e:
             self.logger.error(f"Error generating claims by status report: {e}")
             return "Error generating report"
@@ -41,75 +89,145 @@ class ReportGenerator:
     def get_claims_by_policy_type(self):
         """Get claims grouped by policy type"""
         try:
-            claims = self.db.get_all_claims()
-            if not claims:
-                return "No claims found"
-
-            policy_groups = {}
-            for claim in claims:
-                policy = self.db.get_policy(claim['policy_id'])
-                if not policy:
-                    continue
-
-                policy_type = policy['policy_type']
-                if policy_type not in policy_groups:
-                    policy_groups[policy_type] = []
-                policy_groups[policy_type].append(claim)
-
-            report = "Claims by Policy Type Report\n"
-            report += "=========================\n\n"
-
-            for policy_type, claims in policy_groups.items():
-                report += f"Policy Type: {policy_type}\n"
-                report += "-" * 50 + "\n"
-                for claim in claims:
-                    report += f"Claim #{claim['claim_number']} - Amount: £{claim['claim_amount']:.2f}\n"
-                report += "\n"
-
-            return report
+            return ''.join(self.iter_claims_by_policy_type())
         except Exception as e:
             self.logger.error(f"Error generating claims by policy type report: {e}")
             return "Error generating report"
 
+    def iter_claims_by_status(self):
+        """Generate the claims by status report"""
+        return self._iter_claims_report("Claims by Status Report", "Status", 'status')
+
+    def iter_claims_by_policy_type(self):
+        """Generate the claims by policy type report"""
+        return self._iter_claims_report("Claims by Policy Type Report", "Policy Type", 'policy_type')
+
+    def _iter_claims_report(self, title, label, group_by):
+        """Yield each group's totals and claim lines from one ordered pass over claim_groups"""
+        with closing(self.db.claim_groups(group_by)) as rows:
+            row = next(rows, None)
+            if row is None:
+                yield "No claims found"
+                return
+
+            yield f"{title}\n{'=' * len(title)}\n\n"
+            current = None
+            while row is not None:
+                if current is None or row['group_name'] != current:
+                    if current is not None:
+                        yield "\n"
+                    current = row['group_name']
+                    yield (f"{label}: {current}\n" + "-" * 50 + "\n"
+                           f"Claims: {row['claim_count']}  Total: £{row['total_amount']:.2f}  "
+                           f"Average: £{row['average_amount']:.2f}\n")
+                yield f"Claim #{row['claim_number']} - Amount: £{row['claim_amount']:.2f}\n"
+                row = next(rows, None)
+        yield "\n"
+
     def get_financial_summary(self):
-        """Get financial summary of premiums and claims"""
+        """Get financial summary of premiums and claims from the ledger's running totals"""
         try:
-            policies = self.db.get_all_policies()
-            claims = self.db.get_all_claims()
+            return ''.join(self.iter_financial_summary())
+        except Exception as e:
+            self.logger.error(f"Error generating financial summary report: {e}")
+            return "Error generating report"
+
+    def iter_financial_summary(self):
+        """Generate the financial summary report"""
+        totals = self.db.financial_totals()
+        if not totals:
+            yield "No financial data found"
+            return
 
-            if not policies and not claims:
-                return "No financial data found"
+        by_type = {}
+        received = paid = 0.0
+        for row in totals:
+            if row['entry'] in ('premium', 'claim'):
+                by_type.setdefault(row['policy_type'], {'premium': 0.0, 'claim': 0.0})[row['entry']] += row['amount']
+            elif row['status'] == 'completed':
+                if row['entry'] == 'premium_payment':
+                    received += row['amount']
+                else:
+                    paid += row['amount']
+        total_premiums = sum(amounts['premium'] for amounts in by_type.values())
+        total_claims = sum(amounts['claim'] for amounts in by_type.values())
 
-            total_premiums = sum(policy['premium'] for policy in policies)
-            total_claims = sum(claim['claim_amount'] for claim in claims)
+        yield "Financial Summary Report\n"
+        yield "=====================\n\n"
+        yield f"Total Premiums: £{total_premiums:.2f}\n"
+        yield f"Total Claims: £{total_claims:.2f}\n"
+        yield f"Net Income: £{(total_premiums - total_claims):.2f}\n"
+        yield f"Premiums Received: £{received:.2f}\n"
+        yield f"Claims Paid: £{paid:.2f}\n\n"
 
-            report = "Financial Summary Report\n"
-            report += "=====================\n\n"
-            report += f"Total Premiums: £{total_premiums:.2f}\n"
-            report += f"Total Claims: £{total_claims:.2f}\n"
-            report += f"Net Income: £{(total_premiums - total_claims):.2f}\n"
+        yield "By Policy Type\n"
+        yield "-" * 50 + "\n"
+        for policy_type, amounts in sorted(by_type.items()):
+            yield (f"{policy_type}: Premiums £{amounts['premium']:.2f}, Claims £{amounts['claim']:.2f}, "
+                   f"Net £{amounts['premium'] - amounts['claim']:.2f}\n")
 
-            return report
+    def get_claim_statistics(self):
+        """Get claim amount statistics, loss ratio and coverage utilisation by policy type"""
+        try:
+            return ''.join(self.iter_claim_statistics())
         except Exception as e:
-            self.logger.error(f"Error generating financial summary report: {e}")
+            self.logger.error(f"Error generating claim statistics report: {e}")
             return "Error generating report"
 
+    def iter_claim_statistics(self):
+        """Generate the claim statistics report"""
+        analytics = self.analytics()
+        if not analytics.policy_count:
+            yield "No policies found"
+            return
+
+        yield "Claim Statistics Report\n"
+        yield "=======================\n\n"
+        for policy_type, stats in self._labelled(analytics.policy_type_stats()):
+            points = "  ".join(f"P{q}: £{amount:.2f}" for q, amount in stats['percentiles'].items())
+            yield f"Policy Type: {policy_type}\n"
+            yield "-" * 50 + "\n"
+            yield f"Policies: {stats['policies']}  Premiums: £{stats['premium_total']:.2f}\n"
+            if stats['count']:
+                yield (f"Claims: {stats['count']}  Total: £{stats['total']:.2f}  Mean: £{stats['mean']:.2f}  "
+                       f"Approved: £{stats['approved_total']:.2f}\n")
+                yield f"{points}\n"
+            else:
+                yield "Claims: 0\n"
+            yield f"Loss Ratio: {self._percent(stats['loss_ratio'])}  "
+            yield f"Coverage Utilisation: {self._percent(stats['coverage_utilisation'])}\n\n"
+
+        yield "By Claim Status\n"
+        yield "-" * 50 + "\n"
+        for status, stats in self._labelled(analytics.claim_stats('status')):
+            yield (f"{status}: Claims {stats['count']}, Total £{stats['total']:.2f}, "
+                   f"Mean £{stats['mean']:.2f}\n")
+
+    @staticmethod
+    def _labelled(groups):
+        """Groups in label order, with unrecognised values last as 'unknown'"""
+        return sorted(((label or 'unknown', stats) for label, stats in groups.items()),
+                      key=lambda item: (item[0] == 'unknown', item[0]))
+
+    @staticmethod
+    def _percent(ratio):
+        return "n/a" if ratio != ratio else f"{ratio * 100:.1f}%"
+
     def export_to_csv(self, data, filename):
-        """Export data to CSV file"""
+        """Export data, a list or other iterable of dicts or records, to a CSV file"""
         try:
             if not filename.endswith('.csv'):
                 filename += '.csv'
 
-            with open(filename, 'w') as f:
-                # Write header
-                if data and isinstance(data, list) and data[0]:
-                    headers = list(data[0].keys())
-                    f.write(','.join(headers) + '\n')
-
-                    # Write data
-                    for row in data:
-                        values = [str(row.get(header, '')) for header in headers]
-                        f.write(','.join(values) + '\n')
+            rows = iter(data or ())
+            first = next(rows, None)
+            with open_csv(filename) as f:
+                if first:
+                    headers = list(first.keys())
+                    writer = csv.writer(f)
+                    writer.writerow(headers)
+                    writer.writerows([row.get(header, '') for header in headers]
+                                     for row in itertools.chain([first], rows))
 
             self.logger.info(f"Data exported to {filename}")
             return True
@@ -117,21 +235,71 @@ class ReportGenerator:
             self.logger.error(f"Error exporting to CSV: {e}")
             return False
 
+    def export_table(self, table, filename, columns=None, compress=False, progress=None, batch_size=None):
+        """Export a whole table to a CSV file straight from a database cursor
+
+        Rows are fetched and written through csv.writer a batch at a time, so
+        memory use stays flat however large the table. columns selects the
+        columns as for Database.export_rows. compress gzips the file, which
+        is given a .gz suffix. progress, if given, is called with the number
+        of rows written after each batch; raising from it abandons the export.
+        Returns the number of rows written, or None if the export failed, in
+        which case the partial file is removed.
+        """
+        if not filename.endswith(('.csv', '.csv.gz')):
+            filename += '.csv'
+        if compress and not filename.endswith('.gz'):
+            filename += '.gz'
+
+        opened = False
+        written = 0
+        try:
+            headers, batches = self.db.export_rows(table, columns, batch_size)
+            with closing(batches), open_csv(filename, compress) as f:
+                opened = True
+                writer = csv.writer(f)
+                writer.writerow(headers)
+                for rows in batches:
+                    writer.writerows(rows)
+                    written += len(rows)
+                    if progress:
+                        progress(written)
+
+            self.logger.info(f"Exported {written} {table} to {filename}")
+            return written
+        except Exception as e:
+            self.logger.error(f"Error exporting {table} to CSV: {e}")
+            if opened and os.path.exists(filename):
+                os.remove(filename)
+            return None
+
     def get_claim_timeline(self, claim_number):
         """Get timeline for a specific claim"""
         try:
-            claim = self.db.get_claim(claim_number)
-            if not claim:
-                return "Claim not found"
-
-            report = f"Claim Timeline Report - Claim #{claim_number}\n"
-            report += "==================================\n\n"
-            report += f"Date Filed: {claim['claim_date']}\n"
-            report += f"Incident Date: {claim['incident_date']}\n"
-            report += f"Status: {claim['status']}\n"
-            report += f"Amount: £{claim['claim_amount']:.2f}\n"
-
-            return report
+            return ''.join(self.iter_claim_timeline(claim_number))
         except Exception as e:
             self.logger.error(f"Error generating claim timeline report: {e}")
-            return "Error generating report"
\ No newline at end of file
+            return "Error generating report"
+
+    def iter_claim_timeline(self, claim_number):
+        """Generate the timeline report for a specific claim"""
+        claim = self.db.get_claim_by_number(claim_number)
+        if not claim:
+            yield "Claim not found"
+            return
+
+        yield f"Claim Timeline Report - Claim #{claim_number}\n"
+        yield "==================================\n\n"
+        yield f"Date Filed: {claim['claim_date']}\n"
+        yield f"Incident Date: {claim['incident_date']}\n"
+        yield f"Status: {claim['status']}\n"
+        yield f"Amount: £{claim['claim_amount']:.2f}\n"
+
+
+if __name__ == '__main__':
+    # python -m database.reports "Claims by Status" [db_path] writes the report to stdout
+    db = Database(*sys.argv[2:3])
+    try:
+        ReportGenerator(db).write(sys.argv[1], StreamWriter())
+    finally:
+        db.close()
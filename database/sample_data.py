@@ -19,16 +19,18 @@ def add_sample_data(db: Database):
         timestamp = int(time.time())
 
         # Check if admin user already exists
-        db.cursor.execute("SELECT id FROM users WHERE username = 'admin'")
-        if not db.cursor.fetchone():
+        with db.reader() as conn:
+            admin = conn.execute("SELECT id FROM users WHERE username = 'admin'").fetchone()
+        if not admin:
             # Add default user
             password = "admin123"  # Default password
             hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-            db.cursor.execute("""
-                INSERT INTO users (username, password_hash, role, branch_id)
-                VALUES (?, ?, ?, ?)
-            """, ('admin', hashed_password.decode('utf-8'), 'admin', 1))
-            db.conn.commit()
+            with db.writer() as conn:
+                conn.execute("""
+                    INSERT INTO users (username, password_hash, role, branch_id)
+                    VALUES (?, ?, ?, ?)
+                """, ('admin', hashed_password.decode('utf-8'), 'admin', 1))
+                conn.commit()
             logger.info("Created default admin user")
         else:
             logger.info("Admin user already exists")
@@ -82,78 +84,80 @@ def add_sample_data(db: Database):
             }
         ]
 
-        customer_ids = []
-        for customer in customers:
-            try:
-                customer_id = db.create_customer(
-                    first_name=customer['first_name'],
-                    last_name=customer['last_name'],
-                    email=customer['email'],
-                    phone=customer['phone'],
-                    address=customer['address'],
-                    dob=customer['dob'],
-                    ssn=customer['ssn']
-                )
-                if customer_id:
-                    customer_ids.append(customer_id)
-                    logger.info(f"Created customer: {customer['first_name']} {customer['last_name']}")
-            except sqlite3.IntegrityError as e:
-                if 'UNIQUE constraint failed' in str(e):
-                    logger.warning(f"Customer {customer['email']} already exists")
-                else:
-                    raise
+        # Add the customers, policies and claims together, or none of them
+        with db.transaction():
+            customer_ids = []
+            for customer in customers:
+                try:
+                    customer_id = db.create_customer(
+                        first_name=customer['first_name'],
+                        last_name=customer['last_name'],
+                        email=customer['email'],
+                        phone=customer['phone'],
+                        address=customer['address'],
+                        dob=customer['dob'],
+                        ssn=customer['ssn']
+                    )
+                    if customer_id:
+                        customer_ids.append(customer_id)
+                        logger.info(f"Created customer: {customer['first_name']} {customer['last_name']}")
+                except sqlite3.IntegrityError as e:
+                    if 'UNIQUE constraint failed' in str(e):
+                        logger.warning(f"Customer {customer['email']} already exists")
+                    else:
+                        raise
 
-        if not customer_ids:
-            raise Exception("No customers were created. Cannot proceed with policy creation.")
+            if not customer_ids:
+                raise Exception("No customers were created. Cannot proceed with policy creation.")
 
-        # Add sample policies
-        policy_types = ['AUTO', 'HOME', 'LIFE', 'HEALTH', 'TRAVEL', 'PET', 'BUSINESS']
-        policy_ids = []
-        for policy_type in policy_types:
-            try:
-                policy_id = db.create_policy(
-                    customer_id=random.choice(customer_ids),
-                    policy_type=policy_type,
-                    policy_number=f"POL-{timestamp}-{random.randint(1000, 9999)}",
-                    start_date=current_date.strftime('%Y-%m-%d'),
-                    end_date=(current_date + timedelta(days=365)).strftime('%Y-%m-%d'),
-                    premium=random.uniform(500, 2000),
-                    coverage_limit=random.uniform(10000, 100000),
-                    status='active',
-                    payment_schedule='Monthly',
-                    beneficiary_info='Self',
-                    exclusions='None'
-                )
-                if policy_id:
-                    policy_ids.append(policy_id)
-                    logger.info(f"Created policy: {policy_type}")
-            except sqlite3.IntegrityError as e:
-                if 'UNIQUE constraint failed' in str(e):
-                    logger.warning(f"Policy number already exists")
-                else:
-                    raise
+            # Add sample policies
+            policy_types = ['AUTO', 'HOME', 'LIFE', 'HEALTH', 'TRAVEL', 'PET', 'BUSINESS']
+            policy_ids = []
+            for policy_type in policy_types:
+                try:
+                    policy_id = db.create_policy(
+                        customer_id=random.choice(customer_ids),
+                        policy_type=policy_type,
+                        policy_number=None,
+                        start_date=current_date.strftime('%Y-%m-%d'),
+                        end_date=(current_date + timedelta(days=365)).strftime('%Y-%m-%d'),
+                        premium=random.uniform(500, 2000),
+                        coverage_limit=random.uniform(10000, 100000),
+                        status='active',
+                        payment_schedule='Monthly',
+                        beneficiary_info='Self',
+                        exclusions='None'
+                    )
+                    if policy_id:
+                        policy_ids.append(policy_id)
+                        logger.info(f"Created policy: {policy_type}")
+                except sqlite3.IntegrityError as e:
+                    if 'UNIQUE constraint failed' in str(e):
+                        logger.warning(f"Policy number already exists")
+                    else:
+                        raise
 
-        if not policy_ids:
-            raise Exception("No policies were created. Cannot proceed with claim creation.")
+            if not policy_ids:
+                raise Exception("No policies were created. Cannot proceed with claim creation.")
 
-        # Add sample claims
-        claim_statuses = ['pending', 'approved', 'paid', 'rejected']
-        for status in claim_statuses:
-            try:
-                claim_id = db.create_claim(
-                    policy_id=policy_ids[0],
-                    claim_date=current_date.strftime('%Y-%m-%d'),
-                    incident_date=current_date.strftime('%Y-%m-%d'),
-                    incident_time=current_date.strftime('%H:%M:%S'),
-                    incident_location='123 Main St',
-                    description=f'Test claim with status: {status}',
-                    claim_amount=random.uniform(1000, 5000),
-                    status=status
-                )
-                if claim_id:
-                    logger.info(f"Created claim: {claim_id}")
-            except Exception as e:
-                logger.error(f"Error creating claim: {e}")
+            # Add sample claims
+            claim_statuses = ['pending', 'approved', 'paid', 'rejected']
+            for status in claim_statuses:
+                try:
+                    claim_id = db.create_claim(
+                        policy_id=policy_ids[0],
+                        claim_date=current_date.strftime('%Y-%m-%d'),
+                        incident_date=current_date.strftime('%Y-%m-%d'),
+                        incident_time=current_date.strftime('%H:%M:%S'),
+                        incident_location='123 Main St',
+                        description=f'Test claim with status: {status}',
+                        claim_amount=random.uniform(1000, 5000),
+                        status=status
+                    )
+                    if claim_id:
+                        logger.info(f"Created claim: {claim_id}")
+                except Exception as e:
+                    logger.error(f"Error creating claim: {e}")
 
         logger.info("Sample data added successfully")
         return True
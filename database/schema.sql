@@ -31,7 +31,8 @@ CREATE TABLE customers (
     date_of_birth TEXT,
     ssn_encrypted TEXT,  -- Encrypted sensitive data
     created_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')),
-    updated_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')),
+    ssn_index TEXT  -- Keyed hash of the SSN for lookups without decrypting
 );
 
 -- Policies table with comprehensive coverage details
@@ -139,7 +140,29 @@ CREATE TABLE audit_log (
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
+-- Sequences backing claim and policy number allocation
+CREATE TABLE sequences (
+    name TEXT PRIMARY KEY,
+    next_value INTEGER NOT NULL
+);
+
+-- Running financial totals, maintained by the triggers installed from database/ledger.py
+CREATE TABLE financial_ledger (
+    entry TEXT NOT NULL,  -- premium, claim, premium_payment, claim_payment
+    policy_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    amount REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (entry, policy_type, status)
+) WITHOUT ROWID;
+
+-- Source tables whose ledger insert trigger a bulk insert has turned off, only ever written inside its transaction
+CREATE TABLE financial_ledger_suspended (
+    source TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
 -- Indexes for better query performance
+CREATE INDEX idx_customers_ssn_index ON customers(ssn_index);
 CREATE INDEX idx_policies_customer_id ON policies(customer_id);
 CREATE INDEX idx_claims_policy_id ON claims(policy_id);
 CREATE INDEX idx_claims_status ON claims(status);
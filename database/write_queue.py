@@ -0,0 +1,152 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Most writes committed in one transaction
+WRITE_BATCH_SIZE = 500
+# Seconds the writer waits for more writes before committing a batch
+WRITE_BATCH_DELAY = 0.005
+# Milliseconds SQLite itself waits on a busy database before the writer backs off
+BUSY_TIMEOUT = 100
+# Times a busy database is retried before the batch fails, and the first wait in seconds
+BUSY_RETRIES = 8
+BUSY_BACKOFF = 0.01
+
+
+def _is_busy(error):
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+class WriteQueue:
+    """Applies writes from any thread on one writer thread, committing them in groups
+
+    submit() queues a statement and returns a Future of the row id it
+    inserted. The writer thread takes whatever has been queued, waiting up
+    to max_delay seconds for more, and runs up to max_batch statements in a
+    single transaction so that they share one commit. Each statement runs in
+    a savepoint: one that fails gets its error on its own future and the
+    rest of the batch still commits. Futures are only resolved once the
+    batch is committed.
+
+    Should another connection hold the database, beginning or committing a
+    batch is retried with exponential backoff, retries times, before the
+    whole batch fails. connect() opens a configured connection, which the
+    queue puts into autocommit mode to manage its own transactions.
+    """
+
+    def __init__(self, connect, max_batch=WRITE_BATCH_SIZE, max_delay=WRITE_BATCH_DELAY,
+                 retries=BUSY_RETRIES, backoff=BUSY_BACKOFF):
+        self._connect = connect
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.retries = retries
+        self.backoff = backoff
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, params=()):
+        """Queue a statement, returning a Future of its cursor's lastrowid"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            self._queue.put((future, sql, params))
+        return future
+
+    def close(self):
+        """Commit everything already queued, then stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        conn = None
+        try:
+            conn = self._connect()
+            conn.isolation_level = None
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT}")
+        except Exception as e:
+            logger.error(f"Error opening writer connection: {e}")
+
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._apply(conn, batch)
+
+        if conn:
+            conn.close()
+
+    def _retry(self, conn, sql):
+        """Execute a transaction statement, backing off while the database is busy"""
+        for attempt in range(self.retries + 1):
+            try:
+                conn.execute(sql)
+                return
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _apply(self, conn, batch):
+        """Run one batch of writes in a transaction and resolve their futures"""
+        batch = [(future, sql, params) for future, sql, params in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        try:
+            if conn is None:
+                raise sqlite3.ProgrammingError("The writer connection could not be opened")
+            self._retry(conn, "BEGIN IMMEDIATE")
+            try:
+                for future, sql, params in batch:
+                    conn.execute("SAVEPOINT write")
+                    try:
+                        results.append((future, conn.execute(sql, params).lastrowid, None))
+                        conn.execute("RELEASE write")
+                    except sqlite3.Error as e:
+                        conn.execute("ROLLBACK TO write")
+                        conn.execute("RELEASE write")
+                        results.append((future, None, e))
+                self._retry(conn, "COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            logger.error(f"Error committing {len(batch)} queued writes: {e}")
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        for future, row_id, error in results:
+            if error is None:
+                future.set_result(row_id)
+            else:
+                future.set_exception(error)
@@ -0,0 +1,119 @@
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundExecutor:
+    """Runs database and report work off the Tk thread
+
+    Work is submitted with the callbacks to run on its result. The callbacks
+    are run on the Tk thread: workers only put results on a queue, which is
+    polled with after() while anything is outstanding.
+
+    Submitting with a key supersedes any earlier work with the same key, such
+    as a search replaced by the next keystroke. Superseded work that has not
+    started is cancelled and the result of work that has is discarded.
+
+    A single worker is used by default, as a Database that is not pooled
+    shares one connection between its methods. Give a pooled Database
+    more workers so that a slow report does not hold up other reads.
+    """
+
+    def __init__(self, root=None, status_var=None, workers=1, poll_interval=50):
+        self.root = root
+        self.status_var = status_var
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-worker')
+        self._results = queue.Queue()
+        self._pending = {}
+        self._latest = {}
+        self._next_id = 0
+        self._polling = False
+
+    def attach(self, root, status_var=None):
+        """Deliver results through another Tk window, e.g. once the login window closes"""
+        self.root = root
+        self.status_var = status_var
+        self._update_status()
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        """Run fn(*args, **kwargs) on a worker and pass its result to on_done on the Tk thread"""
+        task_id = self._next_id
+        self._next_id += 1
+
+        if key is not None:
+            superseded = self._latest.get(key)
+            if superseded is not None and superseded in self._pending:
+                if self._pending[superseded][0].cancel():
+                    del self._pending[superseded]
+            self._latest[key] = task_id
+
+        future = self._pool.submit(self._run, task_id, fn, args, kwargs)
+        self._pending[task_id] = (future, key, on_done, on_error)
+        self._update_status()
+        self._schedule_poll()
+        return task_id
+
+    def _run(self, task_id, fn, args, kwargs):
+        """Worker side: run the task and queue its outcome"""
+        try:
+            self._results.put((task_id, fn(*args, **kwargs), None))
+        except Exception as e:
+            self._results.put((task_id, None, e))
+
+    def _schedule_poll(self):
+        if not self._polling and self.root is not None:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        self._deliver()
+        if self._pending:
+            self._schedule_poll()
+
+    def _deliver(self):
+        """Run the callbacks of finished tasks that have not been superseded"""
+        while True:
+            try:
+                task_id, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            _, key, on_done, on_error = self._pending.pop(task_id)
+            if key is not None:
+                if self._latest.get(key) != task_id:
+                    continue
+                del self._latest[key]
+
+            try:
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                    else:
+                        logger.error(f"Error in background task: {error}")
+                elif on_done:
+                    on_done(result)
+            except Exception as e:
+                logger.error(f"Error handling background task result: {e}")
+        self._update_status()
+
+    def _update_status(self):
+        """Show the busy indicator while work is outstanding"""
+        if self.status_var is not None:
+            self.status_var.set("Working..." if self._pending else "Ready")
+
+    def drain(self, timeout=None):
+        """Block until every submitted task has finished and its callbacks have run"""
+        while self._pending:
+            _, not_done = wait([future for future, *_ in self._pending.values()], timeout)
+            self._deliver()
+            for task_id in [task_id for task_id, (future, *_) in self._pending.items() if future.cancelled()]:
+                del self._pending[task_id]
+            if not_done and timeout is not None:
+                break
+
+    def shutdown(self):
+        """Stop the workers, dropping work that has not started"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
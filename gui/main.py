@@ -3,19 +3,54 @@ from tkinter import ttk, messagebox, filedialog, simpledialog
 from datetime import datetime, timedelta
 import os
 import logging
-from database.db import Database, UserRole
+from database.db import Database, UserRole, PREVIEW_LENGTH
 from database.reports import ReportGenerator
+from database.report_writer import FileWriter
+from gui.background import BackgroundExecutor
+from gui.report_stream import TextReportWriter
+from gui.search import IncrementalSearch
+from gui.virtual_tree import VirtualTreeview
 from tkcalendar import DateEntry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# How long typing must pause before a search runs, in milliseconds
+SEARCH_QUIET_PERIOD_MS = 300
+
+# Result sets up to this size are kept in memory so searches can narrow them
+SEARCH_CACHE_ROWS = 5000
+
+# Database column behind each Treeview column of the lists
+CUSTOMER_LIST_COLUMNS = {
+    "ID": 'id', "First Name": 'first_name', "Last Name": 'last_name', "Email": 'email', "Phone": 'phone',
+    "Address": 'address', "DOB": 'date_of_birth', "Created At": 'created_at'
+}
+POLICY_LIST_COLUMNS = {
+    "ID": 'id', "Customer": 'customer_name', "Type": 'policy_type', "Premium": 'premium',
+    "Coverage": 'coverage_limit', "Status": 'status'
+}
+CLAIM_LIST_COLUMNS = {
+    "ID": 'id', "Policy ID": 'policy_id', "Claim Number": 'claim_number', "Claim Date": 'claim_date',
+    "Incident Date": 'incident_date', "Incident Time": 'incident_time', "Incident Location": 'incident_location',
+    "Description": 'description_preview', "Amount": 'claim_amount', "Status": 'status'
+}
+
+# Columns fetched for each list: what it shows plus what its search matches on
+CUSTOMER_FIELDS = tuple(CUSTOMER_LIST_COLUMNS.values())
+POLICY_FIELDS = tuple(POLICY_LIST_COLUMNS.values()) + ('policy_number',)
+CLAIM_FIELDS = tuple(CLAIM_LIST_COLUMNS.values())
+
 
 class InsuranceSystem:
     def __init__(self):
-        self.db = Database()
+        self.db = Database(pooled=True)
         self.report_generator = ReportGenerator(self.db)
+        # Writer streaming the displayed report into the reports tab
+        self.report_stream = None
+        # Database and report work runs here so the Tk main loop never blocks on it
+        self.executor = BackgroundExecutor(workers=2)
         self.current_user = None
         self.setup_login_window()
 
@@ -67,6 +102,8 @@ class InsuranceSystem:
         # Configure grid weights
         login_frame.columnconfigure(1, weight=1)
 
+        self.executor.attach(self.login_window)
+
     def login(self):
         """Handle login"""
         username = self.username_entry.get()
@@ -76,7 +113,13 @@ class InsuranceSystem:
             messagebox.showerror("Error", "Please enter both username and password")
             return
 
-        user_info = self.db.verify_user(username, password)
+        # The bcrypt check is deliberately slow, so keep it off the Tk thread
+        self.executor.submit(self.db.verify_user, username, password,
+                             on_done=lambda user_info: self.on_login(username, user_info),
+                             on_error=self.error_handler("Login failed"))
+
+    def on_login(self, username, user_info):
+        """Open the main window once the credentials have been checked"""
         if user_info:
             self.current_user = {
                 "username": username,
@@ -98,6 +141,12 @@ class InsuranceSystem:
         # Create menu bar
         self.create_menu_bar()
 
+        # Status bar showing whether background work is in progress
+        self.status_var = tk.StringVar()
+        status_bar = ttk.Label(self.main_window, textvariable=self.status_var, anchor="w", relief="sunken")
+        status_bar.pack(side="bottom", fill="x")
+        self.executor.attach(self.main_window, self.status_var)
+
         # Create notebook for tabs
         self.notebook = ttk.Notebook(self.main_window)
         self.notebook.pack(expand=True, fill="both", padx=10, pady=10)
@@ -144,7 +193,7 @@ class InsuranceSystem:
 
         ttk.Label(search_frame, text="Search by Name :").pack(side='left', padx=5)
         self.customer_search_var = tk.StringVar()
-        self.customer_search_var.trace('w', self.filter_customers)
+        self.customer_search_var.trace('w', lambda *args: self.customer_search.schedule())
         search_entry = ttk.Entry(search_frame, textvariable=self.customer_search_var)
         search_entry.pack(side='left', padx=5, fill='x', expand=True)
 
@@ -231,8 +280,7 @@ class InsuranceSystem:
 
         # Treeview for customer list
         self.customer_tree = ttk.Treeview(list_frame,
-                                          columns=("ID", "First Name", "Last Name", "Email", "Phone", "Address", "DOB",
-                                                   "Created At"),
+                                          columns=tuple(CUSTOMER_LIST_COLUMNS),
                                           show="headings",
                                           selectmode="browse")
 
@@ -252,9 +300,14 @@ class InsuranceSystem:
             self.customer_tree.heading(col, text=col)
             self.customer_tree.column(col, width=width)
 
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.customer_tree.yview)
-        self.customer_tree.configure(yscrollcommand=scrollbar.set)
+        # Add scrollbar, driven by the virtual list over the whole customer table
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
+        self.customer_view = VirtualTreeview(self.customer_tree, scrollbar,
+                                             self.count_customer_rows, self.fetch_customer_rows,
+                                             self.customer_values, criteria=self.customer_criteria,
+                                             executor=self.executor)
+        self.customer_search = IncrementalSearch(self.customer_view, self.customer_matches,
+                                                 SEARCH_QUIET_PERIOD_MS, SEARCH_CACHE_ROWS)
 
         # Grid the treeview and scrollbar
         self.customer_tree.grid(row=0, column=0, sticky='nsew')
@@ -280,7 +333,7 @@ class InsuranceSystem:
         # Search
         ttk.Label(filter_frame, text="Search by Policy Type:").pack(side='left', padx=5)
         self.policy_search_var = tk.StringVar()
-        self.policy_search_var.trace('w', self.filter_policies)
+        self.policy_search_var.trace('w', lambda *args: self.policy_search.schedule())
         search_entry = ttk.Entry(filter_frame, textvariable=self.policy_search_var)
         search_entry.pack(side='left', padx=5, fill='x', expand=True)
 
@@ -356,7 +409,7 @@ class InsuranceSystem:
 
         # Policy list
         self.policy_tree = ttk.Treeview(self.policies_tab,
-                                        columns=("ID", "Customer", "Type", "Premium", "Coverage", "Status"),
+                                        columns=tuple(POLICY_LIST_COLUMNS),
                                         show="headings")
         self.policy_tree.grid(row=8, column=0, columnspan=2, padx=5, pady=5)
         self.policy_tree.heading("ID", text="ID")
@@ -366,6 +419,16 @@ class InsuranceSystem:
         self.policy_tree.heading("Coverage", text="Coverage")
         self.policy_tree.heading("Status", text="Status")
 
+        # Add scrollbar, driven by the virtual list over the whole policy table
+        scrollbar = ttk.Scrollbar(self.policies_tab, orient="vertical")
+        scrollbar.grid(row=8, column=2, pady=5, sticky='ns')
+        self.policy_view = VirtualTreeview(self.policy_tree, scrollbar,
+                                           self.count_policy_rows, self.fetch_policy_rows,
+                                           self.policy_values, criteria=self.policy_criteria,
+                                           executor=self.executor)
+        self.policy_search = IncrementalSearch(self.policy_view, self.policy_matches,
+                                               SEARCH_QUIET_PERIOD_MS, SEARCH_CACHE_ROWS)
+
         # Refresh customer list in policy tab
         self.refresh_policy_customers()
 
@@ -381,7 +444,7 @@ class InsuranceSystem:
         # Search
         ttk.Label(filter_frame, text="Search by ID:").pack(side='left', padx=5)
         self.claim_search_var = tk.StringVar()
-        self.claim_search_var.trace('w', self.filter_claims)
+        self.claim_search_var.trace('w', lambda *args: self.claim_search.schedule())
         search_entry = ttk.Entry(filter_frame, textvariable=self.claim_search_var)
         search_entry.pack(side='left', padx=5, fill='x', expand=True)
 
@@ -489,10 +552,7 @@ class InsuranceSystem:
         tree_frame.columnconfigure(0, weight=1)
         tree_frame.rowconfigure(0, weight=1)
 
-        self.claim_tree = ttk.Treeview(tree_frame, columns=(
-            "ID", "Policy ID", "Claim Number", "Claim Date", "Incident Date",
-            "Incident Time", "Incident Location", "Description", "Amount", "Status"
-        ), show="headings")
+        self.claim_tree = ttk.Treeview(tree_frame, columns=tuple(CLAIM_LIST_COLUMNS), show="headings")
         self.claim_tree.grid(row=0, column=0, sticky='nsew')
 
         # Configure columns
@@ -519,13 +579,19 @@ class InsuranceSystem:
         self.claim_tree.column("Amount", width=100)
         self.claim_tree.column("Status", width=100)
 
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.claim_tree.yview)
+        # Add scrollbar, driven by the virtual list over the whole claim table
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical")
         scrollbar.grid(row=0, column=1, sticky='ns')
-        self.claim_tree.configure(yscrollcommand=scrollbar.set)
-
-        # Add right-click menu for status updates
+        self.claim_view = VirtualTreeview(self.claim_tree, scrollbar,
+                                          self.count_claim_rows, self.fetch_claim_rows,
+                                          self.claim_values, criteria=self.claim_criteria,
+                                          executor=self.executor)
+        self.claim_search = IncrementalSearch(self.claim_view, self.claim_matches,
+                                              SEARCH_QUIET_PERIOD_MS, SEARCH_CACHE_ROWS)
+
+        # Add right-click menu for status updates, and double-click for the full claim
         self.claim_tree.bind("<Button-3>", self.show_claim_context_menu)
+        self.claim_tree.bind("<Double-1>", self.show_claim_details)
 
         # Configure grid weights for the main tab
         self.claims_tab.columnconfigure(0, weight=1)
@@ -542,11 +608,7 @@ class InsuranceSystem:
         # Report type selection
         ttk.Label(self.reports_tab, text="Report Type:").grid(row=0, column=0, padx=5, pady=5)
         self.report_type_var = tk.StringVar()
-        report_types = [
-            "Claims by Status",
-            "Claims by Policy Type",
-            "Financial Summary"
-        ]
+        report_types = list(ReportGenerator.REPORT_TYPES)
         self.report_type_combo = ttk.Combobox(self.reports_tab,
                                               textvariable=self.report_type_var,
                                               values=report_types,
@@ -560,8 +622,12 @@ class InsuranceSystem:
 
         ttk.Button(button_frame, text="Generate Report",
                    command=self.generate_report).pack(side='left', padx=5)
-        ttk.Button(button_frame, text="Export to CSV",
+        ttk.Button(button_frame, text="Export Report",
                    command=self.export_report).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Export Policies CSV",
+                   command=lambda: self.export_table('policies')).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Export Claims CSV",
+                   command=lambda: self.export_table('claims')).pack(side='left', padx=5)
 
         # Report display
         self.report_text = tk.Text(self.reports_tab, height=20, width=80)
@@ -569,160 +635,128 @@ class InsuranceSystem:
 
     def filter_customers(self, *args):
         """Filter customers based on search and filter criteria"""
-        search_term = self.customer_search_var.get().lower()
-        filter_type = self.customer_filter_var.get()
-
-        # Clear existing items
-        for item in self.customer_tree.get_children():
-            self.customer_tree.delete(item)
-
-        # Get and filter customers
-        customers = self.db.get_customers()
-        for customer in customers:
-            customer_id = customer[0]
-            first_name = customer[1]
-            last_name = customer[2]
-            email = customer[3]
-            phone = customer[4]
-            address = customer[5]
-            dob = customer[6]
-            created_at = customer[8]
-
-            name = f"{first_name} {last_name}".lower()
-
-            # Apply search filter
-            if search_term and search_term not in name and search_term not in email.lower():
-                continue
-
-            # Apply type filter
-            if filter_type == 'With Policies':
-                policies = self.db.get_policies(customer_id)
-                if not policies:
-                    continue
-            elif filter_type == 'Without Policies':
-                policies = self.db.get_policies(customer_id)
-                if policies:
-                    continue
-
-            self.customer_tree.insert("", "end", values=(
-                customer_id,
-                first_name,
-                last_name,
-                email,
-                phone,
-                address,
-                dob,
-                created_at
-            ))
+        self.customer_search.run()
 
     def filter_policies(self, *args):
         """Filter policies based on search and filter criteria"""
-        search_term = self.policy_search_var.get().lower()
-        type_filter = self.policy_type_filter_var.get()
-        status_filter = self.policy_status_filter_var.get()
-
-        # Clear existing items
-        for item in self.policy_tree.get_children():
-            self.policy_tree.delete(item)
-
-        # Get and filter policies
-        policies = self.db.get_policies()
-        for policy in policies:
-            try:
-                policy_id = policy[0]
-                customer_id = policy[1]
-                policy_number = policy[2]
-                policy_type = policy[3]
-                premium = float(policy[6])
-                coverage = float(policy[7])
-                status = policy[8]
-
-                # Get customer information
-                customers = self.db.get_customers()
-                customer = next((c for c in customers if c[0] == customer_id), None)
-                if not customer:
-                    continue
-
-                # Apply search filter
-                if search_term and search_term not in policy_number.lower():
-                    continue
-
-                # Apply type filter
-                if type_filter != 'All' and policy_type != type_filter:
-                    continue
-
-                # Apply status filter
-                if status_filter != 'All' and status != status_filter:
-                    continue
-
-                self.policy_tree.insert("", "end", values=(
-                    policy_id,
-                    f"{customer[1]} {customer[2]}",
-                    policy_type,
-                    f"£{premium:.2f}",
-                    f"£{coverage:.2f}",
-                    status
-                ))
-            except (IndexError, ValueError) as e:
-                logger.error(f"Error processing policy: {e}")
-                continue
+        self.policy_search.run()
 
     def filter_claims(self, *args):
         """Filter claims based on search and filter criteria"""
-        search_term = self.claim_search_var.get().lower()
-        status_filter = self.claim_status_filter_var.get()
+        self.claim_search.run()
+
+    def customer_criteria(self):
+        """Snapshot of the customer search and filter settings"""
+        return {
+            'search_term': self.customer_search_var.get(),
+            'policy_filter': self.customer_filter_var.get()
+        }
+
+    def count_customer_rows(self, criteria):
+        """Count the customers matching the search and filter"""
+        return self.db.count_customers(**criteria)
+
+    def fetch_customer_rows(self, criteria, offset, limit, after_id):
+        """Fetch a window of the filtered customer list for the virtual treeview"""
+        return self.db.get_customers_page(after_id=after_id, limit=limit,
+                                          offset=offset if after_id is None else None,
+                                          columns=CUSTOMER_FIELDS, **criteria)
+
+    def customer_matches(self, customer, term):
+        """Whether a customer matches search text, as Database.filter_customers does"""
+        term = term.lower()
+        return term in f"{customer.first_name} {customer.last_name}".lower() or term in customer.email.lower()
+
+    def customer_values(self, customer):
+        """Column values of a customer row in the customer list"""
+        return (
+            customer.id,
+            customer.first_name,
+            customer.last_name,
+            customer.email,
+            customer.phone,
+            customer.address,
+            customer.date_of_birth,
+            customer.created_at
+        )
 
-        # Clear existing items
-        for item in self.claim_tree.get_children():
-            self.claim_tree.delete(item)
+    def policy_criteria(self):
+        """Snapshot of the policy search and filter settings"""
+        return {
+            'search_term': self.policy_search_var.get(),
+            'policy_type': self.policy_type_filter_var.get(),
+            'status': self.policy_status_filter_var.get()
+        }
+
+    def count_policy_rows(self, criteria):
+        """Count the policies matching the search and filters"""
+        return self.db.count_policies(**criteria)
+
+    def fetch_policy_rows(self, criteria, offset, limit, after_id):
+        """Fetch a window of the filtered policy list, with customer names, for the virtual treeview"""
+        return self.db.get_policies_page(after_id=after_id, limit=limit,
+                                         offset=offset if after_id is None else None,
+                                         columns=POLICY_FIELDS, **criteria)
+
+    def policy_matches(self, policy, term):
+        """Whether a policy matches search text, as Database.filter_policies does"""
+        term = term.lower()
+        return term in policy.policy_number.lower() or term in policy.policy_type.lower()
+
+    def policy_values(self, policy):
+        """Column values of a policy row in the policy list"""
+        return (
+            policy.id,
+            policy.customer_name,
+            policy.policy_type,
+            f"£{float(policy.premium):.2f}",
+            f"£{float(policy.coverage_limit):.2f}",
+            policy.status
+        )
 
-        # Get and filter claims
-        claims = self.db.get_claims()
-        for claim in claims:
-            try:
-                # Access claim fields using dictionary keys
-                claim_id = claim['id']
-                policy_id = claim['policy_id']
-                claim_number = claim['claim_number']
-                claim_date = claim['claim_date']
-                incident_date = claim['incident_date']
-                incident_time = claim['incident_time']
-                incident_location = claim['incident_location']
-                description = claim['description']
-                amount = float(claim['claim_amount'])
-                status = claim['status']
-
-                # Get policy information
-                policies = self.db.get_policies()
-                policy = next((p for p in policies if p[0] == policy_id), None)
-                if not policy:
-                    continue
-
-                # Apply search filter - search in claim number, description, and location
-                if search_term:
-                    search_text = f"{claim_number} {description} {incident_location}".lower()
-                    if search_term not in search_text:
-                        continue
-
-                # Apply status filter
-                if status_filter != 'All' and status != status_filter:
-                    continue
-
-                self.claim_tree.insert("", "end", values=(
-                    claim_id,
-                    policy_id,
-                    claim_number,
-                    claim_date,
-                    incident_date,
-                    incident_time,
-                    incident_location,
-                    description,
-                    f"£{amount:.2f}",
-                    status
-                ))
-            except (KeyError, ValueError) as e:
-                logger.error(f"Error processing claim {claim}: {e}")
-                continue
+    def claim_criteria(self):
+        """Snapshot of the claim search and filter settings"""
+        return {
+            'search_term': self.claim_search_var.get(),
+            'status': self.claim_status_filter_var.get()
+        }
+
+    def count_claim_rows(self, criteria):
+        """Count the claims matching the search and filter"""
+        return self.db.count_claims(**criteria)
+
+    def fetch_claim_rows(self, criteria, offset, limit, after_id):
+        """Fetch a window of the filtered claim list for the virtual treeview"""
+        return self.db.get_claims_page(after_id=after_id, limit=limit,
+                                       offset=offset if after_id is None else None,
+                                       columns=CLAIM_FIELDS, **criteria)
+
+    def claim_matches(self, claim, term):
+        """Whether a claim matches search text, as Database.filter_claims does
+
+        Only a preview of the description is held, so when the text is not
+        found and the preview was cut short the answer is None: unknown.
+        """
+        term = term.lower()
+        preview = claim.description_preview or ''
+        if any(term in (value or '').lower() for value in (claim.claim_number, preview, claim.incident_location)):
+            return True
+        return None if len(preview) >= PREVIEW_LENGTH else False
+
+    def claim_values(self, claim):
+        """Column values of a claim row in the claim list"""
+        return (
+            claim.id,
+            claim.policy_id,
+            claim.claim_number,
+            claim.claim_date,
+            claim.incident_date,
+            claim.incident_time,
+            claim.incident_location,
+            claim.description_preview,
+            f"£{float(claim.claim_amount):.2f}",
+            claim.status
+        )
 
     def create_customer(self):
         """Create a new customer"""
@@ -741,32 +775,36 @@ class InsuranceSystem:
                 messagebox.showerror("Error", "First Name, Last Name, and Email are required fields")
                 return
 
+            def on_created(customer_id):
+                if customer_id:
+                    messagebox.showinfo("Success", "Customer created successfully")
+                    # Clear form fields
+                    self.first_name_entry.delete(0, tk.END)
+                    self.last_name_entry.delete(0, tk.END)
+                    self.email_entry.delete(0, tk.END)
+                    self.phone_entry.delete(0, tk.END)
+                    self.address_entry.delete(0, tk.END)
+                    self.dob_entry.delete(0, tk.END)
+                    self.ssn_entry.delete(0, tk.END)
+                    # Refresh the customer list and policy customer dropdown
+                    self.refresh_customers()
+                    self.refresh_policy_customers()
+                else:
+                    messagebox.showerror("Error", "Failed to create customer")
+
             # Create the customer
-            customer_id = self.db.create_customer(
+            self.executor.submit(
+                self.db.create_customer,
                 first_name=first_name,
                 last_name=last_name,
                 email=email,
                 phone=phone,
                 address=address,
                 dob=dob,
-                ssn=ssn
+                ssn=ssn,
+                on_done=on_created,
+                on_error=self.error_handler("Failed to create customer")
             )
-
-            if customer_id:
-                messagebox.showinfo("Success", "Customer created successfully")
-                # Clear form fields
-                self.first_name_entry.delete(0, tk.END)
-                self.last_name_entry.delete(0, tk.END)
-                self.email_entry.delete(0, tk.END)
-                self.phone_entry.delete(0, tk.END)
-                self.address_entry.delete(0, tk.END)
-                self.dob_entry.delete(0, tk.END)
-                self.ssn_entry.delete(0, tk.END)
-                # Refresh the customer list and policy customer dropdown
-                self.refresh_customers()
-                self.refresh_policy_customers()
-            else:
-                messagebox.showerror("Error", "Failed to create customer")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -780,37 +818,38 @@ class InsuranceSystem:
             coverage_limit = float(self.coverage_limit_entry.get())
             status = self.policy_status_var.get()
 
-            # Generate policy number
-            policy_number = f"POL-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-
             # Set dates
             start_date = datetime.now().strftime('%Y-%m-%d')
             end_date = (datetime.now() + timedelta(days=365)).strftime('%Y-%m-%d')
 
+            def on_created(policy_id):
+                if policy_id:
+                    messagebox.showinfo("Success", "Policy created successfully")
+                    self.refresh_policies()
+
+                    # Clear form fields
+                    self.premium_entry.delete(0, tk.END)
+                    self.coverage_limit_entry.delete(0, tk.END)
+                    self.policy_status_var.set('active')
+                else:
+                    messagebox.showerror("Error", "Failed to create policy")
+
             # Create the policy
-            policy_id = self.db.create_policy(
+            self.executor.submit(
+                self.db.create_policy,
                 customer_id=customer_id,
                 policy_type=policy_type,
-                policy_number=policy_number,
+                policy_number=None,  # Allocated by the database
                 start_date=start_date,
                 end_date=end_date,
                 premium=premium,
                 coverage_limit=coverage_limit,
                 payment_schedule='Monthly',
                 beneficiary_info='Self',
-                exclusions='None'
+                exclusions='None',
+                on_done=on_created,
+                on_error=self.error_handler("Failed to create policy")
             )
-
-            if policy_id:
-                messagebox.showinfo("Success", "Policy created successfully")
-                self.refresh_policies()
-
-                # Clear form fields
-                self.premium_entry.delete(0, tk.END)
-                self.coverage_limit_entry.delete(0, tk.END)
-                self.policy_status_var.set('active')
-            else:
-                messagebox.showerror("Error", "Failed to create policy")
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid input: {str(e)}")
         except Exception as e:
@@ -849,8 +888,22 @@ class InsuranceSystem:
                 messagebox.showerror("Error", "Please fill in all required fields")
                 return
 
+            def on_created(claim_id):
+                if claim_id:
+                    messagebox.showinfo("Success", "Claim created successfully")
+                    self.refresh_claims()
+
+                    # Clear form fields
+                    self.incident_location_entry.delete(0, tk.END)
+                    self.description_entry.delete(0, tk.END)
+                    self.amount_entry.delete(0, tk.END)
+                    # Keep the current status selection
+                else:
+                    messagebox.showerror("Error", "Failed to create claim")
+
             # Create the claim
-            claim_id = self.db.create_claim(
+            self.executor.submit(
+                self.db.create_claim,
                 policy_id=policy_id,
                 claim_date=claim_date,
                 incident_date=incident_date,
@@ -858,20 +911,10 @@ class InsuranceSystem:
                 incident_location=incident_location,
                 description=description,
                 claim_amount=amount,
-                status=status
+                status=status,
+                on_done=on_created,
+                on_error=self.error_handler("Failed to create claim")
             )
-
-            if claim_id:
-                messagebox.showinfo("Success", "Claim created successfully")
-                self.refresh_claims()
-
-                # Clear form fields
-                self.incident_location_entry.delete(0, tk.END)
-                self.description_entry.delete(0, tk.END)
-                self.amount_entry.delete(0, tk.END)
-                # Keep the current status selection
-            else:
-                messagebox.showerror("Error", "Failed to create claim")
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid input: {str(e)}")
         except Exception as e:
@@ -880,19 +923,7 @@ class InsuranceSystem:
     def refresh_customers(self):
         """Refresh the customers list"""
         try:
-            customers = self.db.get_all_customers()
-            self.customer_tree.delete(*self.customer_tree.get_children())
-            for customer in customers:
-                self.customer_tree.insert("", "end", values=(
-                    customer[0],  # ID
-                    customer[1],  # First Name
-                    customer[2],  # Last Name
-                    customer[3],  # Email
-                    customer[4],  # Phone
-                    customer[5],  # Address
-                    customer[6],  # Date of Birth
-                    customer[8]  # Created At
-                ))
+            self.customer_view.reload(materialize=SEARCH_CACHE_ROWS)
         except Exception as e:
             logger.error(f"Error refreshing customers: {e}")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
@@ -903,12 +934,16 @@ class InsuranceSystem:
             # Clear existing items
             self.policy_customer_combo['values'] = []
 
+            def on_loaded(customers):
+                customer_list = [f"{c.id}: {c.first_name} {c.last_name}" for c in customers]
+                self.policy_customer_combo['values'] = customer_list
+                if customer_list:
+                    self.policy_customer_combo.set(customer_list[0])
+
             # Get customers from database
-            customers = self.db.get_customers()
-            customer_list = [f"{c[0]}: {c[1]} {c[2]}" for c in customers]
-            self.policy_customer_combo['values'] = customer_list
-            if customer_list:
-                self.policy_customer_combo.set(customer_list[0])
+            self.executor.submit(lambda: list(self.db.iter_customers(columns=('first_name', 'last_name'))),
+                                 key='policy_customers', on_done=on_loaded,
+                                 on_error=self.error_handler("Failed to refresh customers"))
         except Exception as e:
             logger.error(f"Error refreshing policy customers: {e}")
             messagebox.showerror("Error", f"Failed to refresh customers: {str(e)}")
@@ -916,21 +951,7 @@ class InsuranceSystem:
     def refresh_policies(self):
         """Refresh the policies list"""
         try:
-            policies = self.db.get_all_policies()
-            self.policy_tree.delete(*self.policy_tree.get_children())
-            for policy in policies:
-                # Get customer information
-                customer = self.db.get_customer(policy[1])  # policy[1] is customer_id
-                customer_name = f"{customer[1]} {customer[2]}" if customer else "Unknown"
-
-                self.policy_tree.insert("", "end", values=(
-                    policy[0],  # policy_id
-                    customer_name,  # customer name
-                    policy[3],  # policy_type
-                    f"£{float(policy[6]):.2f}",  # premium
-                    f"£{float(policy[7]):.2f}",  # coverage_limit
-                    policy[8]  # status
-                ))
+            self.policy_view.reload(materialize=SEARCH_CACHE_ROWS)
         except Exception as e:
             logger.error(f"Error refreshing policies: {e}")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
@@ -941,12 +962,16 @@ class InsuranceSystem:
             # Clear existing items
             self.claim_policy_combo['values'] = []
 
+            def on_loaded(policies):
+                policy_list = [f"{p.id}: {p.policy_type} - £{p.premium:.2f}" for p in policies]
+                self.claim_policy_combo['values'] = policy_list
+                if policy_list:
+                    self.claim_policy_combo.set(policy_list[0])
+
             # Get policies from database
-            policies = self.db.get_policies()
-            policy_list = [f"{p[0]}: {p[2]} - £{p[6]:.2f}" for p in policies]
-            self.claim_policy_combo['values'] = policy_list
-            if policy_list:
-                self.claim_policy_combo.set(policy_list[0])
+            self.executor.submit(lambda: list(self.db.iter_policies(columns=('policy_type', 'premium'))),
+                                 key='claim_policies', on_done=on_loaded,
+                                 on_error=self.error_handler("Failed to refresh policies"))
         except Exception as e:
             logger.error(f"Error refreshing claim policies: {e}")
             messagebox.showerror("Error", f"Failed to refresh policies: {str(e)}")
@@ -954,41 +979,7 @@ class InsuranceSystem:
     def refresh_claims(self):
         """Refresh the claims list"""
         try:
-            # Clear existing items
-            for item in self.claim_tree.get_children():
-                self.claim_tree.delete(item)
-
-            # Get all claims
-            claims = self.db.get_claims()
-            if claims is None:
-                logger.error("Failed to retrieve claims from database")
-                return
-
-            # Insert claims into tree
-            for claim in claims:
-                try:
-                    # Access claim fields using dictionary keys
-                    claim_id = claim.get('id')
-                    policy_id = claim.get('policy_id')
-                    claim_number = claim.get('claim_number')
-                    claim_date = claim.get('claim_date')
-                    incident_date = claim.get('incident_date')
-                    incident_time = claim.get('incident_time')
-                    incident_location = claim.get('incident_location')
-                    description = claim.get('description')
-                    amount = float(claim.get('claim_amount', 0))
-                    status = claim.get('status', 'pending')
-
-                    # Log the status we're about to display
-                    logger.info(f"Displaying claim {claim_id} with status: {status}")
-
-                    self.claim_tree.insert("", "end", values=(
-                        claim_id, policy_id, claim_number, claim_date, incident_date,
-                        incident_time, incident_location, description, f"£{amount:.2f}", status
-                    ))
-                except (KeyError, ValueError) as e:
-                    logger.error(f"Error processing claim {claim}: {e}")
-                    continue
+            self.claim_view.reload(materialize=SEARCH_CACHE_ROWS)
         except Exception as e:
             logger.error(f"Error refreshing claims: {e}")
             messagebox.showerror("Error", "Failed to refresh claims list")
@@ -1001,33 +992,33 @@ class InsuranceSystem:
                 messagebox.showwarning("Warning", "Please select a report type")
                 return
 
-            # Initialize report generator
-            report_gen = ReportGenerator(self.db)
-
-            # Generate report based on type
-            if report_type == "Claims by Status":
-                report_data = report_gen.get_claims_by_status()
+            # Stop streaming the previous report into the text box
+            if self.report_stream is not None:
+                self.report_stream.cancel()
+            self.report_stream = TextReportWriter(self.report_text)
 
-            elif report_type == "Claims by Policy Type":
-                report_data = report_gen.get_claims_by_policy_type()
+            def on_generated(written):
+                if not written:
+                    messagebox.showinfo("Info", "No data available for the selected report type")
 
-            elif report_type == "Financial Summary":
-                report_data = report_gen.get_financial_summary()
-
-            # Display the report
-            if report_data:
-                self.report_text.delete(1.0, tk.END)
-                self.report_text.insert(tk.END, report_data)
-            else:
-                messagebox.showinfo("Info", "No data available for the selected report type")
+            # The report is generated on a worker and appears in the text box as it is written;
+            # only the most recently requested report is displayed
+            self.executor.submit(self.report_generator.write, report_type, self.report_stream,
+                                 key='report', on_done=on_generated,
+                                 on_error=self.error_handler("Failed to generate report"))
 
         except Exception as e:
             logger.error(f"Error generating report: {e}")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
     def export_report(self):
-        """Export the current report to a file"""
+        """Export the selected report to a file"""
         try:
+            report_type = self.report_type_var.get()
+            if not report_type:
+                messagebox.showerror("Error", "No report data to export")
+                return
+
             # Get filename from user
             filename = filedialog.asksaveasfilename(
                 defaultextension=".txt",
@@ -1036,19 +1027,39 @@ class InsuranceSystem:
             if not filename:
                 return
 
-            # Get current report content
-            report_content = self.report_text.get(1.0, tk.END)
-            if not report_content.strip():
-                messagebox.showerror("Error", "No report data to export")
+            def on_exported(written):
+                messagebox.showinfo("Success", f"Report exported to {filename}")
+
+            # Stream the report straight to the file rather than copying it out of the text box
+            self.executor.submit(self.report_generator.write, report_type, FileWriter(filename),
+                                 on_done=on_exported, on_error=self.error_handler("Failed to export report"))
+        except Exception as e:
+            logger.error(f"Error exporting report: {e}")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+    def export_table(self, table):
+        """Export every row of a table to a CSV file, gzipped if its name ends in .gz"""
+        try:
+            filename = filedialog.asksaveasfilename(
+                defaultextension=".csv",
+                initialfile=f"{table}.csv",
+                filetypes=[("CSV files", "*.csv"), ("Compressed CSV files", "*.csv.gz"), ("All files", "*.*")]
+            )
+            if not filename:
                 return
 
-            # Write report to file
-            with open(filename, "w") as f:
-                f.write(report_content)
+            def on_exported(written):
+                if written is None:
+                    messagebox.showerror("Error", f"Failed to export {table}")
+                else:
+                    messagebox.showinfo("Success", f"Exported {written} {table} to {filename}")
 
-            messagebox.showinfo("Success", f"Report exported to {filename}")
+            # The rows stream from the database to the file on a worker, a batch at a time
+            self.executor.submit(self.report_generator.export_table, table, filename,
+                                 compress=filename.endswith('.gz'), on_done=on_exported,
+                                 on_error=self.error_handler(f"Failed to export {table}"))
         except Exception as e:
-            logger.error(f"Error exporting report: {e}")
+            logger.error(f"Error exporting {table}: {e}")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
     def show_claim_context_menu(self, event):
@@ -1062,9 +1073,56 @@ class InsuranceSystem:
 
         # Create menu
         menu = tk.Menu(self.claims_tab, tearoff=0)
+        menu.add_command(label="View Details", command=self.show_claim_details)
         menu.add_command(label="Update Status", command=self.update_claim_status)
         menu.post(event.x_root, event.y_root)
 
+    def show_claim_details(self, event=None):
+        """Show every field of the selected claim, fetching its long text fields only now"""
+        selection = self.claim_tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "Please select a claim to view")
+            return
+        claim_id = self.claim_tree.item(selection[0])['values'][0]
+
+        def on_loaded(claim):
+            if not claim:
+                messagebox.showerror("Error", "Claim not found")
+                return
+
+            dialog = tk.Toplevel(self.main_window)
+            dialog.title(f"Claim {claim.claim_number}")
+            dialog.transient(self.main_window)
+
+            fields = [
+                ("Claim Number", claim.claim_number),
+                ("Policy ID", claim.policy_id),
+                ("Status", claim.status),
+                ("Claim Date", claim.claim_date),
+                ("Incident Date", claim.incident_date),
+                ("Incident Time", claim.incident_time),
+                ("Incident Location", claim.incident_location),
+                ("Amount", f"£{float(claim.claim_amount):.2f}"),
+                ("Approved Amount", f"£{float(claim.approved_amount):.2f}" if claim.approved_amount is not None else ""),
+                ("Settlement Date", claim.settlement_date or "")
+            ]
+            for row, (label, value) in enumerate(fields):
+                ttk.Label(dialog, text=f"{label}:").grid(row=row, column=0, padx=5, pady=2, sticky='w')
+                ttk.Label(dialog, text=value).grid(row=row, column=1, padx=5, pady=2, sticky='w')
+
+            for label, text in (("Description", claim.description), ("Resolution Notes", claim.resolution_notes)):
+                row += 1
+                ttk.Label(dialog, text=f"{label}:").grid(row=row, column=0, padx=5, pady=2, sticky='nw')
+                text_box = tk.Text(dialog, width=50, height=5, wrap='word')
+                text_box.insert('1.0', text or '')
+                text_box.configure(state='disabled')
+                text_box.grid(row=row, column=1, padx=5, pady=2, sticky='ew')
+
+            ttk.Button(dialog, text="Close", command=dialog.destroy).grid(row=row + 1, column=0, columnspan=2, pady=10)
+
+        self.executor.submit(self.db.get_claim, claim_id, key='claim_details', on_done=on_loaded,
+                             on_error=self.error_handler("Failed to load claim"))
+
     def update_claim_status(self):
         """Update the status of a selected claim"""
         try:
@@ -1093,14 +1151,28 @@ class InsuranceSystem:
                                         state='readonly')
             status_combo.pack(pady=10)
 
+            def update(new_status):
+                # Read the claim back so only its row needs redrawing
+                with self.db.transaction():
+                    if self.db.update_claim_status(claim_id, new_status):
+                        return self.db.get_claim(claim_id, columns=CLAIM_FIELDS)
+                return None
+
+            def on_updated(claim):
+                if claim:
+                    messagebox.showinfo("Success", "Claim status updated successfully")
+                    # Reload only if the claim no longer matches the status filter or is not shown
+                    status_filter = (self.claim_view.current_criteria or {}).get('status', 'All')
+                    if status_filter not in ('All', claim.status) or not self.claim_view.update_row(claim):
+                        self.refresh_claims()
+                else:
+                    messagebox.showerror("Error", "Failed to update claim status")
+
             def on_update():
                 new_status = status_var.get()
                 if new_status != current_status:
-                    if self.db.update_claim_status(claim_id, new_status):
-                        messagebox.showinfo("Success", "Claim status updated successfully")
-                        self.refresh_claims()
-                    else:
-                        messagebox.showerror("Error", "Failed to update claim status")
+                    self.executor.submit(update, new_status, on_done=on_updated,
+                                         on_error=self.error_handler("Failed to update claim status"))
                 dialog.destroy()
 
             ttk.Button(dialog, text="Update", command=on_update).pack(pady=10)
@@ -1127,7 +1199,7 @@ class InsuranceSystem:
         dialog.geometry("300x200")
 
         # Status options
-        status_var = tk.StringVar(value=policy[8])  # Current status
+        status_var = tk.StringVar(value=policy.status)
         status_frame = ttk.LabelFrame(dialog, text="New Status")
         status_frame.pack(padx=10, pady=10, fill="x")
 
@@ -1163,7 +1235,7 @@ class InsuranceSystem:
 
         # Confirm deletion
         if not messagebox.askyesno("Confirm Delete",
-                                   f"Are you sure you want to delete claim #{claim[2]}?"):
+                                   f"Are you sure you want to delete claim #{claim.claim_number}?"):
             return
 
         try:
@@ -1197,7 +1269,7 @@ class InsuranceSystem:
 
         # Confirm deletion
         if not messagebox.askyesno("Confirm Delete",
-                                   f"Are you sure you want to delete policy #{policy[2]}?"):
+                                   f"Are you sure you want to delete policy #{policy.policy_number}?"):
             return
 
         try:
@@ -1208,6 +1280,13 @@ class InsuranceSystem:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete policy: {str(e)}")
 
+    def error_handler(self, message):
+        """Build an executor error callback that logs and reports a failure"""
+        def on_error(e):
+            logger.error(f"{message}: {e}")
+            messagebox.showerror("Error", f"{message}: {str(e)}")
+        return on_error
+
     def show_about(self):
         """Show about dialog"""
         messagebox.showinfo(
@@ -1244,6 +1323,10 @@ class InsuranceSystem:
         self.login_window.mainloop()
         if self.current_user:
             self.main_window.mainloop()
+        # A report still streaming into the closed window would otherwise wait for it forever
+        if self.report_stream is not None:
+            self.report_stream.cancel()
+        self.executor.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+import logging
+import queue
+import tkinter as tk
+from database.report_writer import ReportWriter, ReportCancelled
+
+logger = logging.getLogger(__name__)
+
+# Chunks a report may run ahead of the Text widget before its worker waits
+QUEUE_CHUNKS = 8
+# Chunks inserted into the Text widget per after() tick
+CHUNKS_PER_TICK = 2
+# Seconds a blocked worker waits between checks for cancellation
+PUT_TIMEOUT = 0.1
+# Waits in a row with nothing drained after which a worker assumes the window is gone and gives up
+STALLED_PUTS = 50
+
+
+class TextReportWriter(ReportWriter):
+    """Streams a report into a Tk Text widget while it is being generated
+
+    write() and close() are called from the worker generating the report and
+    only put chunks on a bounded queue. The queue is drained on the Tk thread
+    with after(), a few chunks per tick, so the start of the report appears
+    at once and the window stays responsive while the rest arrives. As the
+    queue is bounded, a report is never held whole in memory as well as in
+    the widget.
+
+    The widget is cleared when the writer is created. cancel() stops a
+    report that has been replaced: its worker's next write raises
+    ReportCancelled. So does a widget that has been destroyed, or a queue
+    that nothing has drained for STALLED_PUTS waits, as once the main loop
+    has stopped.
+    """
+
+    def __init__(self, text, poll_interval=20, on_finished=None):
+        self.text = text
+        self.poll_interval = poll_interval
+        self.on_finished = on_finished
+        self.cancelled = False
+        self.finished = False
+        self._chunks = queue.Queue(maxsize=QUEUE_CHUNKS)
+        self.text.delete(1.0, tk.END)
+        self.text.after(self.poll_interval, self._drain)
+
+    def write(self, text):
+        self._put(text)
+
+    def close(self):
+        try:
+            self._put(None)
+        except ReportCancelled:
+            pass
+
+    def _put(self, chunk):
+        """Worker side: queue a chunk, waiting while the widget catches up"""
+        for _ in range(STALLED_PUTS):
+            if self.cancelled:
+                raise ReportCancelled()
+            try:
+                self._chunks.put(chunk, timeout=PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+        self.cancelled = True
+        raise ReportCancelled()
+
+    def _drain(self):
+        """Tk side: insert the next few chunks and reschedule until the report ends"""
+        if self.cancelled or not self.text.winfo_exists():
+            self.cancelled = True
+            return
+        for _ in range(CHUNKS_PER_TICK):
+            try:
+                chunk = self._chunks.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                self.finished = True
+                if self.on_finished:
+                    try:
+                        self.on_finished()
+                    except Exception as e:
+                        logger.error(f"Error finishing streamed report: {e}")
+                return
+            self.text.insert(tk.END, chunk)
+        self.text.after(self.poll_interval, self._drain)
+
+    def cancel(self):
+        """Stop displaying the report and make its worker give up"""
+        self.cancelled = True
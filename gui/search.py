@@ -0,0 +1,60 @@
+class IncrementalSearch:
+    """Debounced search over a VirtualTreeview that narrows earlier results when it can
+
+    Every change to the search text restarts a quiet period, and the search
+    only runs once typing pauses for that long. When the new text contains
+    the text the shown rows were found with, and the other filters are
+    unchanged, every new match is already among those rows. They are then
+    narrowed in memory with matches(row, term) rather than queried again.
+    Otherwise, e.g. when the text is shortened or a filter changes, the view
+    reloads from the database. It also reloads when matches(row, term)
+    returns None for a row, meaning the row does not hold enough to decide.
+
+    Rows are only narrowed in memory when the view holds the whole result set,
+    which it does for results of up to max_cached rows.
+    """
+
+    def __init__(self, view, matches, quiet_period=300, max_cached=5000, term_key='search_term'):
+        self.view = view
+        self.matches = matches
+        self.quiet_period = quiet_period
+        self.max_cached = max_cached
+        self.term_key = term_key
+        self._timer = None
+
+    def schedule(self, *args):
+        """Run the search once the quiet period passes without another change"""
+        if self._timer is not None:
+            self.view.tree.after_cancel(self._timer)
+        self._timer = self.view.tree.after(self.quiet_period, self.run)
+
+    def run(self, *args):
+        """Run the search now"""
+        if self._timer is not None:
+            self.view.tree.after_cancel(self._timer)
+            self._timer = None
+
+        criteria = self.view.criteria()
+        previous = self.view.current_criteria
+        if self.view.busy or previous is None:
+            self.view.reload(reset=True, materialize=self.max_cached)
+            return
+        if criteria == previous:
+            return
+
+        term = criteria[self.term_key] or ''
+        previous_term = previous[self.term_key] or ''
+        same_filters = ({k: v for k, v in criteria.items() if k != self.term_key} ==
+                        {k: v for k, v in previous.items() if k != self.term_key})
+        if self.view.all_rows is not None and same_filters and previous_term.lower() in term.lower():
+            narrowed = []
+            for row in self.view.all_rows:
+                match = self.matches(row, term)
+                if match is None:
+                    break
+                if match:
+                    narrowed.append(row)
+            else:
+                self.view.show_rows(narrowed, criteria)
+                return
+        self.view.reload(reset=True, materialize=self.max_cached)
@@ -0,0 +1,294 @@
+import logging
+from tkinter import ttk
+
+logger = logging.getLogger(__name__)
+
+
+class TreeviewSync:
+    """Keeps a Treeview's items in step with a result set, keyed by primary key
+
+    Rows are compared with what is displayed: only rows that are new are
+    inserted, only rows whose values changed are updated and only rows that
+    are gone are deleted. Unchanged items stay put, so their selection and the
+    scroll position survive a refresh.
+    """
+
+    def __init__(self, tree, row_key, row_values):
+        self.tree = tree
+        self.row_key = row_key
+        self.row_values = row_values
+        self.displayed = {}
+
+    def sync(self, rows):
+        """Make the treeview show exactly these rows, in this order"""
+        wanted = [(str(self.row_key(row)), tuple(self.row_values(row))) for row in rows]
+        wanted_iids = {iid for iid, _ in wanted}
+
+        stale = [iid for iid in self.displayed if iid not in wanted_iids]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self.displayed[iid]
+
+        order = list(self.tree.get_children())
+        for index, (iid, values) in enumerate(wanted):
+            if iid not in self.displayed:
+                self.tree.insert("", index, iid=iid, values=values)
+                order.insert(index, iid)
+            else:
+                if self.displayed[iid] != values:
+                    self.tree.item(iid, values=values)
+                if order[index] != iid:
+                    self.tree.move(iid, "", index)
+                    order.remove(iid)
+                    order.insert(index, iid)
+            self.displayed[iid] = values
+
+    def update(self, row):
+        """Update the item of a single changed row if it is displayed"""
+        iid = str(self.row_key(row))
+        values = tuple(self.row_values(row))
+        if iid in self.displayed and self.displayed[iid] != values:
+            self.tree.item(iid, values=values)
+            self.displayed[iid] = values
+
+
+class VirtualTreeview:
+    """Shows a listing of any size in a ttk.Treeview by materialising only a window of it
+
+    The treeview holds the visible rows plus a margin above and below them.
+    Scrolling inside the margin only moves the treeview; scrolling past it
+    fetches the rows around the new position. The scrollbar is driven by the
+    total row count, not by the items in the treeview.
+
+    criteria() is called on reload to snapshot the search and filter settings
+    the listing is built from. count_rows(criteria) returns the total number of
+    rows. fetch_rows(criteria, offset, limit, after_key) returns up to limit rows
+    starting at offset; after_key is the key of the row just before offset when
+    it is known, so the caller can use keyset pagination instead of an OFFSET.
+    row_key(row) gives the primary key used as the item id and row_values(row)
+    the tuple of column values.
+
+    With an executor, counting and fetching run on its worker and a newer fetch
+    supersedes one still in flight; criteria() is always called on the Tk thread.
+
+    When a reload finds few enough rows they are all fetched at once and kept
+    in all_rows; the window is then sliced from memory, and callers such as an
+    incremental search can narrow them further with show_rows().
+    """
+
+    def __init__(self, tree, scrollbar, count_rows, fetch_rows, row_values, row_key=lambda row: row[0],
+                 criteria=lambda: None, executor=None, margin=50):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.count_rows = count_rows
+        self.fetch_rows = fetch_rows
+        self.row_values = row_values
+        self.row_key = row_key
+        self.criteria = criteria
+        self.executor = executor
+        self.margin = margin
+
+        self.sync = TreeviewSync(tree, row_key, row_values)
+        self.current_criteria = None
+        self.all_rows = None
+        self.total = 0
+        self.top = 0
+        self.visible = int(tree.cget('height')) or 10
+        self.window_start = 0
+        self.rows = []
+        self._loading = False
+        self._reloading = False
+        self._render_pending = False
+
+        self.scrollbar.configure(command=self.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_scrolled)
+        self.tree.bind('<Configure>', self._on_resize, add='+')
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_to(self.top - 3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_to(self.top + 3))
+
+    @property
+    def busy(self):
+        """Whether a reload is still in flight"""
+        return self._reloading
+
+    def reload(self, reset=False, materialize=0):
+        """Re-count the rows and re-fetch the window, optionally back at the top
+
+        If no more than materialize rows match, all of them are fetched and
+        held in all_rows.
+        """
+        if reset:
+            self.top = 0
+        self._reloading = True
+        self._run(self._load, self.criteria(), self.top, self.visible, materialize, self._loaded)
+
+    def _load(self, criteria, top, visible, materialize):
+        """Count the rows and fetch the window around top (may run on a worker)"""
+        total = self.count_rows(criteria)
+        top = max(0, min(top, total - visible))
+        if total <= materialize:
+            rows = self.fetch_rows(criteria, 0, total, None) if total else []
+            return criteria, total, top, None, list(rows)
+        start = max(0, top - self.margin)
+        return criteria, total, top, start, self.fetch_rows(criteria, start, visible + 2 * self.margin, None)
+
+    def _loaded(self, result):
+        self.current_criteria, self.total, self.top, start, rows = result
+        self._reloading = False
+        if start is None:
+            self.all_rows = rows
+            self._fetch_window()
+        else:
+            self.all_rows = None
+            self._set_window(start, rows)
+
+    def show_rows(self, rows, criteria):
+        """Show a complete result set held in memory, e.g. narrowed search results"""
+        self.current_criteria = criteria
+        self.all_rows = list(rows)
+        self.total = len(self.all_rows)
+        self.top = 0
+        self._fetch_window()
+
+    def _run(self, fn, *args):
+        """Call fn(*args[:-1]) and pass its result to the callback args[-1]"""
+        *args, on_done = args
+        self._loading = True
+        if self.executor is None:
+            try:
+                result = fn(*args)
+            except Exception as e:
+                self._load_failed(e)
+                return
+            on_done(result)
+        else:
+            self.executor.submit(fn, *args, key=self, on_done=on_done, on_error=self._load_failed)
+
+    def _load_failed(self, error):
+        self._loading = False
+        self._reloading = False
+        logger.error(f"Error loading rows: {error}")
+
+    def yview(self, *args):
+        """Scrollbar command: move the window over the whole listing"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            top = round(float(args[1]) * self.total)
+        elif args[0] == 'scroll':
+            step = self.visible if args[2] == 'pages' else 1
+            top = self.top + int(args[1]) * step
+        else:
+            return
+        self._scroll_to(top)
+
+    def _clamp(self, top):
+        return max(0, min(top, self.total - self.visible))
+
+    def _scroll_to(self, top):
+        top = self._clamp(top)
+        if top != self.top:
+            self.top = top
+            self._render()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self._scroll_to(self.top - int(event.delta / 120) * 3)
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        # The heading takes roughly one row of the widget's height
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.top = self._clamp(self.top)
+            self._render()
+
+    def _window_covers(self, top):
+        """Whether the window holds the rows in view from top, with some slack either side
+
+        The slack lets keyboard navigation reach past the visible rows before
+        the treeview runs out of items.
+        """
+        slack = max(1, self.margin // 5)
+        end = self.window_start + len(self.rows)
+        fits_below = top + self.visible + slack <= end or end >= self.total
+        fits_above = top - slack >= self.window_start or self.window_start == 0
+        return fits_below and fits_above
+
+    def _render(self):
+        """Show the rows from self.top, fetching a new window if needed"""
+        # A reload in flight will fetch its own window when it completes
+        if not self._reloading and not self._window_covers(self.top):
+            self._fetch_window()
+        self._position()
+
+    def _fetch_window(self):
+        start = max(0, self.top - self.margin)
+        limit = self.visible + 2 * self.margin
+        if self.all_rows is not None:
+            self._set_window(start, self.all_rows[start:start + limit])
+            return
+
+        # Continue from a row we already hold when the new window starts right after it
+        after_key = None
+        if 0 < start and self.window_start < start <= self.window_start + len(self.rows):
+            after_key = self.row_key(self.rows[start - self.window_start - 1])
+        self._run(self.fetch_rows, self.current_criteria, start, limit, after_key,
+                  lambda rows: self._set_window(start, rows))
+
+    def _set_window(self, start, rows):
+        """Show freshly fetched rows as the window beginning at start"""
+        self._loading = False
+        self.window_start = start
+        self.rows = list(rows)
+        self._show_rows()
+        self._position()
+
+    def _show_rows(self):
+        """Bring the treeview items in line with the rows of the current window"""
+        self.sync.sync(self.rows)
+
+    def update_row(self, row):
+        """Show a changed row without reloading, returning whether the view holds it"""
+        key = self.row_key(row)
+        held = False
+        for rows in (self.rows, self.all_rows or []):
+            for index, existing in enumerate(rows):
+                if self.row_key(existing) == key:
+                    rows[index] = row
+                    held = True
+                    break
+        if held:
+            self.sync.update(row)
+        return held
+
+    def _position(self):
+        """Scroll the treeview to self.top and the scrollbar to match"""
+        if self.window_start <= self.top < self.window_start + len(self.rows):
+            self.tree.yview_moveto((self.top - self.window_start) / len(self.rows))
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min(1.0, (self.top + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_tree_scrolled(self, first, last):
+        """Follow scrolling done by the treeview itself, such as keyboard navigation"""
+        if not self.rows or self._loading:
+            return
+        top = self._clamp(self.window_start + round(float(first) * len(self.rows)))
+        if top == self.top:
+            return
+        self.top = top
+        if self.total:
+            self.scrollbar.set(top / self.total, min(1.0, (top + self.visible) / self.total))
+        if not self._window_covers(top) and not self._render_pending:
+            # Re-render once the treeview has finished its own scroll
+            self._render_pending = True
+            self.tree.after_idle(self._deferred_render)
+
+    def _deferred_render(self):
+        self._render_pending = False
+        self._render()
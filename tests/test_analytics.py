@@ -0,0 +1,111 @@
+import math
+import unittest
+from unittest import mock
+from database import analytics as analytics_module
+from database.analytics import ClaimAnalytics, np, POLICIES_SQL
+from database.db import Database
+from database.reports import ReportGenerator
+from tests.config import setup_test_db, teardown_test_db, TEST_DB_PATH
+
+
+class TestClaimAnalytics(unittest.TestCase):
+    use_numpy = False
+
+    def setUp(self):
+        setup_test_db()
+        self.db = Database(TEST_DB_PATH)
+        home = self.db.create_policy(1, 'HOME', None, '2024-01-01', '2025-01-01', 500.0, 100000.0,
+                                     payment_schedule='monthly')
+        self.db.create_policy(1, 'PET', None, '2024-01-01', '2025-01-01', 100.0, 5000.0, payment_schedule='monthly')
+        for policy_id, amount, status in ((1, 100.0, 'pending'), (1, 200.0, 'paid'), (1, 400.0, 'paid'),
+                                          (1, 1300.0, 'rejected'), (home, 5000.0, 'paid')):
+            self.db.create_claim(policy_id, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Dent', amount, status)
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE claims SET approved_amount = claim_amount WHERE status = 'paid'")
+        self.analytics = ClaimAnalytics.load(self.db, use_numpy=self.use_numpy)
+
+    def tearDown(self):
+        self.db.close()
+        teardown_test_db()
+
+    def test_backend(self):
+        """Test that the columns are loaded into the backend asked for"""
+        self.assertEqual(self.analytics.vectorized, self.use_numpy)
+        self.assertEqual((self.analytics.claim_count, self.analytics.policy_count), (5, 3))
+
+    def test_claim_stats_by_type(self):
+        """Test counts, totals, means and interpolated percentiles per policy type"""
+        stats = self.analytics.claim_stats(percentiles=(0, 50, 90, 100))
+        self.assertEqual(set(stats), {'AUTO', 'HOME'})
+        auto = stats['AUTO']
+        self.assertEqual((auto['count'], auto['total'], auto['mean']), (4, 2000.0, 500.0))
+        self.assertEqual((auto['approved_count'], auto['approved_total']), (2, 600.0))
+        self.assertEqual(auto['percentiles'], {0: 100.0, 50: 300.0, 90: 1030.0, 100: 1300.0})
+        self.assertEqual(stats['HOME']['percentiles'][50], 5000.0)
+
+    def test_claim_stats_by_status(self):
+        """Test grouping the claims by status"""
+        stats = self.analytics.claim_stats('status')
+        self.assertEqual({status: group['count'] for status, group in stats.items()},
+                         {'pending': 1, 'paid': 3, 'rejected': 1})
+        self.assertEqual(stats['paid']['total'], 5600.0)
+        with self.assertRaises(ValueError):
+            self.analytics.claim_stats('branch')
+
+    def test_policy_type_stats(self):
+        """Test premiums, loss ratio and coverage utilisation per policy type"""
+        stats = self.analytics.policy_type_stats()
+        self.assertEqual(set(stats), {'AUTO', 'HOME', 'PET'})
+        self.assertEqual((stats['AUTO']['policies'], stats['AUTO']['premium_total']), (1, 1000.0))
+        self.assertAlmostEqual(stats['AUTO']['loss_ratio'], 2.0)
+        self.assertAlmostEqual(stats['AUTO']['coverage_utilisation'], 2000.0 / 50000.0)
+        self.assertAlmostEqual(stats['HOME']['loss_ratio'], 10.0)
+        self.assertEqual((stats['PET']['count'], stats['PET']['loss_ratio']), (0, 0.0))
+        self.assertTrue(math.isnan(stats['PET']['mean']))
+
+    def test_report_reuses_loaded_columns(self):
+        """Test that reports share one load until the data changes"""
+        reports = ReportGenerator(self.db)
+        analytics = reports.analytics()
+        report = reports.get_claim_statistics()
+        self.assertIs(reports.analytics(), analytics)
+        self.assertIn("Policy Type: AUTO\n", report)
+        self.assertIn("Claims: 4  Total: £2000.00  Mean: £500.00  Approved: £600.00\n", report)
+        self.assertIn("Loss Ratio: 200.0%  Coverage Utilisation: 4.0%\n", report)
+
+        self.db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Dent', 50.0, 'pending')
+        self.assertIsNot(reports.analytics(), analytics)
+        self.assertEqual(reports.analytics().claim_count, 6)
+
+    def test_load_reads_one_snapshot(self):
+        """Test that a policy and claim committed between loading policies and claims are in neither"""
+        db = Database(TEST_DB_PATH, pooled=True)
+        name = '_load_numpy' if self.use_numpy else '_load_arrays'
+        load = getattr(analytics_module, name)
+
+        def load_then_write(conn, sql, names):
+            columns = load(conn, sql, names)
+            if sql == POLICIES_SQL:
+                policy_id = db.create_policy(1, 'LIFE', None, '2024-01-01', '2025-01-01', 300.0, 10000.0,
+                                             payment_schedule='monthly')
+                db.create_claim(policy_id, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Dent', 75.0, 'pending')
+            return columns
+
+        try:
+            with mock.patch.object(analytics_module, name, load_then_write):
+                analytics = ClaimAnalytics.load(db, use_numpy=self.use_numpy)
+            self.assertEqual((analytics.claim_count, analytics.policy_count), (5, 3))
+            self.assertNotIn('LIFE', analytics.policy_type_stats())
+            self.assertEqual(ClaimAnalytics.load(db, use_numpy=self.use_numpy).claim_count, 6)
+        finally:
+            db.close()
+
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestNumpyClaimAnalytics(TestClaimAnalytics):
+    use_numpy = True
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import threading
+import unittest
+from gui.background import BackgroundExecutor
+
+
+class TestBackgroundExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = BackgroundExecutor()
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_result_delivered_to_callback(self):
+        """Test that a task's result reaches its callback on the calling thread"""
+        results = []
+        self.executor.submit(lambda a, b: a + b, 2, 3,
+                             on_done=lambda result: results.append((result, threading.current_thread())))
+        self.executor.drain()
+        self.assertEqual(results, [(5, threading.current_thread())])
+
+    def test_errors_go_to_error_callback(self):
+        """Test that an exception in a task is passed to its error callback"""
+        errors = []
+
+        def fail():
+            raise ValueError("boom")
+
+        self.executor.submit(fail, on_done=self.fail, on_error=errors.append)
+        self.executor.drain()
+        self.assertEqual([str(e) for e in errors], ["boom"])
+
+    def test_superseded_task_is_dropped(self):
+        """Test that only the newest task submitted under a key is delivered"""
+        release = threading.Event()
+        results = []
+        # Keep the single worker busy so the next task stays queued
+        self.executor.submit(release.wait)
+        self.executor.submit(lambda: 'old search', key='search', on_done=results.append)
+        self.executor.submit(lambda: 'new search', key='search', on_done=results.append)
+        release.set()
+        self.executor.drain()
+        self.assertEqual(results, ['new search'])
+
+
+if __name__ == '__main__':
+    unittest.main()
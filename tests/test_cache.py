@@ -0,0 +1,79 @@
+import unittest
+from database.cache import EntityCache
+from database.db import Database
+from tests.config import setup_test_db, teardown_test_db, TEST_DB_PATH
+
+
+class TestEntityCache(unittest.TestCase):
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache keeps the most recently used records up to its size"""
+        loads = []
+        def load(key):
+            loads.append(key)
+            return f'record {key}'
+
+        cache = EntityCache(2)
+        for key in (1, 2, 1, 3, 1, 2):
+            cache.get(key, load)
+
+        self.assertEqual(loads, [1, 2, 3, 2])
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 4, 'size': 2, 'maxsize': 2})
+
+    def test_missing_records_are_not_cached(self):
+        """Test that a record that was not found is looked up again"""
+        cache = EntityCache(10)
+        cache.get(1, lambda key: None)
+        self.assertEqual(cache.get(1, lambda key: 'found'), 'found')
+
+    def test_invalidated_while_loading(self):
+        """Test that a load overtaken by an invalidation is not kept"""
+        cache = EntityCache(10)
+        def stale_load(key):
+            cache.invalidate(key)
+            return 'stale'
+
+        self.assertEqual(cache.get(1, stale_load), 'stale')
+        self.assertEqual(cache.get(1, lambda key: 'fresh'), 'fresh')
+
+
+class TestDatabaseCache(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.db = Database(TEST_DB_PATH)
+
+    def tearDown(self):
+        self.db.close()
+        teardown_test_db()
+
+    def test_repeated_reads_are_hits(self):
+        """Test that reading the same policy twice only queries once"""
+        self.assertIs(self.db.get_policy(1), self.db.get_policy(1))
+        self.assertEqual(self.db.cache_stats()['policies']['hits'], 1)
+
+    def test_writes_invalidate(self):
+        """Test that updating a claim drops its cached record"""
+        claim_id = self.db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Dent', 500.0, 'pending')
+        self.assertEqual(self.db.get_claim(claim_id).status, 'pending')
+        self.db.update_claim_status(claim_id, 'approved')
+        self.assertEqual(self.db.get_claim(claim_id).status, 'approved')
+
+        self.db.get_customer(1)
+        with self.db.writer() as conn:
+            conn.execute("UPDATE customers SET phone = '555-9999' WHERE id = 1")
+            conn.commit()
+        self.db.invalidate('customers', 1)
+        self.assertEqual(self.db.get_customer(1).phone, '555-9999')
+
+    def test_cache_can_be_turned_off(self):
+        """Test that caches are only created for the tables given a size"""
+        db = Database(TEST_DB_PATH, cache={'claims': 0})
+        self.assertEqual(set(db.cache_stats()), {'customers', 'policies'})
+        db.close()
+        db = Database(TEST_DB_PATH, cache=False)
+        self.assertEqual(db.cache_stats(), {})
+        self.assertIsNot(db.get_policy(1), db.get_policy(1))
+        db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
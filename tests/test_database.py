@@ -1,7 +1,11 @@
+import os
+import tempfile
+import threading
 import unittest
 import sqlite3
 from datetime import datetime
-from database.db import Database, UserRole, PolicyType, ClaimStatus
+from database.db import Database, DatabaseError, FilterQuery, SequenceAllocator, UserRole, PolicyType, ClaimStatus
+from database.records import Claim, Customer, Policy
 from tests.config import setup_test_db, teardown_test_db, TEST_DB_PATH
 
 
@@ -89,6 +93,111 @@ class TestDatabaseOperations(unittest.TestCase):
         self.assertGreater(len(claims), 0)
         self.assertEqual(claims[0]['status'], ClaimStatus.PENDING.value)
 
+    def test_batch_ssn_codec(self):
+        """Test that batch SSN encryption matches the per-value cipher"""
+        ssns = ['123-45-6789', None, '', '98-765-4321-00', 'é-ünïcode']
+        encrypted = self.db.encrypt_ssns(ssns)
+        self.assertEqual(encrypted, [self.db.encrypt_ssn(ssn) for ssn in ssns])
+        self.assertEqual(encrypted[1:3], [None, None])
+
+        encrypted.append('not base64!')
+        self.assertEqual(self.db.decrypt_ssns(encrypted), [self.db.decrypt_ssn(value) for value in encrypted])
+        self.assertEqual(self.db.decrypt_ssns(encrypted)[:5], ['123-45-6789', None, None, '98-765-4321-00', 'é-ünïcode'])
+
+    def test_customer_ssn_decrypted_on_read(self):
+        """Test that listing customers decrypts nothing until an SSN is read"""
+        self.db.create_customer('Lazy', 'Reader', 'lazy.reader@example.com', ssn='321-54-9876')
+        decrypted = []
+        decrypt_ssn = self.db.decrypt_ssn
+        self.db.decrypt_ssn = lambda value: decrypted.append(value) or decrypt_ssn(value)
+        try:
+            customers = self.db.filter_customers('lazy.reader')
+            self.assertEqual([c[3] for c in customers], ['lazy.reader@example.com'])
+            self.assertEqual(decrypted, [])
+
+            customer = customers[0]
+            self.assertEqual(customer[7], '321-54-9876')
+            self.assertEqual(customer['ssn'], '321-54-9876')
+            self.assertEqual(len(decrypted), 1)
+            self.assertEqual(customer['ssn_encrypted'], decrypted[0])
+        finally:
+            del self.db.decrypt_ssn
+
+    def test_find_customer_by_ssn(self):
+        """Test SSN lookup through the blind index and its backfill"""
+        customer_id = self.db.create_customer('Blind', 'Index', 'blind.index@example.com', ssn='555-12-3456')
+        self.assertEqual(self.db.find_customer_by_ssn('555123456')[0], customer_id)
+        self.assertIsNone(self.db.find_customer_by_ssn('999-99-9999'))
+
+        # Customers stored before the index existed are found once backfilled
+        self.db.conn.execute("""
+            INSERT INTO customers (first_name, last_name, email, ssn_encrypted) VALUES (?, ?, ?, ?)
+        """, ('Old', 'Record', 'old.record@example.com', self.db.encrypt_ssn('555-65-4321')))
+        self.db.conn.commit()
+        self.assertIsNone(self.db.find_customer_by_ssn('555-65-4321'))
+        self.assertEqual(self.db.backfill_ssn_index(batch_size=1), 1)
+        self.assertEqual(self.db.find_customer_by_ssn('555-65-4321')['email'], 'old.record@example.com')
+
+        plan = self.db.conn.execute("EXPLAIN QUERY PLAN SELECT * FROM customers WHERE ssn_index = ?",
+                                    ('x',)).fetchall()
+        self.assertIn('idx_customers_ssn_index', plan[0][3])
+
+    def test_rows_are_records(self):
+        """Test that listings return slotted records readable by attribute, name and position"""
+        policy = self.db.get_policies_with_customer_names()[0]
+        self.assertIsInstance(policy, Policy)
+        self.assertEqual(policy.customer_name, policy['customer_name'])
+        self.assertEqual(policy.policy_number, policy[3])
+        self.assertFalse(hasattr(policy, '__dict__'))
+
+        customer = self.db.get_customer(1)
+        self.assertIsInstance(customer, Customer)
+        self.assertEqual((customer.id, customer.email), (1, 'test@example.com'))
+        self.assertEqual(customer.keys()[:2], ['id', 'first_name'])
+
+        claim_id = self.db.create_claim(1, '2024-04-01', '2024-03-30', '18:00', 'Car park', 'Dent', 300.0, 'pending')
+        claim = self.db.get_claim(claim_id)
+        self.assertIsInstance(claim, Claim)
+        self.assertEqual(claim.as_dict()['claim_amount'], 300.0)
+        self.assertEqual(claim, self.db.get_claim_by_number(claim.claim_number))
+
+    def test_projected_listings(self):
+        """Test that list queries can fetch only the columns a view needs"""
+        claim_id = self.db.create_claim(1, '2024-05-01', '2024-04-30', '08:00', 'Depot', 'x' * 500, 80.0, 'pending')
+        claim = [c for c in self.db.get_claims_page(columns=('claim_number', 'description_preview', 'status'))
+                 if c.id == claim_id][0]
+        self.assertEqual(claim.keys(), ['id', 'claim_number', 'description_preview', 'status',
+                                        'policy_number', 'policy_type'])
+        self.assertEqual(len(claim.description_preview), 100)
+        self.assertFalse(hasattr(claim, 'description'))
+        self.assertEqual(len(self.db.get_claim(claim_id).description), 500)
+
+        policy = self.db.get_policies_page(columns=('policy_type', 'customer_name'))[0]
+        self.assertEqual(policy.keys(), ['id', 'policy_type', 'customer_name'])
+        customer = self.db.get_customers_page(columns=('email',))[0]
+        self.assertEqual(customer.keys(), ['id', 'email'])
+
+        with self.assertRaises(DatabaseError):
+            list(self.db.iter_claims(columns=('status', 'id; DROP TABLE claims')))
+
+    def test_create_claims(self):
+        """Test bulk claim creation with per-row errors"""
+        claim = {
+            'policy_id': 1, 'claim_date': '2024-03-01', 'incident_date': '2024-02-28',
+            'incident_time': '09:15', 'incident_location': 'Main St',
+            'description': 'Hail damage', 'claim_amount': 1200.0
+        }
+        claims = [claim, dict(claim, status='approved'), dict(claim, status='lost'),
+                  dict(claim, policy_id=9999), dict(claim, description='')]
+        ids, errors = self.db.create_claims(claims)
+
+        self.assertEqual(sorted(errors), [2, 3, 4])
+        self.assertIn('status', errors[2])
+        self.assertIsNone(ids[2])
+        self.assertEqual(self.db.get_claim(ids[0])['status'], 'pending')
+        self.assertEqual(self.db.get_claim(ids[1])['status'], 'approved')
+        self.assertNotEqual(self.db.get_claim(ids[0])['claim_number'], self.db.get_claim(ids[1])['claim_number'])
+
     def test_update_claim_status(self):
         """Test claim status update"""
         # Create a claim first
@@ -111,6 +220,369 @@ class TestDatabaseOperations(unittest.TestCase):
         claims = self.db.get_claims(policy_id=1)
         self.assertEqual(claims[0]['status'], ClaimStatus.APPROVED.value)
 
+    def test_get_claim(self):
+        """Test fetching a single claim by ID"""
+        claim_id = self.db.create_claim(
+            policy_id=1,
+            claim_date='2024-04-01',
+            incident_date='2024-03-30',
+            incident_time='11:00:00',
+            incident_location='Ring road',
+            description='Single claim lookup',
+            claim_amount=150.00,
+            status=ClaimStatus.PENDING.value
+        )
+        claim = self.db.get_claim(claim_id)
+        self.assertEqual(claim['description'], 'Single claim lookup')
+        self.assertIsNone(self.db.get_claim(-1))
+
+    def test_filter_customers(self):
+        """Test customer search and policy membership filters"""
+        customers = self.db.filter_customers('test cust')
+        self.assertEqual([c[0] for c in customers], [1])
+
+        with_policies = self.db.filter_customers(policy_filter='With Policies')
+        without_policies = self.db.filter_customers(policy_filter='Without Policies')
+        self.assertIn(1, [c[0] for c in with_policies])
+        self.assertNotIn(1, [c[0] for c in without_policies])
+        self.assertEqual(len(with_policies) + len(without_policies), len(self.db.get_customers()))
+
+        self.assertEqual(self.db.filter_customers('no such customer'), [])
+
+    def test_filter_policies(self):
+        """Test policy search, type and status filters"""
+        policies = self.db.filter_policies('pol001', 'AUTO', 'active')
+        self.assertEqual([p['policy_number'] for p in policies], ['POL001'])
+        self.assertEqual(self.db.filter_policies('pol001', 'HOME'), [])
+        self.assertEqual(self.db.filter_policies(status='expired'), [])
+
+    def test_filter_claims(self):
+        """Test claim search and status filters"""
+        claim_id = self.db.create_claim(
+            policy_id=1,
+            claim_date='2024-02-01',
+            incident_date='2024-01-31',
+            incident_time='09:00:00',
+            incident_location='Car park_7',
+            description='Scratched door',
+            claim_amount=250.00,
+            status=ClaimStatus.REJECTED.value
+        )
+        claims = self.db.filter_claims('park_7', ClaimStatus.REJECTED.value)
+        self.assertEqual([c['id'] for c in claims], [claim_id])
+        self.assertEqual(self.db.filter_claims('park_7', ClaimStatus.PAID.value), [])
+        # LIKE wildcards in the search text are matched literally
+        self.assertEqual(self.db.filter_claims('park%7'), [])
+
+    def test_get_policies_with_customer_names(self):
+        """Test that policies come back joined with their customer's name"""
+        policies = self.db.get_policies_with_customer_names('POL001')
+        self.assertEqual(len(policies), 1)
+        self.assertEqual(policies[0]['customer_name'], 'Test Customer')
+        self.assertEqual(policies[0]['policy_type'], PolicyType.AUTO.value)
+
+    def test_get_claims_with_policy(self):
+        """Test that claims come back joined with their policy"""
+        self.db.create_claim(
+            policy_id=1,
+            claim_date='2024-03-01',
+            incident_date='2024-02-28',
+            incident_time='18:15:00',
+            incident_location='High Street',
+            description='Joined lookup claim',
+            claim_amount=400.00,
+            status=ClaimStatus.PENDING.value
+        )
+        claims = self.db.get_claims_with_policy('joined lookup')
+        self.assertEqual(len(claims), 1)
+        self.assertEqual(claims[0]['policy_number'], 'POL001')
+        self.assertEqual(claims[0]['policy_type'], PolicyType.AUTO.value)
+
+    def test_keyset_pagination(self):
+        """Test that pages follow on from each other without gaps or repeats"""
+        for i in range(5):
+            self.db.create_customer(
+                first_name=f'Page{i}',
+                last_name='Reader',
+                email=f'page{i}.reader@example.com'
+            )
+        expected = [c[0] for c in self.db.get_customers()]
+
+        seen = []
+        after_id = None
+        while True:
+            page = self.db.get_customers_page(after_id=after_id, limit=2)
+            if not page:
+                break
+            self.assertLessEqual(len(page), 2)
+            seen.extend(c[0] for c in page)
+            after_id = page[-1][0]
+        self.assertEqual(seen, expected)
+
+        # Pages sorted by another column continue after the given row
+        by_email = [c[3] for c in self.db.iter_customers(sort_key='email')]
+        self.assertEqual(by_email, sorted(by_email))
+        first = self.db.get_customers_page(limit=3, sort_key='email')
+        rest = self.db.get_customers_page(after_id=first[-1][0], after_value=first[-1][3], sort_key='email')
+        self.assertEqual([c[3] for c in first + rest], by_email)
+
+    def test_keyset_pagination_after_deleted_row(self):
+        """Test that a page continues after its last row even once that row is deleted"""
+        for i in range(4):
+            self.db.create_customer(first_name=f'Gone{i}', last_name='Reader', email=f'gone{i}@example.com')
+        first = self.db.get_customers_page(limit=2, sort_key='email')
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM customers WHERE id = ?", (first[-1][0],))
+        by_email = [c[3] for c in self.db.iter_customers(sort_key='email')]
+        rest = self.db.get_customers_page(after_id=first[-1][0], after_value=first[-1][3], sort_key='email')
+        self.assertEqual([c[3] for c in first[:-1] + rest], by_email)
+
+    def test_keyset_pagination_over_null_values(self):
+        """Test that rows with a NULL sort value come last and are paged through like the rest"""
+        for i in range(4):
+            customer_id = self.db.create_customer(first_name=f'Null{i}', last_name='Reader',
+                                                  email=f'null{i}@example.com')
+            if i % 2:
+                with self.db.transaction() as conn:
+                    conn.execute("UPDATE customers SET created_at = NULL WHERE id = ?", (customer_id,))
+        expected = [(c.created_at, c.id) for c in self.db.iter_customers(sort_key='created_at')]
+        self.assertEqual([created_at for created_at, _ in expected[-2:]], [None, None])
+
+        seen = []
+        page = self.db.get_customers_page(limit=1, sort_key='created_at')
+        while page:
+            seen.extend((c.created_at, c.id) for c in page)
+            page = self.db.get_customers_page(after_id=page[-1].id, after_value=page[-1].created_at,
+                                              limit=1, sort_key='created_at')
+        self.assertEqual(seen, expected)
+
+    def test_count_and_offset_pages(self):
+        """Test counts and offset jumps agree with the full filtered listing"""
+        customers = self.db.filter_customers('example.com')
+        self.assertEqual(self.db.count_customers('example.com'), len(customers))
+        page = self.db.get_customers_page(offset=1, limit=2, search_term='example.com')
+        self.assertEqual([c[0] for c in page], [c[0] for c in customers[1:3]])
+
+        self.assertEqual(self.db.count_policies(policy_type='AUTO'), len(self.db.filter_policies(policy_type='AUTO')))
+        self.assertEqual(self.db.count_claims(), len(self.db.get_claims()))
+
+    def test_iter_claims_batches(self):
+        """Test that streaming claims in small batches returns every claim"""
+        streamed = [c['id'] for c in self.db.iter_claims(batch_size=1)]
+        self.assertEqual(streamed, [c['id'] for c in self.db.get_claims()])
+
+    def test_invalid_sort_key(self):
+        """Test that only whitelisted columns can be used as a sort key"""
+        with self.assertRaises(DatabaseError):
+            list(self.db.iter_policies(sort_key='premium; DROP TABLE policies'))
+
+    def test_filter_query_shape(self):
+        """Test that unset filters are left out of the generated SQL"""
+        sql, params = FilterQuery("SELECT * FROM policies p").equals("p.status", 'All').build()
+        self.assertEqual(sql, "SELECT * FROM policies p")
+        self.assertEqual(params, ())
+
+        sql, params = FilterQuery("SELECT * FROM policies p").search(["p.policy_number"], '50%').build()
+        self.assertIn("LIKE ?", sql)
+        self.assertEqual(params, ('%50\\%%',))
+
+
+class TestClaimStatusRepair(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        # A claims table from before status was required
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE claims (id INTEGER PRIMARY KEY, claim_number TEXT, status TEXT, updated_at TEXT)")
+        conn.executemany("INSERT INTO claims (claim_number, status) VALUES (?, ?)",
+                         [('CLM-1', None), ('CLM-2', 'approved'), ('CLM-3', None)])
+        conn.commit()
+        conn.close()
+        self.db = Database(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        os.remove(self.path)
+
+    def test_reads_do_not_repair(self):
+        """Test that listing claims leaves missing statuses alone"""
+        self.assertEqual([c.status for c in self.db.get_claims()], [None, 'approved', None])
+        self.assertEqual(self.db.conn.execute("SELECT COUNT(*) FROM claims WHERE status IS NULL").fetchone()[0], 2)
+
+    def test_repair_sets_pending_once(self):
+        """Test that the repair fixes every missing status and reports the claims it changed"""
+        self.assertEqual(sorted(self.db.repair_claim_statuses()), [1, 3])
+        self.assertEqual([c.status for c in self.db.get_claims()], ['pending', 'approved', 'pending'])
+        self.assertEqual(self.db.repair_claim_statuses(), [])
+
+
+class TestSequenceAllocator(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE claims (id INTEGER PRIMARY KEY, claim_number TEXT UNIQUE)")
+        conn.execute("CREATE TABLE policies (id INTEGER PRIMARY KEY, policy_number TEXT UNIQUE)")
+        conn.executemany("INSERT INTO claims (claim_number) VALUES (?)",
+                         [('CLM-00000041',), ('CLM-001',), ('CLM-0000004X',)])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_numbers_continue_after_existing(self):
+        """Test that a new sequence starts after the highest well-formed number"""
+        allocator = SequenceAllocator(self.path)
+        self.assertEqual(allocator.next_number('claim_number'), 'CLM-00000042')
+        self.assertEqual(allocator.next_number('claim_number'), 'CLM-00000043')
+        self.assertEqual(allocator.next_number('policy_number'), 'POL-00000001')
+        allocator.close()
+
+    def test_allocators_get_disjoint_blocks(self):
+        """Test that separate connections, as in separate processes, never share numbers"""
+        first = SequenceAllocator(self.path, block_size=5)
+        second = SequenceAllocator(self.path, block_size=5)
+        numbers = first.allocate('claim_number', 3) + second.allocate('claim_number', 7) + first.allocate('claim_number', 4)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        first.close()
+        second.close()
+
+    def test_threads_get_unique_numbers(self):
+        """Test that concurrent threads never receive the same number"""
+        allocator = SequenceAllocator(self.path, block_size=10)
+        numbers = []
+
+        def take():
+            for _ in range(50):
+                numbers.append(allocator.next_number('policy_number'))
+
+        threads = [threading.Thread(target=take) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(numbers)), 200)
+        allocator.close()
+
+
+class TestTransaction(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.db = Database(TEST_DB_PATH, pooled=True)
+        # Allocate numbers one at a time so they are reserved inside the transactions
+        self.db.sequences.block_size = 1
+
+    def tearDown(self):
+        self.db.close()
+        teardown_test_db()
+
+    def count(self, table):
+        conn = sqlite3.connect(TEST_DB_PATH)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+
+    def create_customer_with_policy_and_claim(self, email):
+        customer_id = self.db.create_customer('Unit', 'Work', email, ssn='123-45-6789')
+        policy_id = self.db.create_policy(customer_id, 'HOME', None, '2024-01-01', '2025-01-01', 900.0, 250000.0,
+                                         payment_schedule='monthly')
+        claim_id = self.db.create_claim(policy_id, '2024-03-01', '2024-02-28', '10:00', 'Home', 'Leak', 800.0,
+                                        'pending')
+        return customer_id, policy_id, claim_id
+
+    def test_commits_once_at_the_end(self):
+        """Test that the writes of a block are only visible to others once it ends"""
+        with self.db.transaction():
+            customer_id, policy_id, claim_id = self.create_customer_with_policy_and_claim('unit@example.com')
+            self.assertEqual(self.db.get_policy(policy_id).customer_id, customer_id)
+            self.assertEqual(self.count('customers'), 1)
+        self.assertEqual(self.count('customers'), 2)
+        self.assertEqual(self.db.get_claim(claim_id).policy_id, policy_id)
+
+    def test_exception_rolls_back_everything(self):
+        """Test that an exception leaves nothing behind and returns the numbers it reserved"""
+        next_policy = self.db.sequences.allocate('policy_number')[0] + 1
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.create_customer_with_policy_and_claim('rollback@example.com')
+                raise RuntimeError("Abandon the unit of work")
+        self.assertEqual((self.count('customers'), self.count('policies'), self.count('claims')), (1, 1, 0))
+        self.assertEqual(self.db.sequences.allocate('policy_number')[0], next_policy)
+
+    def test_failed_write_rolls_back(self):
+        """Test that a write that fails inside the block rolls the block back"""
+        with self.assertRaises(DatabaseError):
+            with self.db.transaction():
+                self.db.create_customer('First', 'Customer', 'first@example.com')
+                self.assertIsNone(self.db.create_customer('Taken', 'Email', 'test@example.com'))
+        self.assertEqual(self.count('customers'), 1)
+
+    def test_nested_blocks_are_savepoints(self):
+        """Test that a failed inner block is undone without losing the outer one"""
+        with self.db.transaction():
+            self.db.create_customer('Outer', 'Customer', 'outer@example.com')
+            try:
+                with self.db.transaction():
+                    self.db.create_customer('Inner', 'Customer', 'inner@example.com')
+                    self.db.create_customer('Taken', 'Email', 'test@example.com')
+            except DatabaseError:
+                pass
+            ids, errors = self.db.create_claims([
+                {'policy_id': 1, 'claim_date': '2024-03-01', 'incident_date': '2024-02-28', 'incident_time': '09:00',
+                 'incident_location': 'Road', 'description': 'Bump', 'claim_amount': 100.0}])
+            self.assertEqual(errors, {})
+        self.assertEqual(self.count('customers'), 2)
+        self.assertEqual(self.count('claims'), 1)
+        self.assertEqual(self.db.filter_customers('inner@example.com'), [])
+
+    def read_on_other_thread(self, claim_id):
+        statuses = []
+        reader = threading.Thread(target=lambda: statuses.append(self.db.get_claim(claim_id).status))
+        reader.start()
+        reader.join(10)
+        return statuses[0]
+
+    def test_other_threads_do_not_cache_uncommitted_rows(self):
+        """Test that a row cached by another thread during the block is dropped once it commits"""
+        claim_id = self.db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Home', 'Leak', 800.0, 'pending')
+        with self.db.transaction():
+            self.assertTrue(self.db.update_claim_status(claim_id, 'approved'))
+            # The other thread still sees, and caches, the committed row
+            self.assertEqual(self.read_on_other_thread(claim_id), 'pending')
+        self.assertEqual(self.read_on_other_thread(claim_id), 'approved')
+
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.update_claim_status(claim_id, 'paid')
+                self.assertEqual(self.read_on_other_thread(claim_id), 'approved')
+                raise RuntimeError("Abandon the unit of work")
+        self.assertEqual(self.read_on_other_thread(claim_id), 'approved')
+
+    def test_write_queue_without_pool_while_listing_is_open(self):
+        """Test that a transaction can start while a listing holds a snapshot older than a queued commit"""
+        db = Database(TEST_DB_PATH, write_queue=True)
+        try:
+            for amount in (100.0, 200.0):
+                db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Home', 'Leak', amount, 'pending')
+            claims = db.iter_claims(batch_size=1)
+            next(claims)
+            db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Home', 'Leak', 300.0, 'pending')
+
+            with db.transaction() as conn:
+                conn.execute("UPDATE claims SET description = 'Burst pipe' WHERE claim_amount = 300")
+            ids, errors = db.create_claims([{'policy_id': 1, 'claim_date': '2024-03-01',
+                                             'incident_date': '2024-02-28', 'incident_time': '10:00',
+                                             'incident_location': 'Home', 'description': 'Leak',
+                                             'claim_amount': 400.0}])
+            self.assertEqual(errors, {})
+            self.assertEqual(len(list(claims)), 1)
+            claims.close()
+            self.assertEqual([claim.description for claim in db.iter_claims()][-2:], ['Burst pipe', 'Leak'])
+        finally:
+            db.close()
+
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
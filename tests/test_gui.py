@@ -34,6 +34,7 @@ class TestInsuranceSystem(unittest.TestCase):
 
         # Perform login
         self.app.login()
+        self.app.executor.drain()
 
         # Verify main window is created
         self.assertIsNotNone(self.app.main_window)
@@ -49,6 +50,7 @@ class TestInsuranceSystem(unittest.TestCase):
 
         # Perform login
         self.app.login()
+        self.app.executor.drain()
 
         # Verify main window is not created
         self.assertIsNone(getattr(self.app, 'main_window', None))
@@ -61,6 +63,7 @@ class TestInsuranceSystem(unittest.TestCase):
         self.app.username_entry.insert(0, 'test_user')
         self.app.password_entry.insert(0, 'test123')
         self.app.login()
+        self.app.executor.drain()
 
         # Verify tabs exist
         self.assertIsNotNone(self.app.notebook)
@@ -77,6 +80,7 @@ class TestInsuranceSystem(unittest.TestCase):
         self.app.username_entry.insert(0, 'test_user')
         self.app.password_entry.insert(0, 'test123')
         self.app.login()
+        self.app.executor.drain()
 
         # Set test values
         self.app.first_name_entry.insert(0, 'New')
@@ -89,10 +93,25 @@ class TestInsuranceSystem(unittest.TestCase):
 
         # Create customer
         self.app.create_customer()
+        self.app.executor.drain()
 
         # Verify customer list is updated
         self.assertGreater(len(self.app.customer_tree.get_children()), 0)
 
+    def test_customer_list_is_virtual(self):
+        """Test that the customer list only materialises a window of rows"""
+        # Login first
+        self.app.username_entry.delete(0, tk.END)
+        self.app.password_entry.delete(0, tk.END)
+        self.app.username_entry.insert(0, 'test_user')
+        self.app.password_entry.insert(0, 'test123')
+        self.app.login()
+        self.app.executor.drain()
+
+        view = self.app.customer_view
+        self.assertEqual(view.total, self.app.db.count_customers())
+        self.assertLessEqual(len(self.app.customer_tree.get_children()), view.visible + 2 * view.margin)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,112 @@
+import csv
+import os
+import tempfile
+import unittest
+from database.db import Database
+from database.importer import BulkImporter
+from tests.config import setup_test_db, teardown_test_db, TEST_DB_PATH
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+class TestBulkImporter(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.db = Database(TEST_DB_PATH)
+        self.dir = tempfile.TemporaryDirectory()
+        self.customers = os.path.join(self.dir.name, 'customers.csv')
+        self.policies = os.path.join(self.dir.name, 'policies.csv')
+        self.errors = os.path.join(self.dir.name, 'errors.csv')
+        write_csv(self.customers, ['first_name', 'last_name', 'email', 'phone', 'address', 'date_of_birth', 'ssn'], [
+            ['Ada', 'Lovelace', 'ada@example.com', '555-0101', '1 Analytical Way', '1815-12-10', '111-22-3333'],
+            ['Alan', 'Turing', 'alan@example.com', '', '', '', ''],
+            ['', 'Nameless', 'nobody@example.com', '', '', '', ''],
+            ['Grace', 'Hopper', 'test@example.com', '', '', '', '222-33-4444'],
+        ])
+
+    def tearDown(self):
+        self.db.close()
+        teardown_test_db()
+        self.dir.cleanup()
+
+    def read_errors(self):
+        with open(self.errors, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def test_import_customers(self):
+        """Test that valid customers are imported and the rest written to the error file"""
+        reports = []
+        stats = BulkImporter(self.db, chunk_size=2, progress=reports.append).import_customers(
+            self.customers, self.errors)
+
+        self.assertEqual((stats['read'], stats['imported'], stats['rejected']), (4, 2, 2))
+        self.assertEqual(len(reports), 2)
+        self.assertEqual([row['email'] for row in self.read_errors()], ['nobody@example.com', 'test@example.com'])
+        self.assertIn('Missing first_name', self.read_errors()[0]['error'])
+
+        ada = self.db.filter_customers('ada@example.com')[0]
+        self.assertEqual(ada[7], '111-22-3333')
+        self.assertIsNone(self.db.filter_customers('alan@example.com')[0][7])
+        self.assertEqual(self.db.find_customer_by_ssn('111-22-3333')[0], ada[0])
+
+    def test_import_customers_with_process_pool(self):
+        """Test that SSNs encrypted by worker processes decrypt with the database key"""
+        stats = BulkImporter(self.db, workers=2).import_customers(self.customers, self.errors)
+        self.assertEqual(stats['imported'], 2)
+        self.assertEqual(self.db.filter_customers('ada@example.com')[0][7], '111-22-3333')
+
+    def test_import_policies(self):
+        """Test that policies are linked by exact customer email and numbered when blank"""
+        BulkImporter(self.db).import_customers(self.customers)
+        write_csv(self.policies, ['customer_email', 'policy_type', 'policy_number', 'start_date', 'end_date',
+                                  'premium', 'coverage_limit', 'status', 'payment_schedule'], [
+            ['ada@example.com', 'home', '', '2024-01-01', '2025-01-01', '900', '250000', '', 'monthly'],
+            ['alan@example.com', 'AUTO', 'IMP-1', '2024-01-01', '2025-01-01', '600', '50000', 'active', 'annual'],
+            ['ghost@example.com', 'AUTO', '', '2024-01-01', '2025-01-01', '600', '50000', '', 'annual'],
+            ['alan@example.com', 'BOAT', '', '2024-01-01', '2025-01-01', '600', '50000', '', 'annual'],
+            ['alan@example.com', 'LIFE', 'POL001', '2024-01-01', '2025-01-01', '600', '50000', '', 'annual'],
+            ['ALAN@example.com', 'LIFE', '', '2024-01-01', '2025-01-01', '600', '50000', '', 'annual'],
+        ])
+        stats = BulkImporter(self.db).import_policies(self.policies, self.errors)
+
+        self.assertEqual((stats['imported'], stats['rejected']), (2, 4))
+        errors = [row['error'] for row in self.read_errors()]
+        self.assertIn('Unknown customer', errors[0])
+        self.assertIn('Invalid policy type', errors[1])
+        self.assertIn('Unknown customer', errors[2])
+        self.assertIn('UNIQUE', errors[3])
+
+        home = self.db.filter_policies(policy_type='HOME')
+        self.assertEqual(len(home), 1)
+        self.assertTrue(home[0]['policy_number'].startswith('POL-'))
+        self.assertEqual(home[0]['status'], 'active')
+        totals = {tuple(row[:3]): (row['row_count'], row['amount']) for row in self.db.financial_totals()}
+        self.assertEqual(totals[('premium', 'HOME', 'active')], (1, 900.0))
+        self.assertEqual(totals[('premium', 'AUTO', 'active')], (2, 1600.0))
+
+    def test_policies_find_customers_differing_only_in_case(self):
+        """Test that emails the UNIQUE constraint tells apart link to their own customers"""
+        write_csv(self.customers, ['first_name', 'last_name', 'email'], [
+            ['Upper', 'Case', 'Case@example.com'],
+            ['Lower', 'Case', 'case@example.com'],
+        ])
+        self.assertEqual(BulkImporter(self.db).import_customers(self.customers)['imported'], 2)
+        write_csv(self.policies, ['customer_email', 'policy_type', 'start_date', 'end_date', 'premium',
+                                  'coverage_limit', 'payment_schedule'], [
+            ['Case@example.com', 'HOME', '2024-01-01', '2025-01-01', '900', '250000', 'monthly'],
+            ['case@example.com', 'PET', '2024-01-01', '2025-01-01', '100', '5000', 'monthly'],
+        ])
+        BulkImporter(self.db).import_policies(self.policies)
+
+        owners = {customer[3]: customer[0] for customer in self.db.filter_customers('case@example.com')}
+        self.assertEqual(self.db.filter_policies(policy_type='HOME')[0]['customer_id'], owners['Case@example.com'])
+        self.assertEqual(self.db.filter_policies(policy_type='PET')[0]['customer_id'], owners['case@example.com'])
+
+
+if __name__ == '__main__':
+    unittest.main()
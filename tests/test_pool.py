@@ -0,0 +1,141 @@
+import sqlite3
+import threading
+import unittest
+from database.db import Database
+from database.pool import ConnectionPool
+from database.report_writer import ReportWriter
+from database.reports import ReportGenerator
+from tests.config import setup_test_db, teardown_test_db, TEST_DB_PATH
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.pool = ConnectionPool(lambda: sqlite3.connect(TEST_DB_PATH, check_same_thread=False))
+
+    def tearDown(self):
+        self.pool.close()
+        teardown_test_db()
+
+    def test_reader_per_thread(self):
+        """Test that each thread reads through a connection of its own"""
+        with self.pool.reader() as first, self.pool.reader() as again:
+            self.assertIs(first, again)
+
+        seen = []
+        def read():
+            with self.pool.reader() as conn:
+                seen.append(conn)
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+        self.assertIsNot(seen[0], first)
+
+    def test_writer_is_exclusive(self):
+        """Test that a second thread waits for the writer and blocks nest"""
+        events = []
+        with self.pool.writer() as conn:
+            with self.pool.writer() as nested:
+                self.assertIs(nested, conn)
+
+            def write():
+                with self.pool.writer():
+                    events.append('other')
+            thread = threading.Thread(target=write)
+            thread.start()
+            thread.join(0.2)
+            events.append('first')
+        thread.join()
+        self.assertEqual(events, ['first', 'other'])
+
+    def test_close_waits_for_connections_in_use(self):
+        """Test that close drains checked out connections and refuses new ones"""
+        checked_out, release = threading.Event(), threading.Event()
+        def read():
+            with self.pool.reader() as conn:
+                checked_out.set()
+                release.wait()
+                conn.execute("SELECT 1")
+        thread = threading.Thread(target=read)
+        thread.start()
+        checked_out.wait()
+
+        closer = threading.Thread(target=self.pool.close)
+        closer.start()
+        closer.join(0.2)
+        self.assertTrue(closer.is_alive())
+        release.set()
+        closer.join()
+        thread.join()
+
+        with self.assertRaises(sqlite3.ProgrammingError):
+            with self.pool.reader():
+                pass
+
+
+class FailingWriter(ReportWriter):
+    """A writer whose destination fails on the first write"""
+
+    def write(self, text):
+        raise OSError("disk full")
+
+    def close(self):
+        pass
+
+
+class TestPooledDatabase(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.db = Database(TEST_DB_PATH, pooled=True)
+
+    def tearDown(self):
+        self.db.close()
+        teardown_test_db()
+
+    def test_reads_and_writes_across_threads(self):
+        """Test that threads can create and read customers through one pooled Database"""
+        errors = []
+        def work(n):
+            try:
+                customer_id = self.db.create_customer(f'Thread{n}', 'Worker', f'thread{n}@example.com',
+                                                      '555-0100', '1 Pool Rd', '1990-01-01', '123-45-6789')
+                self.assertEqual(self.db.get_customer(customer_id).email, f'thread{n}@example.com')
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.db.filter_customers('Worker')), 8)
+
+    def test_close_after_abandoning_iterators(self):
+        """Test that listings and reports left part way release their connections"""
+        claim = {'policy_id': 1, 'claim_date': '2024-03-01', 'incident_date': '2024-02-28',
+                 'incident_time': '10:00', 'incident_location': 'Main St', 'description': 'Dent',
+                 'claim_amount': 100.0}
+        self.db.create_claims([claim] * 3000)
+
+        claims = self.db.iter_claims(batch_size=10)
+        next(claims)
+        claims.close()
+        # Hold on to the error, and through its traceback the frames of the failed report, as a caller might
+        error = None
+        try:
+            ReportGenerator(self.db).write("Claims by Status", FailingWriter())
+        except OSError as e:
+            error = e
+        self.assertIsNotNone(error)
+        with self.assertNoLogs('database.pool', level='WARNING'):
+            self.db.pool.close(timeout=1)
+
+    def test_closed_database_refuses_work(self):
+        """Test that methods fail cleanly once the pool is closed"""
+        self.db.close()
+        self.assertIsNone(self.db.get_customer(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
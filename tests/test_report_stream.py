@@ -0,0 +1,112 @@
+import threading
+import unittest
+from database.report_writer import ReportCancelled, write_report
+from gui import report_stream
+from gui.report_stream import TextReportWriter
+
+
+class FakeText:
+    """Records the Text widget calls made by the report writer, running after() callbacks on demand"""
+
+    def __init__(self):
+        self.content = "previous report"
+        self.callbacks = []
+        self.exists = True
+
+    def winfo_exists(self):
+        return self.exists
+
+    def delete(self, start, end):
+        self.content = ""
+
+    def insert(self, index, text):
+        self.content += text
+
+    def after(self, delay, callback):
+        self.callbacks.append(callback)
+
+    def tick(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class TestTextReportWriter(unittest.TestCase):
+    def test_report_streams_into_widget(self):
+        """Test that chunks are inserted tick by tick until the report ends"""
+        text = FakeText()
+        finished = []
+        writer = TextReportWriter(text, on_finished=lambda: finished.append(True))
+        self.assertEqual(text.content, "")
+
+        write_report(["a" * 10, "b" * 10, "c" * 10], writer, chunk_size=10)
+        text.tick()
+        self.assertEqual(text.content, "a" * 10 + "b" * 10)
+        self.assertFalse(finished)
+        text.tick()
+        self.assertEqual(text.content, "a" * 10 + "b" * 10 + "c" * 10)
+        self.assertEqual(finished, [True])
+        self.assertEqual(text.callbacks, [])
+
+    def test_cancel_releases_worker(self):
+        """Test that a worker blocked on a full queue gives up once cancelled"""
+        text = FakeText()
+        writer = TextReportWriter(text)
+        errors = []
+
+        def generate():
+            try:
+                write_report(("x" for _ in range(100)), writer, chunk_size=1)
+            except ReportCancelled as e:
+                errors.append(e)
+
+        worker = threading.Thread(target=generate)
+        worker.start()
+        writer.cancel()
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(len(errors), 1)
+        text.tick()
+        self.assertEqual(text.content, "")
+
+    def worker_gives_up(self, writer):
+        """Run a large report into writer on a worker, returning whether it stopped with ReportCancelled"""
+        errors = []
+
+        def generate():
+            try:
+                write_report(("x" for _ in range(100)), writer, chunk_size=1)
+            except ReportCancelled as e:
+                errors.append(e)
+
+        worker = threading.Thread(target=generate)
+        worker.start()
+        return worker, errors
+
+    def test_destroyed_widget_stops_worker(self):
+        """Test that the worker gives up once its widget has been destroyed"""
+        text = FakeText()
+        writer = TextReportWriter(text)
+        worker, errors = self.worker_gives_up(writer)
+        text.exists = False
+        text.tick()
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(text.callbacks, [])
+
+    def test_undrained_queue_stops_worker(self):
+        """Test that the worker gives up when nothing drains the queue, as after the main loop ends"""
+        stalled, timeout = report_stream.STALLED_PUTS, report_stream.PUT_TIMEOUT
+        report_stream.STALLED_PUTS, report_stream.PUT_TIMEOUT = 3, 0.01
+        try:
+            worker, errors = self.worker_gives_up(TextReportWriter(FakeText()))
+            worker.join(5)
+        finally:
+            report_stream.STALLED_PUTS, report_stream.PUT_TIMEOUT = stalled, timeout
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(len(errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
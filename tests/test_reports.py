@@ -0,0 +1,293 @@
+import csv
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from database.db import Database, DatabaseError
+from database.reports import ReportGenerator
+from database.report_writer import ReportWriter, StreamWriter, FileWriter, write_report
+from tests.config import setup_test_db, teardown_test_db, TEST_DB_PATH
+
+
+class RecordingWriter(ReportWriter):
+    """Records the chunks it is given and whether it was closed"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, text):
+        self.chunks.append(text)
+
+    def close(self):
+        self.closed = True
+
+
+class TestClaimReports(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.db = Database(TEST_DB_PATH)
+        self.reports = ReportGenerator(self.db)
+        home = self.db.create_policy(1, 'HOME', None, '2024-01-01', '2025-01-01', 900.0, 250000.0,
+                                     payment_schedule='monthly')
+        for policy_id, amount, status in ((1, 100.0, 'pending'), (home, 300.0, 'pending'), (1, 50.0, 'paid')):
+            self.db.create_claim(policy_id, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Dent', amount, status)
+
+    def tearDown(self):
+        self.db.close()
+        teardown_test_db()
+
+    def test_claim_groups(self):
+        """Test that every claim comes with its group's totals, ordered by group"""
+        rows = [tuple(row) for row in self.db.claim_groups('policy_type')]
+        self.assertEqual([row[:4] for row in rows], [('AUTO', 2, 150.0, 75.0), ('AUTO', 2, 150.0, 75.0),
+                                                     ('HOME', 1, 300.0, 300.0)])
+        self.assertEqual([row[5] for row in rows], [100.0, 50.0, 300.0])
+        with self.assertRaises(DatabaseError):
+            list(self.db.claim_groups('claim_amount'))
+
+    def test_claims_by_status(self):
+        """Test the status report's group totals and claim lines"""
+        report = self.reports.get_claims_by_status()
+        self.assertTrue(report.startswith("Claims by Status Report\n"))
+        paid, pending = report.index("Status: paid"), report.index("Status: pending")
+        self.assertLess(paid, pending)
+        self.assertIn("Claims: 2  Total: £400.00  Average: £200.00", report[pending:])
+        self.assertEqual(report.count("Claim #CLM-"), 3)
+
+    def test_claims_by_policy_type(self):
+        """Test the policy type report's group totals"""
+        report = self.reports.get_claims_by_policy_type()
+        self.assertIn("Policy Type: AUTO\n" + "-" * 50 + "\nClaims: 2  Total: £150.00  Average: £75.00\n", report)
+        self.assertIn("Policy Type: HOME", report)
+
+    def test_no_claims(self):
+        """Test that an empty claims table gives the no claims message"""
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM claims")
+        self.assertEqual(self.reports.get_claims_by_status(), "No claims found")
+
+    def test_streams_match_strings(self):
+        """Test that each streamed report matches the string built from it"""
+        for report_type, build in (("Claims by Status", self.reports.get_claims_by_status),
+                                   ("Claims by Policy Type", self.reports.get_claims_by_policy_type),
+                                   ("Financial Summary", self.reports.get_financial_summary)):
+            stream = io.StringIO()
+            written = self.reports.write(report_type, StreamWriter(stream))
+            self.assertEqual(stream.getvalue(), build())
+            self.assertEqual(written, len(stream.getvalue()))
+
+    def test_unknown_report_type(self):
+        """Test that an unknown report type is refused and its writer closed"""
+        writer = RecordingWriter()
+        with self.assertRaises(ValueError):
+            self.reports.write("Claims by Colour", writer)
+        self.assertTrue(writer.closed)
+
+
+class TestReportWriter(unittest.TestCase):
+    def test_chunks_are_gathered(self):
+        """Test that small chunks reach the writer in pieces of about chunk_size"""
+        writer = RecordingWriter()
+        written = write_report((f"line {i}\n" for i in range(10)), writer, chunk_size=20)
+        self.assertEqual(written, 70)
+        self.assertEqual(''.join(writer.chunks), ''.join(f"line {i}\n" for i in range(10)))
+        self.assertEqual([len(chunk) for chunk in writer.chunks], [21, 21, 21, 7])
+        self.assertTrue(writer.closed)
+
+    def test_writer_closed_on_error(self):
+        """Test that a failing report still closes its writer"""
+        def chunks():
+            yield "start\n"
+            raise RuntimeError("query failed")
+
+        writer = RecordingWriter()
+        with self.assertRaises(RuntimeError):
+            write_report(chunks(), writer)
+        self.assertTrue(writer.closed)
+
+    def test_stream_and_file_writers(self):
+        """Test writing a report to a text stream and to a file"""
+        stream = io.StringIO()
+        write_report(["Report\n", "£1.00\n"], StreamWriter(stream))
+        self.assertEqual(stream.getvalue(), "Report\n£1.00\n")
+
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        os.close(fd)
+        try:
+            writer = FileWriter(path)
+            write_report(["Report\n", "£1.00\n"], writer)
+            self.assertTrue(writer.stream.closed)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), "Report\n£1.00\n")
+        finally:
+            os.remove(path)
+
+
+class TestCsvExport(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.db = Database(TEST_DB_PATH)
+        self.reports = ReportGenerator(self.db)
+        for amount in (100.0, 250.0, 75.0):
+            self.db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Main St, "Flat 2"',
+                                 'Dent,\nscratch', amount, 'pending')
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+        teardown_test_db()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def read_csv(self, path, opener=open):
+        with opener(path, 'rt', encoding='utf-8', newline='') as f:
+            return list(csv.reader(f))
+
+    def test_export_quotes_fields(self):
+        """Test that commas, quotes and newlines survive a round trip"""
+        self.assertEqual(self.reports.export_table('claims', self.path('claims')), 3)
+        rows = self.read_csv(self.path('claims.csv'))
+        header = rows[0]
+        self.assertEqual(header[:3], ['id', 'policy_id', 'claim_number'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][header.index('incident_location')], 'Main St, "Flat 2"')
+        self.assertEqual(rows[1][header.index('description')], 'Dent,\nscratch')
+
+    def test_columns_compression_and_progress(self):
+        """Test a gzipped export of chosen columns, reporting progress per batch"""
+        progress = []
+        written = self.reports.export_table('claims', self.path('claims.csv'), columns=['policy_number', 'claim_amount'],
+                                            compress=True, progress=progress.append, batch_size=2)
+        self.assertEqual(written, 3)
+        self.assertEqual(progress, [2, 3])
+        rows = self.read_csv(self.path('claims.csv.gz'), gzip.open)
+        self.assertEqual(rows, [['id', 'policy_number', 'claim_amount'], ['1', 'POL001', '100'],
+                                ['2', 'POL001', '250'], ['3', 'POL001', '75']])
+
+    def test_customers_leave_out_ssn(self):
+        """Test that a full customer export has no SSN columns unless they are named"""
+        self.reports.export_table('customers', self.path('customers.csv'))
+        header = self.read_csv(self.path('customers.csv'))[0]
+        self.assertIn('email', header)
+        self.assertNotIn('ssn_encrypted', header)
+        self.assertNotIn('ssn_index', header)
+
+    def test_failed_export(self):
+        """Test that bad columns and abandoned exports return None and leave no file"""
+        self.assertIsNone(self.reports.export_table('claims', self.path('bad.csv'), columns=['password_hash']))
+        self.assertIsNone(self.reports.export_table('users', self.path('users.csv')))
+
+        def abandon(written):
+            raise RuntimeError("cancelled")
+
+        self.assertIsNone(self.reports.export_table('claims', self.path('claims.csv'), progress=abandon))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_export_to_csv_quotes_fields(self):
+        """Test exporting a list of dicts through the csv writer"""
+        data = [{'name': 'Smith, J', 'note': None}, {'name': 'O"Brien', 'note': 'ok'}]
+        self.assertTrue(self.reports.export_to_csv(data, self.path('people')))
+        self.assertEqual(self.read_csv(self.path('people.csv')),
+                         [['name', 'note'], ['Smith, J', ''], ['O"Brien', 'ok']])
+
+
+class TestFinancialLedger(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.db = Database(TEST_DB_PATH)
+
+    def tearDown(self):
+        self.db.close()
+        teardown_test_db()
+
+    def totals(self):
+        return {tuple(row[:3]): (row['row_count'], row['amount']) for row in self.db.financial_totals()}
+
+    def test_existing_rows_are_totalled_on_install(self):
+        """Test that the policy written before the triggers existed is in the ledger"""
+        self.assertEqual(self.totals(), {('premium', 'AUTO', 'active'): (1, 1000.0)})
+
+    def test_triggers_follow_writes(self):
+        """Test that inserts, updates and deletes keep the totals equal to a rebuild"""
+        claim_id = self.db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Dent', 500.0, 'pending')
+        with self.db.transaction() as conn:
+            conn.execute("""
+                INSERT INTO claim_payments (claim_id, amount, payment_date, payment_method, status)
+                VALUES (?, 200, '2024-04-01', 'transfer', 'completed')
+            """, (claim_id,))
+            conn.execute("UPDATE policies SET policy_type = 'HOME', premium = 1200 WHERE id = 1")
+        self.db.update_claim_status(claim_id, 'paid')
+
+        self.assertEqual(self.totals(), {
+            ('claim', 'HOME', 'paid'): (1, 500.0),
+            ('claim_payment', 'HOME', 'completed'): (1, 200.0),
+            ('premium', 'HOME', 'active'): (1, 1200.0),
+        })
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM claim_payments")
+        before = self.totals()
+        self.assertTrue(self.db.rebuild_financial_ledger())
+        self.assertEqual(self.totals(), before)
+
+    def schema_version(self):
+        with self.db.reader() as conn:
+            return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+    def test_bulk_inserts_post_their_totals(self):
+        """Test that create_claims totals its batch once, with the row trigger turned off but not dropped"""
+        claim = {'policy_id': 1, 'claim_date': '2024-03-01', 'incident_date': '2024-02-28',
+                 'incident_time': '10:00', 'incident_location': 'Main St', 'description': 'Dent'}
+        version = self.schema_version()
+        ids, errors = self.db.create_claims([dict(claim, claim_amount=100.0), dict(claim, claim_amount=50.0),
+                                             dict(claim, claim_amount=25.0, status='paid')])
+        self.assertEqual(errors, {})
+        self.assertEqual(self.schema_version(), version)
+        with self.db.reader() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM financial_ledger_suspended").fetchone()[0], 0)
+        self.db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Dent', 10.0, 'pending')
+
+        expected = {
+            ('claim', 'AUTO', 'paid'): (1, 25.0),
+            ('claim', 'AUTO', 'pending'): (3, 160.0),
+            ('premium', 'AUTO', 'active'): (1, 1000.0),
+        }
+        self.assertEqual(self.totals(), expected)
+        self.assertTrue(self.db.rebuild_financial_ledger())
+        self.assertEqual(self.totals(), expected)
+
+    def test_triggers_of_older_versions_are_replaced(self):
+        """Test that a database whose insert triggers predate the control table gets the guarded ones"""
+        with self.db.transaction() as conn:
+            conn.execute("DROP TRIGGER ledger_claims_insert")
+            conn.execute("DROP TABLE financial_ledger_suspended")
+            conn.execute("""
+                CREATE TRIGGER ledger_claims_insert AFTER INSERT ON claims BEGIN
+                INSERT INTO financial_ledger (entry, policy_type, status, row_count, amount)
+                VALUES ('claim', 'AUTO', NEW.status, 1, NEW.claim_amount)
+                ON CONFLICT (entry, policy_type, status) DO UPDATE SET
+                    row_count = row_count + excluded.row_count, amount = amount + excluded.amount; END
+            """)
+        self.db.close()
+        self.db = Database(TEST_DB_PATH)
+        with self.db.reader() as conn:
+            sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'ledger_claims_insert'").fetchone()[0]
+        self.assertIn('financial_ledger_suspended', sql)
+        self.db.create_claims([{'policy_id': 1, 'claim_date': '2024-03-01', 'incident_date': '2024-02-28',
+                                'incident_time': '10:00', 'incident_location': 'Main St', 'description': 'Dent',
+                                'claim_amount': 40.0}])
+        self.assertEqual(self.totals()[('claim', 'AUTO', 'pending')], (1, 40.0))
+
+    def test_financial_summary(self):
+        """Test the summary read from the ledger"""
+        self.db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Dent', 250.0, 'pending')
+        report = ReportGenerator(self.db).get_financial_summary()
+        self.assertIn("Total Premiums: £1000.00\nTotal Claims: £250.00\nNet Income: £750.00\n", report)
+        self.assertIn("AUTO: Premiums £1000.00, Claims £250.00, Net £750.00", report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from gui.search import IncrementalSearch
+
+
+class FakeTree:
+    """Stands in for a Treeview's after() timers"""
+
+    def __init__(self):
+        self.timers = {}
+
+    def after(self, delay, callback):
+        timer = len(self.timers) + 1
+        self.timers[timer] = callback
+        return timer
+
+    def after_cancel(self, timer):
+        self.timers.pop(timer, None)
+
+    def fire(self):
+        timers, self.timers = self.timers, {}
+        for callback in timers.values():
+            callback()
+
+
+class FakeView:
+    """Stands in for a VirtualTreeview over a list of policy numbers"""
+
+    def __init__(self, rows):
+        self.tree = FakeTree()
+        self.source = rows
+        self.search = {'search_term': '', 'status': 'All'}
+        self.current_criteria = None
+        self.all_rows = None
+        self.busy = False
+        self.queries = 0
+
+    def criteria(self):
+        return dict(self.search)
+
+    def reload(self, reset=False, materialize=0):
+        self.queries += 1
+        criteria = self.criteria()
+        self.current_criteria = criteria
+        self.all_rows = [row for row in self.source if criteria['search_term'].lower() in row.lower()]
+
+    def show_rows(self, rows, criteria):
+        self.current_criteria = criteria
+        self.all_rows = list(rows)
+
+
+class TestIncrementalSearch(unittest.TestCase):
+    def setUp(self):
+        self.view = FakeView(['POL-0001', 'POL-0002', 'POL-0100', 'HOME-0001'])
+        self.search = IncrementalSearch(self.view, lambda row, term: term.lower() in row.lower())
+        self.search.run()
+        self.view.queries = 0
+
+    def type(self, text):
+        for i in range(1, len(text) + 1):
+            self.view.search['search_term'] = text[:i]
+            self.search.schedule()
+
+    def test_typing_is_debounced(self):
+        """Test that a burst of keystrokes runs a single search"""
+        self.type('pol-00')
+        self.assertEqual(len(self.view.tree.timers), 1)
+        self.view.tree.fire()
+        self.assertEqual(self.view.all_rows, ['POL-0001', 'POL-0002'])
+        self.assertEqual(self.view.queries, 0)
+
+    def test_extended_term_narrows_in_memory(self):
+        """Test that extending the search text filters the rows already held"""
+        self.view.search['search_term'] = 'pol'
+        self.search.run()
+        self.view.search['search_term'] = 'pol-0001'
+        self.search.run()
+        self.assertEqual(self.view.all_rows, ['POL-0001'])
+        self.assertEqual(self.view.queries, 0)
+
+    def test_shortened_term_or_new_filter_queries_again(self):
+        """Test that shortening the text or changing a filter goes back to the database"""
+        self.view.search['search_term'] = 'pol-0001'
+        self.search.run()
+        self.view.search['search_term'] = 'pol'
+        self.search.run()
+        self.assertEqual(self.view.queries, 1)
+        self.assertEqual(len(self.view.all_rows), 3)
+
+        self.view.search['status'] = 'active'
+        self.search.run()
+        self.assertEqual(self.view.queries, 2)
+
+    def test_undecided_match_queries_again(self):
+        """Test that a row the matcher cannot decide on sends the search to the database"""
+        self.search.matches = lambda row, term: None if row == 'HOME-0001' else term.lower() in row.lower()
+        self.view.search['search_term'] = 'pol'
+        self.search.run()
+        self.assertEqual(self.view.queries, 1)
+        self.assertEqual(self.view.all_rows, ['POL-0001', 'POL-0002', 'POL-0100'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+from gui.virtual_tree import TreeviewSync, VirtualTreeview
+
+
+class FakeTree:
+    """Records the Treeview calls made by the sync layer"""
+
+    def __init__(self):
+        self.items = {}
+        self.order = []
+        self.calls = []
+
+    def get_children(self):
+        return tuple(self.order)
+
+    def insert(self, parent, index, iid, values):
+        self.calls.append(('insert', iid))
+        self.items[iid] = values
+        self.order.insert(index, iid)
+
+    def item(self, iid, values):
+        self.calls.append(('item', iid))
+        self.items[iid] = values
+
+    def move(self, iid, parent, index):
+        self.calls.append(('move', iid))
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.calls.append(('delete', iid))
+            self.order.remove(iid)
+            del self.items[iid]
+
+
+class FakeVirtualTree(FakeTree):
+    """A FakeTree with the rest of the Treeview calls VirtualTreeview makes"""
+
+    def __init__(self, height=10):
+        super().__init__()
+        self.height = height
+        self.fraction = 0.0
+
+    def cget(self, option):
+        return self.height
+
+    def configure(self, **options):
+        pass
+
+    def bind(self, sequence, callback, add=None):
+        pass
+
+    def yview_moveto(self, fraction):
+        self.fraction = fraction
+
+    def after_idle(self, callback):
+        callback()
+
+
+class FakeScrollbar:
+    """Records where the scrollbar was last set"""
+
+    def __init__(self):
+        self.position = None
+
+    def configure(self, **options):
+        pass
+
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+class FakeListing:
+    """A listing of rows (id, name) with ids from 1, recording each fetch"""
+
+    def __init__(self, total):
+        self.rows = [(n, f'row {n}') for n in range(1, total + 1)]
+        self.fetches = []
+
+    def count_rows(self, criteria):
+        return len(self.rows)
+
+    def fetch_rows(self, criteria, offset, limit, after_key):
+        self.fetches.append((offset, limit, after_key))
+        if after_key is not None:
+            # Keyset continuation: the rows after the one with after_key, ignoring offset
+            return [row for row in self.rows if row[0] > after_key][:limit]
+        return self.rows[offset:offset + limit]
+
+
+class TestVirtualTreeview(unittest.TestCase):
+    def setUp(self):
+        self.tree = FakeVirtualTree(height=10)
+        self.scrollbar = FakeScrollbar()
+        self.listing = FakeListing(10000)
+        self.view = VirtualTreeview(self.tree, self.scrollbar, self.listing.count_rows, self.listing.fetch_rows,
+                                    row_values=lambda row: row, margin=20)
+        self.view.reload()
+
+    def test_only_the_window_is_fetched(self):
+        """Test that a reload fetches the visible rows plus the margin below them, not the listing"""
+        self.assertEqual(self.listing.fetches, [(0, 50, None)])
+        self.assertEqual(self.tree.order, [str(n) for n in range(1, 51)])
+
+        # Scrolling within the window fetches nothing
+        self.view.yview('scroll', '2', 'pages')
+        self.assertEqual(len(self.listing.fetches), 1)
+        self.assertEqual(self.view.top, 20)
+
+    def test_scrolling_forward_continues_from_the_last_key(self):
+        """Test that a window following on from the held rows is fetched by key rather than by offset"""
+        self.view.yview('scroll', '4', 'pages')
+        self.assertEqual(self.listing.fetches[-1], (20, 50, 20))
+        self.assertEqual(self.tree.order, [str(n) for n in range(21, 71)])
+
+        # A jump far past the held rows has no neighbouring key and falls back to the offset
+        self.view.yview('moveto', '0.5')
+        self.assertEqual(self.listing.fetches[-1], (4980, 50, None))
+        self.assertEqual(self.tree.order[0], '4981')
+
+    def test_scrollbar_reflects_the_total(self):
+        """Test that the scrollbar is sized and placed from the row count, not the items held"""
+        self.assertEqual(self.scrollbar.position, (0.0, 10 / 10000))
+        self.view.yview('moveto', '0.5')
+        self.assertEqual(self.scrollbar.position, (0.5, 5010 / 10000))
+        self.view.yview('moveto', '1.0')
+        self.assertEqual(self.view.top, 9990)
+        self.assertEqual(self.scrollbar.position, (9990 / 10000, 1.0))
+
+        self.listing.rows = self.listing.rows[:4]
+        self.view.reload(reset=True)
+        self.assertEqual(self.scrollbar.position, (0.0, 1.0))
+        self.listing.rows = []
+        self.view.reload(reset=True)
+        self.assertEqual(self.scrollbar.position, (0.0, 1.0))
+        self.assertEqual(self.tree.order, [])
+
+
+class TestTreeviewSync(unittest.TestCase):
+    def setUp(self):
+        self.tree = FakeTree()
+        self.sync = TreeviewSync(self.tree, lambda row: row[0], lambda row: row)
+        self.sync.sync([(1, 'pending'), (2, 'pending'), (3, 'approved')])
+        self.tree.calls.clear()
+
+    def test_unchanged_rows_cost_nothing(self):
+        """Test that re-syncing the same rows makes no Treeview calls"""
+        self.sync.sync([(1, 'pending'), (2, 'pending'), (3, 'approved')])
+        self.assertEqual(self.tree.calls, [])
+
+    def test_only_changes_are_applied(self):
+        """Test that inserts, updates and deletes touch only the affected rows"""
+        self.sync.sync([(1, 'pending'), (3, 'paid'), (4, 'pending')])
+        self.assertEqual(self.tree.calls, [('delete', '2'), ('item', '3'), ('insert', '4')])
+        self.assertEqual(self.tree.order, ['1', '3', '4'])
+        self.assertEqual(self.tree.items['3'], (3, 'paid'))
+
+    def test_reordered_rows_are_moved(self):
+        """Test that rows keep the order of the result set"""
+        self.sync.sync([(3, 'approved'), (1, 'pending'), (2, 'pending')])
+        self.assertEqual(self.tree.order, ['3', '1', '2'])
+        self.assertNotIn('insert', [call for call, _ in self.tree.calls])
+
+    def test_single_row_update(self):
+        """Test that updating one row costs one Treeview update"""
+        self.sync.update((2, 'approved'))
+        self.assertEqual(self.tree.calls, [('item', '2')])
+
+
+if __name__ == '__main__':
+    unittest.main()
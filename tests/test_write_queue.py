@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+import unittest
+from concurrent.futures import Future
+from database.db import Database
+from database.write_queue import WriteQueue
+from tests.config import setup_test_db, teardown_test_db, TEST_DB_PATH
+
+
+def connect():
+    return sqlite3.connect(TEST_DB_PATH, check_same_thread=False)
+
+
+class TestWriteQueue(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.queue = WriteQueue(connect, max_delay=0.05, backoff=0.02)
+
+    def tearDown(self):
+        self.queue.close()
+        teardown_test_db()
+
+    def insert_branch(self, name):
+        return self.queue.submit("INSERT INTO branches (name, address, phone, email) VALUES (?, '', '', '')",
+                                 (name,))
+
+    def test_writes_are_committed_in_groups(self):
+        """Test that queued writes share a commit and their futures carry the row ids"""
+        futures = [self.insert_branch(f'Branch {n}') for n in range(50)]
+        ids = [future.result(timeout=5) for future in futures]
+
+        self.assertEqual(ids, list(range(2, 52)))
+        self.assertLess(self.queue.batches, 5)
+        with connect() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM branches").fetchone()[0], 51)
+
+    def test_failed_write_leaves_the_batch(self):
+        """Test that a failing statement only fails its own future"""
+        good = self.insert_branch('Good')
+        bad = self.queue.submit("INSERT INTO branches (id, name) VALUES (1, 'Duplicate')")
+        also_good = self.insert_branch('Also good')
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            bad.result(timeout=5)
+        self.assertIsNotNone(good.result(timeout=5))
+        self.assertIsNotNone(also_good.result(timeout=5))
+
+    def test_busy_database_is_retried(self):
+        """Test that a batch waits for another connection to release the database"""
+        blocker = connect()
+        blocker.execute("BEGIN IMMEDIATE")
+        future = self.insert_branch('Waiting')
+        timer = threading.Timer(0.3, blocker.commit)
+        timer.start()
+
+        self.assertEqual(future.result(timeout=10), 2)
+        timer.join()
+        blocker.close()
+
+    def test_close_commits_queued_writes(self):
+        """Test that close flushes the queue and refuses later writes"""
+        futures = [self.insert_branch(f'Branch {n}') for n in range(10)]
+        self.queue.close()
+        self.assertTrue(all(future.done() and future.exception() is None for future in futures))
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.insert_branch('Too late')
+
+
+class TestQueuedDatabase(unittest.TestCase):
+    def setUp(self):
+        setup_test_db()
+        self.db = Database(TEST_DB_PATH, pooled=True, write_queue=True)
+
+    def tearDown(self):
+        self.db.close()
+        teardown_test_db()
+
+    def test_create_without_waiting(self):
+        """Test that the create methods return futures of the new ids when not waiting"""
+        future = self.db.create_customer('Queued', 'Customer', 'queued@example.com', ssn='123-45-6789', wait=False)
+        self.assertIsInstance(future, Future)
+        customer_id = future.result(timeout=5)
+        self.assertEqual(self.db.get_customer(customer_id).ssn, '123-45-6789')
+
+        claim_id = self.db.create_claim(1, '2024-03-01', '2024-02-28', '10:00', 'Main St', 'Dent', 500.0, 'pending')
+        self.assertTrue(self.db.update_claim_status(claim_id, 'approved'))
+        self.assertEqual(self.db.get_claim(claim_id).status, 'approved')
+
+    def test_failed_write_returns_none(self):
+        """Test that a rejected write is logged and reported as before"""
+        self.assertIsNone(self.db.create_customer('Same', 'Email', 'test@example.com'))
+
+
+if __name__ == '__main__':
+    unittest.main()